@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useMemo, useState } from 'react';
 import {
   StyleSheet,
   Text,
@@ -22,14 +22,16 @@ export default function RaportitScreen() {
     setSelectedRange(range);
   };
 
-  // Calculate summary data
-  const totalIncome = transactions
-    .filter((t) => t.type === 'credit')
-    .reduce((sum, t) => sum + t.amount, 0);
-
-  const totalExpenses = transactions
-    .filter((t) => t.type === 'debit')
-    .reduce((sum, t) => sum + Math.abs(t.amount), 0);
+  // Calculate summary data in one pass, only when the transactions change
+  const { totalIncome, totalExpenses } = useMemo(() => {
+    let income = 0;
+    let expenses = 0;
+    for (const t of transactions) {
+      if (t.type === 'credit') income += t.amount;
+      else if (t.type === 'debit') expenses += Math.abs(t.amount);
+    }
+    return { totalIncome: income, totalExpenses: expenses };
+  }, [transactions]);
 
   const netBalance = totalIncome - totalExpenses;
   const transactionCount = transactions.length;
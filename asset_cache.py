@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+In-Memory Asset Cache for MobileBanks
+=====================================
+
+Preloads every file under the web/ directory into an immutable table of
+bytes plus response headers, so the static server never touches the
+filesystem on the request path.
+
+The table is replaced, never mutated: refresh() builds a new mapping that
+reuses every unchanged Asset and swaps it in with a single assignment.
+Request threads that already hold the old table keep a consistent view.
+
+CacheWatcher polls file mtimes (the stdlib has no portable inotify) and
+calls refresh(), so edits to index.html show up without a restart.
+
+Compressible assets also carry precompressed gzip (and Brotli, when the
+optional brotli module is installed) variants. With a precompress
+directory the variants are stored under the content hash of the original
+bytes and reused on later launches instead of being compressed again.
+
+Every representation carries a strong, content-hash ETag, Last-Modified
+and a Cache-Control policy chosen per asset class (see cache_control_for),
+so the server can answer revalidations from sw.js with 304 Not Modified.
+
+Files larger than MAX_CACHED_SIZE (screenshots, exported PDFs) are not
+read into memory. Their Asset has body None and an ETag built from size
+and mtime; the server streams them from disk with sendfile().
+"""
+
+import email.utils
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import tempfile
+import threading
+import types
+from pathlib import Path
+from typing import NamedTuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_WATCH_INTERVAL = 1.0  # seconds between mtime scans
+
+# mimetypes depends on the platform registry (Windows reads it from the
+# registry), so pin the types the web app actually ships.
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+    '.json': 'application/json',
+    '.webmanifest': 'application/manifest+json',
+    '.svg': 'image/svg+xml',
+    '.css': 'text/css; charset=utf-8',
+    '.txt': 'text/plain; charset=utf-8',
+}
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/manifest+json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
+MIN_COMPRESS_SIZE = 256  # below this the encoding overhead is not worth it
+MAX_CACHED_SIZE = 1024 * 1024  # larger files are served from disk
+
+# Cache-Control per asset class. sw.js fetches navigations network-first and
+# the browser checks sw.js itself for updates, so both must revalidate on
+# every use; the 304s that come back are nearly free over the tunnel.
+CACHE_CONTROL_REVALIDATE = 'public, max-age=0, must-revalidate'
+CACHE_CONTROL_IMMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_CONTROL_DEFAULT = 'public, max-age=300, must-revalidate'
+REVALIDATE_FILES = ('sw.js',)
+
+
+def guess_content_type(path):
+    """Return the Content-Type header value for a file path"""
+    suffix = Path(path).suffix.lower()
+    if suffix in CONTENT_TYPES:
+        return CONTENT_TYPES[suffix]
+    content_type, _ = mimetypes.guess_type(str(path))
+    return content_type or 'application/octet-stream'
+
+
+def cache_control_for(url_path, content_type):
+    """
+    Return the Cache-Control value for an asset.
+
+    HTML documents and the service worker revalidate on every use, SVG
+    icons are immutable, everything else gets a short max-age.
+    """
+    if content_type.startswith('text/html') or posixpath.basename(url_path) in REVALIDATE_FILES:
+        return CACHE_CONTROL_REVALIDATE
+    if content_type.startswith('image/svg+xml'):
+        return CACHE_CONTROL_IMMUTABLE
+    return CACHE_CONTROL_DEFAULT
+
+
+def is_compressible(content_type):
+    """Return True for text-like content types worth compressing"""
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def available_encodings():
+    """Content codings this process can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(body, encoding):
+    """Compress body with the given content coding ('gzip' or 'br')"""
+    if encoding == 'gzip':
+        # mtime=0 keeps the output (and so its hash) deterministic
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(body, quality=11)
+    raise ValueError(f"Unsupported encoding {encoding!r}")
+
+
+class Variant(NamedTuple):
+    """A precompressed representation of an Asset"""
+    encoding: str
+    body: bytes
+    headers: tuple
+    etag: str
+
+
+class Asset(NamedTuple):
+    """
+    One cached file: body bytes plus the headers sent with it.
+
+    body is None for file-backed assets (see MAX_CACHED_SIZE).
+    """
+    url_path: str
+    file_path: Path
+    body: bytes
+    headers: tuple
+    mtime_ns: int
+    size: int
+    etag: str
+    variants: tuple = ()
+
+    @property
+    def file_backed(self):
+        """True when the body is streamed from disk instead of memory"""
+        return self.body is None
+
+    @property
+    def mtime(self):
+        """Modification time in whole seconds, as sent in Last-Modified"""
+        return self.mtime_ns // 1_000_000_000
+
+    def variant(self, encoding):
+        """Return the Variant for a content coding, or None"""
+        for variant in self.variants:
+            if variant.encoding == encoding:
+                return variant
+        return None
+
+
+class VariantStore:
+    """
+    On-disk store of compressed variants, keyed by the SHA-256 of the
+    original bytes so a changed file can never pick up a stale variant.
+
+    Args:
+        directory: Where to keep the .gz/.br files (created if missing)
+    """
+
+    EXTENSIONS = {'gzip': '.gz', 'br': '.br'}
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, digest, encoding):
+        return self.directory / (digest + self.EXTENSIONS[encoding])
+
+    def get_or_compress(self, body, encoding, digest=None):
+        """Return the compressed body, compressing and storing it on a miss"""
+        path = self.path_for(digest or hashlib.sha256(body).hexdigest(), encoding)
+        try:
+            return path.read_bytes()
+        except OSError:
+            pass
+        compressed = compress(body, encoding)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # a read-only store still serves what it already has
+        return compressed
+
+
+def build_variants(body, content_type, digest, cache_headers=(), store=None):
+    """
+    Build the compressed variants for a body.
+
+    Variants that would not be smaller than the original are dropped. Each
+    variant gets its own strong ETag, derived from the original's.
+
+    Args:
+        body: Original bytes
+        content_type: Content-Type of the original
+        digest: SHA-256 hex digest of body
+        cache_headers: Last-Modified/Cache-Control headers shared by all
+            representations
+        store: Optional VariantStore
+
+    Returns:
+        Tuple of Variant, most preferred encoding first
+    """
+    if len(body) < MIN_COMPRESS_SIZE or not is_compressible(content_type):
+        return ()
+    variants = []
+    for encoding in available_encodings():
+        if store:
+            compressed = store.get_or_compress(body, encoding, digest)
+        else:
+            compressed = compress(body, encoding)
+        if len(compressed) >= len(body):
+            continue
+        etag = make_etag(digest, encoding)
+        variants.append(Variant(encoding, compressed, (
+            ('Content-Type', content_type),
+            ('Content-Encoding', encoding),
+            ('Content-Length', str(len(compressed))),
+            ('Vary', 'Accept-Encoding'),
+            ('ETag', etag),
+        ) + tuple(cache_headers), etag))
+    return tuple(variants)
+
+
+def make_etag(digest, encoding=None):
+    """Build a strong ETag from a content digest and optional coding"""
+    tag = digest[:32]
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def make_file_etag(st):
+    """Build a strong ETag for a file-backed asset from its size and mtime"""
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def file_headers(url_path, content_type, st):
+    """
+    Build the identity headers for a file-backed asset.
+
+    Returns:
+        (headers, etag)
+    """
+    etag = make_file_etag(st)
+    return (
+        ('Content-Type', content_type),
+        ('Content-Length', str(st.st_size)),
+        ('Accept-Ranges', 'bytes'),
+        ('ETag', etag),
+        ('Last-Modified', email.utils.formatdate(st.st_mtime, usegmt=True)),
+        ('Cache-Control', cache_control_for(url_path, content_type)),
+    ), etag
+
+
+def url_path_for(web_dir, file_path):
+    """Return the URL path ('/sw.js') for a file inside web_dir"""
+    return '/' + Path(file_path).relative_to(web_dir).as_posix()
+
+
+def load_asset(web_dir, file_path, stat_result=None, compress=True, store=None,
+               max_cached_size=MAX_CACHED_SIZE):
+    """
+    Read a file into an Asset.
+
+    Args:
+        web_dir: Root directory being served
+        file_path: File to load
+        stat_result: os.stat() result if the caller already has one
+        compress: Build precompressed variants for compressible types
+        store: Optional VariantStore to reuse variants from
+        max_cached_size: Files larger than this stay on disk (body None)
+
+    Returns:
+        An Asset
+    """
+    url_path = url_path_for(web_dir, file_path)
+    content_type = guess_content_type(file_path)
+    st = stat_result or os.stat(file_path)
+    if st.st_size > max_cached_size:
+        headers, etag = file_headers(url_path, content_type, st)
+        return Asset(url_path, Path(file_path), None, headers,
+                     st.st_mtime_ns, st.st_size, etag)
+
+    with open(file_path, 'rb') as f:
+        body = f.read()
+    digest = hashlib.sha256(body).hexdigest()
+    cache_headers = (
+        ('Last-Modified', email.utils.formatdate(st.st_mtime, usegmt=True)),
+        ('Cache-Control', cache_control_for(url_path, content_type)),
+    )
+    variants = build_variants(body, content_type, digest, cache_headers, store) if compress else ()
+    etag = make_etag(digest)
+    headers = (
+        ('Content-Type', content_type),
+        ('Content-Length', str(len(body))),
+        ('Accept-Ranges', 'bytes'),
+    )
+    if variants:
+        headers += (('Vary', 'Accept-Encoding'),)
+    headers += (('ETag', etag),) + cache_headers
+    return Asset(url_path, Path(file_path), body, headers,
+                 st.st_mtime_ns, st.st_size, etag, variants)
+
+
+def scan_files(web_dir, exclude=()):
+    """
+    Walk web_dir and yield (path, stat_result) for every regular file.
+
+    Args:
+        web_dir: Directory to walk
+        exclude: Directory paths to skip (e.g. a precompress dir inside web_dir)
+    """
+    exclude = {os.path.normcase(os.path.abspath(path)) for path in exclude}
+    stack = [str(web_dir)]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if os.path.normcase(os.path.abspath(entry.path)) not in exclude:
+                        stack.append(entry.path)
+                elif entry.is_file():
+                    yield Path(entry.path), entry.stat()
+            except OSError:
+                continue
+
+
+class AssetCache:
+    """
+    Immutable URL path -> Asset table for a web directory.
+
+    Args:
+        web_dir: Directory to cache (the launcher's web/ folder)
+        compress: Build gzip/Brotli variants of compressible assets
+        precompress_dir: Optional directory to persist variants in
+        max_cached_size: Files larger than this are served from disk
+    """
+
+    def __init__(self, web_dir, compress=True, precompress_dir=None,
+                 max_cached_size=MAX_CACHED_SIZE):
+        self.web_dir = Path(web_dir).resolve()
+        self.compress = compress
+        self.max_cached_size = max_cached_size
+        self.store = VariantStore(precompress_dir) if compress and precompress_dir else None
+        self._table = types.MappingProxyType({})
+        self._refresh_lock = threading.Lock()
+        self.refresh()
+
+    @property
+    def table(self):
+        """The current read-only mapping of URL path to Asset"""
+        return self._table
+
+    def get(self, url_path):
+        """Return the Asset for a URL path, or None"""
+        return self._table.get(url_path)
+
+    def __len__(self):
+        return len(self._table)
+
+    def refresh(self):
+        """
+        Rescan web_dir and rebuild only the entries whose files changed.
+
+        Returns:
+            Sorted list of URL paths that were added, changed or removed
+        """
+        with self._refresh_lock:
+            old = self._table
+            new = {}
+            changed = []
+            exclude = [self.store.directory] if self.store else []
+            for file_path, st in scan_files(self.web_dir, exclude):
+                url_path = url_path_for(self.web_dir, file_path)
+                asset = old.get(url_path)
+                if asset is None or asset.mtime_ns != st.st_mtime_ns or asset.size != st.st_size:
+                    try:
+                        asset = load_asset(self.web_dir, file_path, st,
+                                           compress=self.compress, store=self.store,
+                                           max_cached_size=self.max_cached_size)
+                    except OSError:
+                        continue  # removed or unreadable mid-scan
+                    changed.append(url_path)
+                new[url_path] = asset
+            changed.extend(path for path in old if path not in new)
+            if changed:
+                self._table = types.MappingProxyType(new)
+            return sorted(changed)
+
+
+class CacheWatcher:
+    """
+    Background thread that keeps an AssetCache in sync with the disk.
+
+    Args:
+        cache: AssetCache to refresh
+        interval: Seconds between scans
+        on_change: Optional callback receiving the list of changed URL paths
+    """
+
+    def __init__(self, cache, interval=DEFAULT_WATCH_INTERVAL, on_change=None):
+        self.cache = cache
+        self.interval = interval
+        self.on_change = on_change
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start watching in a daemon thread"""
+        self._thread = threading.Thread(target=self._run, name='asset-cache-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop watching and wait for the thread to exit"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            changed = self.cache.refresh()
+            if changed and self.on_change:
+                self.on_change(changed)
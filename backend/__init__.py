@@ -0,0 +1,13 @@
+"""
+MobileBanks Ledger Backend
+==========================
+
+Stdlib-only transaction service: an SQLite ledger (ledger.py) and a
+JSON API over it (server.py). install.py finds this package and starts
+it with `python -m backend`; see __main__.py for the options.
+"""
+
+from .ledger import DuplicateTransaction, Ledger, ValidationError
+from .server import create_server
+
+__all__ = ['DuplicateTransaction', 'Ledger', 'ValidationError', 'create_server']
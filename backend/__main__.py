@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Run the ledger API.
+
+Usage:
+    python -m backend                         # port from $PORT, default 3000
+    python -m backend --port 3001 --db /tmp/ledger.sqlite3
+    python -m backend --import sumup-transactions.json
+    python -m backend --check                 # verify the running balance and exit
+    python -m backend --statements 2025-11 --out statements/ --accounts accounts/
+
+--import loads a JSON list of transactions, e.g. the file the web app's
+"Vie tapahtumat" button downloads, before the server starts. --check
+compares the stored per-day totals and report rollups with the
+transactions and exits with 1 on a mismatch; add --repair to
+rebuild them. --statements writes the period's PDF statement for --db,
+or for every *.sqlite3 ledger in --accounts, using a process pool, and
+exits.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from .export import generate_statements
+from .ledger import Ledger, ValidationError
+from .server import create_server, print_listening
+
+DEFAULT_DB = Path(__file__).parent / 'data' / 'ledger.sqlite3'
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(prog='python -m backend', description='MobileBanks ledger API')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '3000')),
+                        help='Port to listen on (default: $PORT or 3000)')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="Interface to bind (default: 127.0.0.1; '' or 0.0.0.0 exposes the API to the network)")
+    parser.add_argument('--allow-origin', dest='allowed_origins', action='append', default=[], metavar='ORIGIN',
+                        help='Also accept browser requests from ORIGIN, e.g. http://192.168.1.20:8000 (repeatable)')
+    parser.add_argument('--db', type=Path, default=Path(os.environ.get('LEDGER_DB', DEFAULT_DB)),
+                        help=f'SQLite database file (default: $LEDGER_DB or {DEFAULT_DB})')
+    parser.add_argument('--import', dest='import_file', type=Path, metavar='FILE',
+                        help='Load transactions from a JSON list before serving')
+    parser.add_argument('--check', action='store_true',
+                        help='Verify the per-day balance totals and report rollups and exit')
+    parser.add_argument('--repair', action='store_true', help='With --check: rebuild totals that do not match')
+    parser.add_argument('--statements', metavar='PERIOD',
+                        help='Write PDF statements for a year, month or day (2025, 2025-11, ...) and exit')
+    parser.add_argument('--accounts', type=Path, metavar='DIR',
+                        help='With --statements: one statement per *.sqlite3 ledger in DIR instead of --db')
+    parser.add_argument('--out', type=Path, default=Path('statements'),
+                        help='With --statements: output directory (default: statements)')
+    parser.add_argument('--workers', type=int, help='With --statements: worker processes (default: CPU count)')
+    parser.add_argument('--quiet', action='store_true', help='Do not log requests')
+    return parser.parse_args()
+
+
+def import_transactions(db_path, path):
+    ledger = Ledger(db_path)
+    try:
+        transactions = json.loads(path.read_text(encoding='utf-8'))
+        if not isinstance(transactions, list):
+            raise ValidationError("the file must contain a JSON list")
+        return ledger.add_many(transactions)
+    finally:
+        ledger.close()
+
+
+def check_balances(db_path, repair):
+    ledger = Ledger(db_path)
+    try:
+        problems = ledger.check_balances()
+        for problem in problems:
+            print(problem)
+        if problems and repair:
+            ledger.rebuild_balances()
+            print(f"Rebuilt the daily totals ({len(problems)} mismatches)")
+            return 0
+        print(f"{len(problems)} mismatches")
+        return 1 if problems else 0
+    finally:
+        ledger.close()
+
+
+def write_statements(args):
+    db_paths = sorted(args.accounts.glob('*.sqlite3')) if args.accounts else [args.db]
+    try:
+        written = generate_statements(db_paths, args.statements, args.out, args.workers)
+    except (OSError, ValueError) as e:
+        print(f"Statements failed: {e}", file=sys.stderr)
+        return 1
+    for path, size in written:
+        print(f"{path} ({size} bytes)")
+    print(f"Wrote {len(written)} statements to {args.out}")
+    return 0
+
+
+def main():
+    args = parse_arguments()
+    if args.import_file:
+        try:
+            count = import_transactions(args.db, args.import_file)
+        except (OSError, ValueError) as e:
+            # ValidationError, DuplicateTransaction and bad JSON are ValueErrors
+            print(f"Import failed: {e}", file=sys.stderr)
+            return 1
+        print(f"Imported {count} transactions into {args.db}")
+
+    if args.check:
+        return check_balances(args.db, args.repair)
+
+    if args.statements:
+        return write_statements(args)
+
+    server = create_server(args.db, port=args.port, host=args.host, quiet=args.quiet,
+                           allowed_origins=args.allowed_origins)
+    print_listening(server)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Running Balance Engine
+======================
+
+The apps compute the closing balance as opening balance + the sum of
+every transaction, rescanning the whole list after each change. Here
+the ledger keeps one row of totals per calendar day (the daily_totals
+table, written in the same SQLite transaction as the transactions
+themselves) and mirrors it in Fenwick trees indexed by day:
+
+    balance at a date       prefix sum up to that day        O(log days)
+    totals for a period     difference of two prefix sums    O(log days)
+    add / update / delete   point update of one or two days  O(log days)
+
+Sums are integer cents. DailyBalances is the in-memory half; Ledger
+owns one and feeds it the per-day deltas of every committed write.
+DailyBalances does no locking of its own: apply() updates the trees in
+place, so the owner must keep reads from overlapping it.
+"""
+
+import datetime
+
+# Per-day values kept for every day: net cents, incoming cents, row count
+METRICS = ('net_cents', 'inflow_cents', 'count')
+INITIAL_DAYS = 1024
+
+
+def day_number(date):
+    """
+    Day index of an ISO date or timestamp (only the YYYY-MM-DD part counts).
+
+    Raises:
+        ValueError: date does not start with a valid ISO date
+    """
+    if not isinstance(date, str):
+        raise ValueError("date must be an ISO date string")
+    return datetime.date.fromisoformat(date[:10]).toordinal()
+
+
+def day_string(number):
+    return datetime.date.fromordinal(number).isoformat()
+
+
+def day_delta(amount_cents, sign=1):
+    """(net, inflow, count) contribution of one transaction; sign=-1 removes it"""
+    return (sign * amount_cents, sign * max(amount_cents, 0), sign)
+
+
+class FenwickTree:
+    """
+    Binary indexed tree over a fixed number of integer slots.
+
+    Args:
+        values: Initial slot values; the tree has len(values) slots
+    """
+
+    __slots__ = ('tree',)
+
+    def __init__(self, values):
+        # O(n) build: push each node's sum into its parent once
+        tree = [0] + list(values)
+        size = len(tree)
+        for index in range(1, size):
+            parent = index + (index & -index)
+            if parent < size:
+                tree[parent] += tree[index]
+        self.tree = tree
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    def add(self, slot, delta):
+        tree = self.tree
+        index = slot + 1
+        size = len(tree)
+        while index < size:
+            tree[index] += delta
+            index += index & -index
+
+    def prefix(self, slot):
+        """Sum of slots 0..slot inclusive (0 for slot < 0)"""
+        tree = self.tree
+        index = min(slot + 1, len(tree) - 1)
+        total = 0
+        while index > 0:
+            total += tree[index]
+            index -= index & -index
+        return total
+
+
+class DailyBalances:
+    """
+    Per-day totals with O(log days) prefix sums.
+
+    The trees cover a contiguous range of days starting at `first_day`;
+    a write outside the range rebuilds them over a range twice as wide,
+    so the amortized cost per write stays logarithmic.
+
+    Args:
+        daily_rows: Iterable of (YYYY-MM-DD, net_cents, inflow_cents, count)
+    """
+
+    def __init__(self, daily_rows=()):
+        self.days = {}
+        for day, net_cents, inflow_cents, count in daily_rows:
+            self.days[day_number(day)] = [net_cents, inflow_cents, count]
+        if self.days:
+            first, last = min(self.days), max(self.days)
+        else:
+            first = last = datetime.date.today().toordinal()
+        self._build(first, max(last - first + 1, INITIAL_DAYS))
+
+    def _build(self, first_day, span):
+        columns = [[0] * span for _ in METRICS]
+        for number, values in self.days.items():
+            for column, value in zip(columns, values):
+                column[number - first_day] = value
+        trees = [FenwickTree(column) for column in columns]
+        # The offset and the trees change together, once the trees are built
+        self.first_day, self.span, self.trees = first_day, span, trees
+
+    def _ensure_covers(self, number):
+        if self.first_day <= number < self.first_day + self.span:
+            return
+        first = min(number, self.first_day)
+        last = max(number, self.first_day + self.span - 1)
+        self._build(first, max(2 * self.span, last - first + 1))
+
+    def apply(self, day, delta):
+        """
+        Add a (net, inflow, count) delta to one day.
+
+        Args:
+            day: ISO date or timestamp
+            delta: Tuple from day_delta(), or a sum of them
+        """
+        number = day_number(day)
+        self._ensure_covers(number)
+        values = self.days.setdefault(number, [0] * len(METRICS))
+        slot = number - self.first_day
+        for index, (tree, value) in enumerate(zip(self.trees, delta)):
+            if value:
+                values[index] += value
+                tree.add(slot, value)
+        if not values[2]:
+            del self.days[number]
+
+    def _prefix(self, number, metric=0):
+        return self.trees[metric].prefix(number - self.first_day)
+
+    def balance_at(self, date=None):
+        """Net cents of every transaction on or before date (all of them for None)"""
+        if date is None:
+            return self._prefix(self.first_day + self.span)
+        return self._prefix(day_number(date))
+
+    def totals(self, date_from=None, date_to=None):
+        """
+        Totals over an inclusive date range; None leaves that end open.
+
+        Returns:
+            Dict of net_cents, inflow_cents, outflow_cents and count
+        """
+        start = day_number(date_from) - 1 if date_from else self.first_day - 1
+        end = day_number(date_to) if date_to else self.first_day + self.span
+        net, inflow, count = (
+            self._prefix(end, metric) - self._prefix(start, metric) if end > start else 0
+            for metric in range(len(METRICS))
+        )
+        return {'net_cents': net, 'inflow_cents': inflow, 'outflow_cents': inflow - net, 'count': count}
+
+    def daily(self):
+        """Dict of YYYY-MM-DD -> (net_cents, inflow_cents, count) read back from the trees"""
+        result = {}
+        for number in sorted(self.days):
+            result[day_string(number)] = tuple(
+                self._prefix(number, metric) - self._prefix(number - 1, metric)
+                for metric in range(len(METRICS))
+            )
+        return result
+
+
+def compare_daily(label_a, daily_a, label_b, daily_b):
+    """
+    Describe every day whose totals differ between two daily() style dicts.
+
+    Returns:
+        List of human-readable mismatch lines (empty when they agree)
+    """
+    problems = []
+    for day in sorted(set(daily_a) | set(daily_b)):
+        a = tuple(daily_a.get(day, (0, 0, 0)))
+        b = tuple(daily_b.get(day, (0, 0, 0)))
+        if a != b:
+            problems.append(f"{day}: {label_a} {a} != {label_b} {b} (net_cents, inflow_cents, count)")
+    return problems
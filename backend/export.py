@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Streaming Statement Export
+==========================
+
+Turns the ledger into tiliote-*.csv, tiliote-*.xlsx and tiliote-*.pdf
+files, and single transactions into kuitti-<id>.pdf receipts, as a stream
+of byte chunks. Rows are read with Ledger.iter_batches(), one keyset
+query per batch, and every chunk is handed to the HTTP layer as soon as
+it is encoded. Memory stays at one batch plus one chunk whatever the
+statement length, and the first chunk (the header row) goes out before
+the first query runs.
+
+XLSX is a zip of XML parts. zipfile writes to a sink without seek() by
+appending data descriptors, so the worksheet is compressed and emitted
+while it is being generated. Cells use inline strings, so no shared
+string table has to be collected first. PDF pages come from backend.pdf
+the same way, one page per chunk.
+
+The name after tiliote- selects the period: tiliote-2025.csv,
+tiliote-2025-11.xlsx and tiliote-2025-11-08.csv cover a year, month or
+day. Any other label (e.g. tiliote-kaikki.csv) covers every transaction.
+Explicit from/to parameters take precedence over the name.
+"""
+
+import calendar
+import concurrent.futures
+import csv
+import datetime
+import io
+import multiprocessing
+import os
+import re
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from . import pdf
+from .balance import day_number
+from .ledger import FILTER_FIELDS, STATUS_ALIASES, Ledger, ValidationError
+
+EXPORT_NAME = re.compile(r'tiliote-(?P<label>[\w.-]+)\.(?P<format>csv|xlsx|pdf)')
+RECEIPT_NAME = re.compile(r'kuitti-(?P<id>[\w.-]+)\.pdf')
+PERIOD_LABEL = re.compile(r'(?P<year>\d{4})(?:-(?P<month>\d{2})(?:-(?P<day>\d{2}))?)?')
+EXPORT_PARAMS = ('from', 'to') + FILTER_FIELDS
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+
+CHUNK_SIZE = 64 * 1024  # encoded bytes collected before a chunk is handed out
+# Zip64 headers are only written for statements that could pass 4 GiB;
+# some Excel versions ask to repair small files that carry them
+ZIP64_ROW_THRESHOLD = 4_000_000
+
+COLUMN_TITLES = ('Päivämäärä', 'Kuvaus', 'Saaja', 'IBAN', 'Kategoria', 'Tila', 'Tyyppi', 'Summa (EUR)')
+COLUMN_WIDTHS = (12, 36, 24, 24, 16, 10, 10, 14)
+STATUS_LABELS = {status: label for label, status in STATUS_ALIASES.items()}
+TYPE_LABELS = {'debit': 'Veloitus', 'credit': 'Hyvitys'}
+
+# Spreadsheets run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+EXCEL_EPOCH = datetime.date(1899, 12, 30).toordinal()
+
+
+def label_range(label):
+    """
+    Date range named by a file label.
+
+    Returns:
+        (date_from, date_to) as ISO dates, or (None, None) for labels
+        that are not a year, month or day
+
+    Raises:
+        ValidationError: The label looks like a date but is not one
+    """
+    match = PERIOD_LABEL.fullmatch(label)
+    if not match:
+        return None, None
+    year, month, day = match.group('year', 'month', 'day')
+    try:
+        if day:
+            date = datetime.date(int(year), int(month), int(day)).isoformat()
+            return date, date
+        if month:
+            last = calendar.monthrange(int(year), int(month))[1]
+            return f'{year}-{month}-01', f'{year}-{month}-{last:02d}'
+    except ValueError:
+        raise ValidationError(f"no such date: {label}") from None
+    return f'{year}-01-01', f'{year}-12-31'
+
+
+def statement_row(transaction):
+    """Text columns of one transaction in COLUMN_TITLES order, amount last"""
+    return (
+        transaction['date'][:10],
+        transaction['title'],
+        transaction.get('recipient', ''),
+        transaction.get('iban', ''),
+        transaction['category'],
+        STATUS_LABELS.get(transaction['status'], transaction['status']),
+        TYPE_LABELS.get(transaction['type'], transaction['type']),
+        transaction['amount'],
+    )
+
+
+def safe_text(value):
+    """Keep user text from being run as a spreadsheet formula"""
+    return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+
+
+def csv_chunks(batches):
+    """
+    Encode statement rows as CSV for Finnish spreadsheets: UTF-8 with a
+    byte order mark, ';' separators and decimal commas.
+
+    Args:
+        batches: Iterable of lists of Transaction dicts
+
+    Yields:
+        bytes chunks of about CHUNK_SIZE
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', lineterminator='\r\n')
+    writer.writerow(COLUMN_TITLES)
+    yield ('﻿' + buffer.getvalue()).encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+    for batch in batches:
+        writer.writerows(
+            [row[0]] + [safe_text(value) for value in row[1:7]] + [f'{row[7]:.2f}'.replace('.', ',')]
+            for row in map(statement_row, batch)
+        )
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class ChunkSink:
+    """Write-only file object that collects what zipfile writes"""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts.clear()
+        self.size = 0
+        return data
+
+
+def xml_text(value):
+    return escape(XML_INVALID.sub('', value))
+
+
+def inline_cell(value):
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{xml_text(value)}</t></is></c>' if value else '<c/>'
+
+
+def sheet_row(row):
+    # Styles from XLSX_STYLES: 1 = date, 2 = euro amount
+    return (f'<row><c s="1"><v>{day_number(row[0]) - EXCEL_EPOCH}</v></c>'
+            + ''.join(inline_cell(value) for value in row[1:7])
+            + f'<c s="2"><v>{row[7]:.2f}</v></c></row>')
+
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Tiliote" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '</styleSheet>'
+)
+
+
+def sheet_head():
+    columns = ''.join(f'<col min="{index}" max="{index}" width="{width}" customWidth="1"/>'
+                      for index, width in enumerate(COLUMN_WIDTHS, start=1))
+    titles = ''.join(f'<c s="3" t="inlineStr"><is><t>{xml_text(title)}</t></is></c>'
+                     for title in COLUMN_TITLES)
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/>'
+        f'</sheetView></sheetViews><cols>{columns}</cols><sheetData><row>{titles}</row>'
+    )
+
+
+def xlsx_chunks(batches, zip64=False):
+    """
+    Encode statement rows as a one-sheet XLSX workbook.
+
+    Args:
+        batches: Iterable of lists of Transaction dicts
+        zip64: Write Zip64 headers for the worksheet (needed past 4 GiB)
+
+    Yields:
+        bytes chunks of about CHUNK_SIZE
+    """
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for name, text in (('[Content_Types].xml', XLSX_CONTENT_TYPES), ('_rels/.rels', XLSX_ROOT_RELS),
+                           ('xl/workbook.xml', XLSX_WORKBOOK), ('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS),
+                           ('xl/styles.xml', XLSX_STYLES)):
+            archive.writestr(name, text)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=zip64) as sheet:
+            sheet.write(sheet_head().encode('utf-8'))
+            yield sink.take()
+            for batch in batches:
+                sheet.write(''.join(sheet_row(row) for row in map(statement_row, batch)).encode('utf-8'))
+                if sink.size >= CHUNK_SIZE:
+                    yield sink.take()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.take()
+
+
+def period_text(date_from, date_to):
+    """Statement period as printed on the PDF, e.g. '1.11.2025 – 30.11.2025'"""
+    if not date_from and not date_to:
+        return 'kaikki tapahtumat'
+    return f"{pdf.format_date(date_from) if date_from else ''} – {pdf.format_date(date_to) if date_to else ''}"
+
+
+def statement_summary(ledger, date_from, date_to):
+    """Opening and closing balance and money in/out for the PDF summary, summed from daily_totals"""
+    totals = ledger.sum_daily_totals(date_from, date_to)
+    opening = 0
+    if date_from:
+        day_before = datetime.date.fromordinal(day_number(date_from) - 1).isoformat()
+        opening = ledger.sum_daily_totals(None, day_before)['net_cents']
+    return {
+        'opening': opening / 100,
+        'inflow': totals['inflow_cents'] / 100,
+        'outflow': totals['outflow_cents'] / 100,
+        'closing': (opening + totals['net_cents']) / 100,
+        'count': totals['count'],
+    }
+
+
+def open_export(ledger, name, params):
+    """
+    Prepare a statement or receipt download.
+
+    Everything that can be rejected is checked here, before any bytes
+    are sent; the returned generator only reads and encodes.
+
+    Args:
+        ledger: backend.ledger.Ledger
+        name: File name, e.g. tiliote-2025-11.xlsx or kuitti-42.pdf
+        params: Dict of query parameter -> value (or None) for from, to,
+            type, category and status
+
+    Returns:
+        (filename, content_type, chunk generator), or None if name is not
+        an export file name or the receipt's transaction does not exist
+
+    Raises:
+        ValidationError: Bad period label, date or filter
+    """
+    match = RECEIPT_NAME.fullmatch(name)
+    if match:
+        transaction = ledger.get(match.group('id'))
+        if transaction is None:
+            return None
+        return name, CONTENT_TYPES['pdf'], pdf.receipt_chunks(transaction)
+    match = EXPORT_NAME.fullmatch(name)
+    if not match:
+        return None
+    date_from, date_to = label_range(match.group('label'))
+    date_from = params.get('from') or date_from
+    date_to = params.get('to') or date_to
+    for date in (date_from, date_to):
+        if date is not None:
+            try:
+                day_number(date)
+            except ValueError:
+                raise ValidationError("from and to must be ISO dates (YYYY-MM-DD)") from None
+    filters = {field: params.get(field) for field in FILTER_FIELDS}
+    batches = ledger.iter_batches(date_from=date_from, date_to=date_to, **filters)
+    if match.group('format') == 'csv':
+        chunks = csv_chunks(batches)
+    elif match.group('format') == 'pdf':
+        # Balances only add up for the whole account, not a filtered view
+        summary = None if any(filters.values()) else statement_summary(ledger, date_from, date_to)
+        chunks = pdf.statement_chunks(batches, period_text(date_from, date_to), summary)
+    else:
+        # The period's row count bounds the filtered one from above
+        rows = ledger.sum_daily_totals(date_from, date_to)['count']
+        chunks = xlsx_chunks(batches, zip64=rows > ZIP64_ROW_THRESHOLD)
+    return name, CONTENT_TYPES[match.group('format')], chunks
+
+
+def content_disposition(filename):
+    return f'attachment; filename="{filename}"'
+
+
+def write_statement(db_path, label, out_dir):
+    """
+    Write one account's PDF statement to out_dir.
+
+    The file is streamed to a temporary name and renamed when complete,
+    so a crashed run never leaves a truncated statement behind.
+
+    Returns:
+        (path, size in bytes)
+    """
+    db_path = Path(db_path)
+    path = Path(out_dir) / f'{db_path.stem}-tiliote-{label}.pdf'
+    partial = path.with_name(path.name + '.part')
+    ledger = Ledger(db_path)
+    try:
+        _, _, chunks = open_export(ledger, f'tiliote-{label}.pdf', {})
+        size = 0
+        with open(partial, 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+                size += len(chunk)
+        os.replace(partial, path)
+    finally:
+        ledger.close()
+        if partial.exists():
+            partial.unlink()
+    return path, size
+
+
+def generate_statements(db_paths, label, out_dir, workers=None):
+    """
+    Write the period's PDF statement for every ledger database, in parallel.
+
+    Each account is one job in a process pool, so month-end runs use every
+    core. Workers build the shared PDF objects (fonts, logo, header) once
+    in their initializer and reuse them for every statement they write.
+
+    Args:
+        db_paths: Ledger database files, one per account
+        label: Period label as in the file names (2025-11, 2025, ...)
+        out_dir: Directory for the PDFs (created if missing)
+        workers: Process count (default: CPU count); 1 runs in this process
+
+    Returns:
+        List of (path, size in bytes) in db_paths order
+
+    Raises:
+        ValidationError: label is not a valid period
+    """
+    label_range(label)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    db_paths = list(db_paths)
+    if workers == 1 or len(db_paths) <= 1:
+        return [write_statement(db_path, label, out_dir) for db_path in db_paths]
+    # spawn: the parent may hold SQLite connections and server threads
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(workers or os.cpu_count() or 1, len(db_paths)),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=pdf.warm_templates) as pool:
+        futures = [pool.submit(write_statement, db_path, label, out_dir) for db_path in db_paths]
+        return [future.result() for future in futures]
@@ -0,0 +1,723 @@
+#!/usr/bin/env python3
+"""
+Transaction Ledger Store
+========================
+
+Keeps the transactions of types.ts (`Transaction`) in SQLite instead of
+one JSON blob in localStorage. Every write touches one row; reads page
+through the ledger with keyset pagination, so fetching page 10 000 of a
+million-row ledger costs the same index seek as fetching page 1.
+
+The database runs in WAL mode: readers never wait for the writer, and a
+commit is an append to the log rather than a rewrite of the file.
+
+Rows are ordered newest first by (date, seq), where seq is the SQLite
+rowid. Indexes on (type, date, seq), (category, date, seq) and
+(status, date, seq) let the filtered listings seek the same way.
+Amounts are stored as integer cents so sums never drift.
+
+Every write also updates the per-day totals that back the running
+balance (see balance.py) and the month/quarter/year rollups behind the
+reports (see reports.py), in the same database transaction.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+import sqlite3
+import threading
+import uuid
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from . import reports
+from .balance import DailyBalances, compare_daily, day_delta, day_number
+from .reports import add_report_delta, report_delta
+
+TYPES = ('debit', 'credit')
+STATUSES = ('completed', 'pending', 'failed')
+# The web app (web/index.html) stores Finnish status labels
+STATUS_ALIASES = {'Valmis': 'completed', 'Odottaa': 'pending', 'Epäonnistui': 'failed'}
+FILTER_FIELDS = ('type', 'category', 'status')
+OPTIONAL_FIELDS = ('recipient', 'iban')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 2000
+BUSY_TIMEOUT_MS = 5000
+# Keeps amounts, and sums of many of them, inside SQLite's 64-bit integers
+MAX_AMOUNT_CENTS = 10 ** 14
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    amount_cents INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    status TEXT NOT NULL,
+    type TEXT NOT NULL,
+    recipient TEXT,
+    iban TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_by_date ON transactions (date, seq);
+CREATE INDEX IF NOT EXISTS transactions_by_type ON transactions (type, date, seq);
+CREATE INDEX IF NOT EXISTS transactions_by_category ON transactions (category, date, seq);
+CREATE INDEX IF NOT EXISTS transactions_by_status ON transactions (status, date, seq);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT PRIMARY KEY,
+    net_cents INTEGER NOT NULL,
+    inflow_cents INTEGER NOT NULL,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS period_totals (
+    period TEXT NOT NULL,
+    category TEXT NOT NULL,
+    inflow_cents INTEGER NOT NULL,
+    outflow_cents INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (period, category)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ledger_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO ledger_state (id, generation) VALUES (1, 0);
+"""
+# PRAGMA user_version; 1 added daily_totals, 2 period_totals
+SCHEMA_VERSION = 2
+
+DAILY_TOTALS_QUERY = """
+SELECT substr(date, 1, 10) AS day, SUM(amount_cents), SUM(MAX(amount_cents, 0)), COUNT(*)
+FROM transactions GROUP BY day ORDER BY day
+"""
+
+COLUMNS = ('seq', 'id', 'title', 'amount_cents', 'date', 'category', 'status', 'type',
+           'recipient', 'iban')
+
+
+class ValidationError(ValueError):
+    """A transaction field is missing or has an invalid value"""
+
+
+class DuplicateTransaction(ValueError):
+    """A transaction with the same id already exists"""
+
+
+def to_cents(amount):
+    """Convert a JSON number (euros) to integer cents without float rounding errors"""
+    if isinstance(amount, bool) or not isinstance(amount, (int, float, str)):
+        raise ValidationError("amount must be a number")
+    try:
+        cents = Decimal(str(amount)) * 100
+    except InvalidOperation:
+        raise ValidationError("amount must be a number") from None
+    if not cents.is_finite():
+        raise ValidationError("amount must be a number")
+    if abs(cents) > MAX_AMOUNT_CENTS:
+        raise ValidationError(f"amount must be at most {MAX_AMOUNT_CENTS // 100} in absolute value")
+    return int(cents.quantize(Decimal(1)))
+
+
+def normalize(transaction, partial=False):
+    """
+    Validate a Transaction dict and convert it to a row dict.
+
+    Args:
+        transaction: Dict in the shape of types.ts Transaction; id is
+            optional and generated when missing
+        partial: Only validate the fields present (for updates)
+
+    Returns:
+        Dict of column -> value
+
+    Raises:
+        ValidationError: A field is missing or invalid
+    """
+    if not isinstance(transaction, dict):
+        raise ValidationError("transaction must be a JSON object")
+    row = {}
+    if not partial:
+        row['id'] = str(transaction.get('id') or uuid.uuid4())
+    for field in ('title', 'date', 'category'):
+        if field in transaction or not partial:
+            value = transaction.get(field)
+            if not isinstance(value, str) or not value:
+                raise ValidationError(f"{field} must be a non-empty string")
+            row[field] = value
+    if 'date' in row:
+        try:
+            day_number(row['date'])
+        except ValueError:
+            raise ValidationError("date must start with an ISO date (YYYY-MM-DD)") from None
+    if 'amount' in transaction or not partial:
+        row['amount_cents'] = to_cents(transaction.get('amount'))
+    if 'type' in transaction or not partial:
+        if transaction.get('type') not in TYPES:
+            raise ValidationError(f"type must be one of {', '.join(TYPES)}")
+        row['type'] = transaction['type']
+    if 'status' in transaction or not partial:
+        status = STATUS_ALIASES.get(transaction.get('status'), transaction.get('status'))
+        if status not in STATUSES:
+            raise ValidationError(f"status must be one of {', '.join(STATUSES)}")
+        row['status'] = status
+    for field in OPTIONAL_FIELDS:
+        if field in transaction:
+            value = transaction[field]
+            if value is not None and not isinstance(value, str):
+                raise ValidationError(f"{field} must be a string")
+            row[field] = value or None
+    return row
+
+
+def to_transaction(row):
+    """Convert a database row (tuple in COLUMNS order) to a Transaction dict"""
+    values = dict(zip(COLUMNS, row))
+    transaction = {
+        'id': values['id'],
+        'title': values['title'],
+        'amount': values['amount_cents'] / 100,
+        'date': values['date'],
+        'category': values['category'],
+        'status': values['status'],
+        'type': values['type'],
+    }
+    for field in OPTIONAL_FIELDS:
+        if values[field] is not None:
+            transaction[field] = values[field]
+    return transaction
+
+
+def encode_cursor(date, seq):
+    return base64.urlsafe_b64encode(json.dumps([date, seq]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Raises:
+        ValidationError: The cursor was not made by encode_cursor()
+    """
+    try:
+        date, seq = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValidationError("invalid cursor") from None
+    if not isinstance(date, str) or not isinstance(seq, int):
+        raise ValidationError("invalid cursor")
+    return date, seq
+
+
+def add_delta(deltas, date, delta):
+    """Accumulate a (net, inflow, count) delta into a dict keyed by YYYY-MM-DD"""
+    day = date[:10]
+    current = deltas.get(day)
+    deltas[day] = delta if current is None else tuple(a + b for a, b in zip(current, delta))
+
+
+class Ledger:
+    """
+    SQLite-backed transaction store, safe to share between threads.
+
+    Each thread gets its own connection; SQLite in WAL mode lets them
+    read concurrently while one writes. The running balance lives in
+    memory (self.balances) and is loaded from daily_totals on open.
+
+    Several Ledgers (or processes) may share a database: every write
+    transaction increments ledger_state.generation. A Ledger applies its
+    own writes to the trees when the new generation directly follows the
+    one it loaded, and reloads them from daily_totals whenever it sees a
+    generation it did not write. check_balances() detects drift and
+    rebuild_balances() repairs it.
+
+    Args:
+        path: Database file; parent directories are created
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        # Keeps balance updates in commit order
+        self._write_lock = threading.Lock()
+        # Held while the trees are updated in place or read; never while
+        # waiting on SQLite, so reads do not queue behind a commit
+        self._balances_lock = threading.Lock()
+        connection = self._connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        version = connection.execute('PRAGMA user_version').fetchone()[0]
+        if version < SCHEMA_VERSION:
+            with connection:
+                if version < 1:
+                    self._rebuild_daily_totals(connection)
+                if version < 2:
+                    self._rebuild_period_totals(connection)
+                self._next_generation(connection)
+                connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self._generation, self.balances = self._load_balances(connection)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000,
+                                         check_same_thread=False)
+            # WAL keeps the database consistent at NORMAL; only the last
+            # commits can be lost on power failure, never corrupted
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def release_connection(self):
+        """
+        Close the calling thread's connection, if it has one.
+
+        Servers that start a thread per request call this when the thread
+        finishes; otherwise every finished thread would leave an open
+        connection (and its file descriptors) behind until close().
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            return
+        self._local.connection = None
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+        connection.close()
+
+    def close(self):
+        """Close every thread's connection"""
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def add(self, transaction):
+        """
+        Insert one transaction.
+
+        Returns:
+            The stored Transaction dict (with its id)
+
+        Raises:
+            ValidationError: Invalid fields
+            DuplicateTransaction: The id is already taken
+        """
+        row = normalize(transaction)
+        self._insert([row])
+        return self.get(row['id'])
+
+    def add_many(self, transactions):
+        """
+        Insert many transactions in one database transaction.
+
+        Returns:
+            Number of rows inserted
+
+        Raises:
+            ValidationError, DuplicateTransaction: Nothing is inserted
+        """
+        rows = [normalize(transaction) for transaction in transactions]
+        self._insert(rows)
+        return len(rows)
+
+    def _insert(self, rows):
+        deltas, report_deltas = {}, {}
+        for row in rows:
+            add_delta(deltas, row['date'], day_delta(row['amount_cents']))
+            add_report_delta(report_deltas, row['date'], row['category'], report_delta(row['amount_cents']))
+        connection = self._connection()
+        with self._write_lock:
+            try:
+                with connection:
+                    connection.executemany(
+                        'INSERT INTO transactions (id, title, amount_cents, date, category, status, type, '
+                        'recipient, iban) VALUES (:id, :title, :amount_cents, :date, :category, :status, '
+                        ':type, :recipient, :iban)',
+                        [dict({'recipient': None, 'iban': None}, **row) for row in rows]
+                    )
+                    self._write_daily_totals(connection, deltas)
+                    self._write_period_totals(connection, report_deltas)
+                    generation = self._next_generation(connection)
+            except sqlite3.IntegrityError:
+                raise DuplicateTransaction("a transaction with this id already exists") from None
+            self._apply_deltas(connection, deltas, generation)
+
+    @staticmethod
+    def _write_daily_totals(connection, deltas):
+        connection.executemany(
+            'INSERT INTO daily_totals (day, net_cents, inflow_cents, count) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (day) DO UPDATE SET net_cents = net_cents + excluded.net_cents, '
+            'inflow_cents = inflow_cents + excluded.inflow_cents, count = count + excluded.count',
+            [(day,) + tuple(delta) for day, delta in deltas.items()]
+        )
+        connection.executemany('DELETE FROM daily_totals WHERE day = ? AND count = 0',
+                               [(day,) for day in deltas])
+
+    @staticmethod
+    def _write_period_totals(connection, deltas):
+        connection.executemany(
+            'INSERT INTO period_totals (period, category, inflow_cents, outflow_cents, count) '
+            'VALUES (?, ?, ?, ?, ?) ON CONFLICT (period, category) DO UPDATE SET '
+            'inflow_cents = inflow_cents + excluded.inflow_cents, '
+            'outflow_cents = outflow_cents + excluded.outflow_cents, count = count + excluded.count',
+            [key + tuple(delta) for key, delta in deltas.items()]
+        )
+        connection.executemany('DELETE FROM period_totals WHERE period = ? AND category = ? AND count = 0',
+                               list(deltas))
+
+    @staticmethod
+    def _next_generation(connection):
+        """Count a write transaction; returns the new generation"""
+        connection.execute('UPDATE ledger_state SET generation = generation + 1')
+        return connection.execute('SELECT generation FROM ledger_state').fetchone()[0]
+
+    @staticmethod
+    def _load_balances(connection):
+        """(generation, DailyBalances) read from one consistent snapshot"""
+        connection.execute('BEGIN')
+        try:
+            generation = connection.execute('SELECT generation FROM ledger_state').fetchone()[0]
+            return generation, DailyBalances(connection.execute('SELECT * FROM daily_totals'))
+        finally:
+            connection.execute('COMMIT')
+
+    def _reload_balances(self, connection):
+        """Replace the trees with ones loaded from daily_totals; caller holds _write_lock"""
+        generation, balances = self._load_balances(connection)
+        with self._balances_lock:
+            self._generation, self.balances = generation, balances
+
+    def _apply_deltas(self, connection, deltas, generation):
+        """Apply a committed write's deltas, or reload if another Ledger wrote in between"""
+        if generation == self._generation + 1:
+            with self._balances_lock:
+                for day, delta in deltas.items():
+                    self.balances.apply(day, delta)
+                self._generation = generation
+        else:
+            self._reload_balances(connection)
+
+    def _read_balances(self, read):
+        """
+        Call read(balances) on the trees, reloading them first if another
+        Ledger has written since they were loaded.
+        """
+        connection = self._connection()
+        generation = connection.execute('SELECT generation FROM ledger_state').fetchone()[0]
+        if generation != self._generation:
+            with self._write_lock:
+                if generation > self._generation:
+                    self._reload_balances(connection)
+        with self._balances_lock:
+            return read(self.balances)
+
+    def _old_amount(self, connection, transaction_id):
+        """(date, amount_cents, category) of a stored transaction, or None"""
+        return connection.execute(
+            'SELECT date, amount_cents, category FROM transactions WHERE id = ?', (transaction_id,)
+        ).fetchone()
+
+    def get(self, transaction_id):
+        """Return the Transaction dict, or None if there is no such id"""
+        row = self._connection().execute(
+            f'SELECT {", ".join(COLUMNS)} FROM transactions WHERE id = ?', (transaction_id,)
+        ).fetchone()
+        return to_transaction(row) if row else None
+
+    def update(self, transaction_id, changes):
+        """
+        Change some fields of a transaction (the id cannot change).
+
+        Returns:
+            The updated Transaction dict, or None if there is no such id
+
+        Raises:
+            ValidationError: Invalid fields
+        """
+        row = normalize({key: value for key, value in changes.items() if key != 'id'}, partial=True)
+        if row:
+            connection = self._connection()
+            with self._write_lock:
+                with connection:
+                    old = self._old_amount(connection, transaction_id)
+                    if old is None:
+                        return None
+                    connection.execute(
+                        f'UPDATE transactions SET {", ".join(f"{column} = :{column}" for column in row)} '
+                        'WHERE id = :transaction_id',
+                        dict(row, transaction_id=transaction_id)
+                    )
+                    deltas, report_deltas = {}, {}
+                    old_date, old_cents, old_category = old
+                    new_date = row.get('date', old_date)
+                    new_cents = row.get('amount_cents', old_cents)
+                    if 'date' in row or 'amount_cents' in row:
+                        add_delta(deltas, old_date, day_delta(old_cents, -1))
+                        add_delta(deltas, new_date, day_delta(new_cents))
+                        self._write_daily_totals(connection, deltas)
+                    if deltas or 'category' in row:
+                        add_report_delta(report_deltas, old_date, old_category, report_delta(old_cents, -1))
+                        add_report_delta(report_deltas, new_date, row.get('category', old_category),
+                                         report_delta(new_cents))
+                        self._write_period_totals(connection, report_deltas)
+                    generation = self._next_generation(connection)
+                self._apply_deltas(connection, deltas, generation)
+        return self.get(transaction_id)
+
+    def delete(self, transaction_id):
+        """Delete a transaction; returns False if there was no such id"""
+        connection = self._connection()
+        with self._write_lock:
+            with connection:
+                old = self._old_amount(connection, transaction_id)
+                if old is None:
+                    return False
+                connection.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
+                deltas, report_deltas = {}, {}
+                add_delta(deltas, old[0], day_delta(old[1], -1))
+                add_report_delta(report_deltas, old[0], old[2], report_delta(old[1], -1))
+                self._write_daily_totals(connection, deltas)
+                self._write_period_totals(connection, report_deltas)
+                generation = self._next_generation(connection)
+            self._apply_deltas(connection, deltas, generation)
+        return True
+
+    def balance_at(self, date=None):
+        """
+        Sum of all amounts up to and including a day, in euros.
+
+        The apps add their opening balance to this.
+
+        Args:
+            date: ISO date; None includes every transaction
+
+        Raises:
+            ValidationError: date is not an ISO date
+        """
+        try:
+            return self._read_balances(lambda balances: balances.balance_at(date)) / 100
+        except ValueError:
+            raise ValidationError("date must be an ISO date (YYYY-MM-DD)") from None
+
+    def totals(self, date_from=None, date_to=None):
+        """
+        Money in and out over an inclusive date range.
+
+        Returns:
+            {"net", "inflow", "outflow"} in euros and "count"
+
+        Raises:
+            ValidationError: A date is not an ISO date
+        """
+        try:
+            totals = self._read_balances(lambda balances: balances.totals(date_from, date_to))
+        except ValueError:
+            raise ValidationError("dates must be ISO dates (YYYY-MM-DD)") from None
+        return {
+            'net': totals['net_cents'] / 100,
+            'inflow': totals['inflow_cents'] / 100,
+            'outflow': totals['outflow_cents'] / 100,
+            'count': totals['count'],
+        }
+
+    def sum_daily_totals(self, date_from=None, date_to=None):
+        """
+        Totals over an inclusive date range summed in SQL from the stored
+        daily_totals rows, independent of the in-memory trees. Exports use
+        this so a statement always reflects what is committed.
+
+        Returns:
+            Dict of net_cents, inflow_cents, outflow_cents and count
+        """
+        clauses, params = [], []
+        if date_from:
+            clauses.append('day >= ?')
+            params.append(date_from[:10])
+        if date_to:
+            clauses.append('day <= ?')
+            params.append(date_to[:10])
+        net, inflow, count = self._connection().execute(
+            'SELECT COALESCE(SUM(net_cents), 0), COALESCE(SUM(inflow_cents), 0), COALESCE(SUM(count), 0) '
+            f'FROM daily_totals {"WHERE " + " AND ".join(clauses) if clauses else ""}', params
+        ).fetchone()
+        return {'net_cents': net, 'inflow_cents': inflow, 'outflow_cents': inflow - net, 'count': count}
+
+    def report(self, period='month', date=None, history=reports.DEFAULT_HISTORY):
+        """
+        Money in and out for the month, quarter or year containing a date,
+        by category, read from the period_totals rollups.
+
+        Args:
+            period: 'month', 'quarter' or 'year'
+            date: ISO date inside the period (default: today)
+            history: Number of periods in "history", ending with this one
+
+        Returns:
+            {"period", "key", "from", "to", "inflow", "outflow", "net",
+            "count", "categories": [...], "history": [...]}, amounts in
+            euros; categories are ordered by outflow, largest first
+
+        Raises:
+            ValidationError: Unknown period, bad date or history out of range
+        """
+        if period not in reports.PERIODS:
+            raise ValidationError(f"period must be one of {', '.join(reports.PERIODS)}")
+        if not 1 <= history <= reports.MAX_HISTORY:
+            raise ValidationError(f"history must be between 1 and {reports.MAX_HISTORY}")
+        try:
+            key = reports.period_key(period, date or datetime.date.today().isoformat())
+        except (TypeError, ValueError):
+            raise ValidationError("date must be an ISO date (YYYY-MM-DD)") from None
+        connection = self._connection()
+        rows = connection.execute(
+            'SELECT category, inflow_cents, outflow_cents, count FROM period_totals WHERE period = ?', (key,)
+        ).fetchall()
+        keys = reports.previous_keys(period, key, history)
+        sums = {row[0]: row[1:] for row in connection.execute(
+            'SELECT period, SUM(inflow_cents), SUM(outflow_cents), SUM(count) FROM period_totals '
+            f'WHERE period IN ({", ".join("?" * len(keys))}) GROUP BY period', keys
+        )}
+        date_from, date_to = reports.period_bounds(key)
+        categories = sorted(rows, key=lambda row: (-row[2], row[0]))
+        return dict(
+            {'period': period, 'key': key, 'from': date_from, 'to': date_to},
+            **reports.summarize([row[1:] for row in rows]),
+            categories=[dict({'category': row[0]}, **reports.summarize([row[1:]])) for row in categories],
+            history=[
+                dict(zip(('key', 'from', 'to'), (past,) + reports.period_bounds(past)),
+                     **reports.summarize([sums.get(past, (0, 0, 0))]))
+                for past in keys
+            ],
+        )
+
+    def check_balances(self):
+        """
+        Recompute the per-day totals and the period rollups from the
+        transactions and compare them with daily_totals, period_totals and
+        the in-memory trees.
+
+        Returns:
+            List of mismatch descriptions; empty when everything agrees
+        """
+        connection = self._connection()
+        actual = {row[0]: row[1:] for row in connection.execute(DAILY_TOTALS_QUERY)}
+        stored = {row[0]: row[1:] for row in connection.execute('SELECT * FROM daily_totals')}
+        actual_rollup = reports.rollup(connection.execute(reports.MONTHLY_TOTALS_QUERY))
+        stored_rollup = {row[:2]: row[2:] for row in connection.execute(
+            'SELECT period, category, inflow_cents, outflow_cents, count FROM period_totals')}
+        in_memory = self._read_balances(lambda balances: balances.daily())
+        return (compare_daily('transactions', actual, 'daily_totals', stored)
+                + compare_daily('daily_totals', stored, 'memory', in_memory)
+                + reports.compare_rollups('transactions', actual_rollup, 'period_totals', stored_rollup))
+
+    def rebuild_balances(self):
+        """Recompute daily_totals and period_totals from the transactions and reload the trees"""
+        connection = self._connection()
+        with self._write_lock:
+            with connection:
+                self._rebuild_daily_totals(connection)
+                self._rebuild_period_totals(connection)
+                self._next_generation(connection)
+            self._reload_balances(connection)
+
+    @staticmethod
+    def _rebuild_daily_totals(connection):
+        connection.execute('DELETE FROM daily_totals')
+        connection.execute(f'INSERT INTO daily_totals (day, net_cents, inflow_cents, count) {DAILY_TOTALS_QUERY}')
+
+    @staticmethod
+    def _rebuild_period_totals(connection):
+        for statement in reports.REBUILD_STATEMENTS:
+            connection.execute(statement)
+
+    def page(self, limit=DEFAULT_PAGE_SIZE, cursor=None, date_from=None, date_to=None, **filters):
+        """
+        One page of transactions, newest first.
+
+        Args:
+            limit: Page size (1 .. MAX_PAGE_SIZE)
+            cursor: next_cursor of the previous page
+            date_from: Earliest date, inclusive (ISO prefix, e.g. 2025-11-01)
+            date_to: Latest date, inclusive
+            **filters: type, category and/or status to match exactly
+
+        Returns:
+            {"items": [Transaction, ...], "next_cursor": str or None}
+
+        Raises:
+            ValidationError: Bad limit, cursor or filter name
+        """
+        if not isinstance(limit, int) or not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValidationError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        clauses, params = self._where(date_from, date_to, filters)
+        if cursor:
+            date, seq = decode_cursor(cursor)
+            clauses.append('(date, seq) < (?, ?)')
+            params.extend([date, seq])
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+        rows = self._connection().execute(
+            f'SELECT {", ".join(COLUMNS)} FROM transactions {where} '
+            'ORDER BY date DESC, seq DESC LIMIT ?',
+            params + [limit + 1]
+        ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = dict(zip(COLUMNS, rows[-1]))
+            next_cursor = encode_cursor(last['date'], last['seq'])
+        return {'items': [to_transaction(row) for row in rows], 'next_cursor': next_cursor}
+
+    def iter_batches(self, batch_size=EXPORT_BATCH_SIZE, date_from=None, date_to=None, **filters):
+        """
+        Every matching transaction, oldest first, in lists of batch_size.
+
+        Each batch is its own keyset query, so no read transaction stays
+        open between batches and memory holds one batch at a time. The
+        arguments are checked before the generator is returned.
+
+        Raises:
+            ValidationError: Bad batch size or filter name
+        """
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValidationError("batch_size must be a positive integer")
+        clauses, params = self._where(date_from, date_to, filters)
+        return self._batches(batch_size, clauses, params)
+
+    def _batches(self, batch_size, clauses, params):
+        after = []
+        while True:
+            where = clauses + ['(date, seq) > (?, ?)'] if after else clauses
+            rows = self._connection().execute(
+                f'SELECT {", ".join(COLUMNS)} FROM transactions '
+                f'{"WHERE " + " AND ".join(where) if where else ""} ORDER BY date, seq LIMIT ?',
+                params + after + [batch_size]
+            ).fetchall()
+            if rows:
+                yield [to_transaction(row) for row in rows]
+            if len(rows) < batch_size:
+                return
+            after = [rows[-1][COLUMNS.index('date')], rows[-1][0]]
+
+    @staticmethod
+    def _where(date_from, date_to, filters):
+        clauses, params = [], []
+        for field, value in filters.items():
+            if field not in FILTER_FIELDS:
+                raise ValidationError(f"unknown filter {field!r}")
+            if value is not None:
+                clauses.append(f'{field} = ?')
+                params.append(value)
+        if date_from:
+            clauses.append('date >= ?')
+            params.append(date_from)
+        if date_to:
+            # Dates may carry a time part; '~' sorts after every ISO character
+            clauses.append('date <= ?')
+            params.append(date_to + '~')
+        return clauses, params
@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+"""
+Streaming PDF Statements and Receipts
+=====================================
+
+A small PDF 1.4 writer for the two documents the apps offer for
+download: the account statement (tiliote) and the payment receipt
+(kuitti). No third-party packages: text uses the standard Helvetica
+fonts, which every PDF reader has, so nothing is embedded.
+
+Statements are written page by page. Each page is emitted as soon as
+its rows are laid out; the page tree, document info and cross-reference
+table follow the last page, so a statement of any length streams in
+constant memory (the xref keeps one offset per object).
+
+Everything that is the same in every document is built once per process
+and reused as bytes: the font objects, the logo (web/logo.svg drawn as
+PDF vector paths), the page header and the resources dictionary. They
+sit at fixed object numbers at the start of every file, so a new
+document starts by writing the cached prefix and each page only carries
+its own rows. Pages reference the header as a form XObject instead of
+repeating it.
+"""
+
+import datetime
+import functools
+import re
+import unicodedata
+import xml.etree.ElementTree as ET
+import zlib
+from pathlib import Path
+
+from .ledger import STATUS_ALIASES
+
+LOGO_PATH = Path(__file__).resolve().parent.parent / 'web' / 'logo.svg'
+
+BANK_NAME = 'SumUp Bank'
+BANK_DETAILS = 'Y-tunnus 1234567-8 · www.sumup.fi'
+
+# A4 statements, A5 receipts (points)
+STATEMENT_SIZE = (595, 842)
+RECEIPT_SIZE = (420, 595)
+MARGIN = 50
+ROW_HEIGHT = 14
+FIRST_ROW_Y = 696
+LAST_ROW_Y = 80
+ROWS_PER_PAGE = (FIRST_ROW_Y - LAST_ROW_Y) // ROW_HEIGHT + 1
+COMPRESS_LEVEL = 6
+
+# Fixed object numbers of the shared prefix
+CATALOG, PAGES, FONT_REGULAR, FONT_BOLD, LOGO, HEADER, RESOURCES = range(1, 8)
+FIRST_FREE_OBJECT = 8
+
+STATUS_LABELS = {status: label for label, status in STATUS_ALIASES.items()}
+TYPE_LABELS = {'debit': 'Meno', 'credit': 'Tulo'}
+
+# Advance widths (1/1000 em) of characters 32..126 in the standard fonts
+HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+HELVETICA_BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+FONTS = {'F1': ('Helvetica', HELVETICA_WIDTHS), 'F2': ('Helvetica-Bold', HELVETICA_BOLD_WIDTHS)}
+DEFAULT_WIDTH = 556
+
+CONTROL_CHARACTERS = re.compile('[\x00-\x1f\x7f]+')
+
+
+# Text
+
+def char_width(widths, char):
+    code = ord(char)
+    if 32 <= code < 127:
+        return widths[code - 32]
+    # Accented Latin letters are as wide as their base letter
+    base = unicodedata.normalize('NFD', char)[0]
+    if 32 <= ord(base) < 127:
+        return widths[ord(base) - 32]
+    return 278 if char.isspace() else DEFAULT_WIDTH
+
+
+@functools.lru_cache(maxsize=8192)
+def text_width(text, font='F1', size=10):
+    """Width of text in points"""
+    widths = FONTS[font][1]
+    return sum(char_width(widths, char) for char in text) * size / 1000
+
+
+def fit_text(text, width, font='F1', size=10):
+    """Cut text with an ellipsis so it is at most width points wide"""
+    text = CONTROL_CHARACTERS.sub(' ', text)
+    if text_width(text, font, size) <= width:
+        return text
+    while text and text_width(text + '…', font, size) > width:
+        text = text[:-1]
+    return text.rstrip() + '…'
+
+
+def pdf_string(text):
+    """A PDF literal string in WinAnsiEncoding (cp1252); unknown characters become ?"""
+    data = CONTROL_CHARACTERS.sub(' ', text).encode('cp1252', 'replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def format_amount(amount):
+    """-1234.5 -> '-1 234,50' (Finnish grouping and decimal comma)"""
+    return f'{amount:,.2f}'.replace(',', ' ').replace('.', ',')
+
+
+def format_date(date):
+    """'2025-11-08T10:00:00Z' -> '8.11.2025'"""
+    day = datetime.date.fromisoformat(date[:10])
+    return f'{day.day}.{day.month}.{day.year}'
+
+
+def num(value):
+    """Compact PDF number: no trailing zeros"""
+    return b'%d' % value if value == int(value) else (b'%.3f' % value).rstrip(b'0')
+
+
+class Canvas:
+    """Collects the drawing operators of one content stream"""
+
+    def __init__(self):
+        self.ops = []
+
+    def color(self, rgb, stroke=False):
+        self.ops.append(b'%b %b %b %b' % (num(rgb[0]), num(rgb[1]), num(rgb[2]),
+                                          b'RG' if stroke else b'rg'))
+
+    def text(self, x, y, text, font='F1', size=10, align='left', rgb=None):
+        if align == 'right':
+            x -= text_width(text, font, size)
+        elif align == 'center':
+            x -= text_width(text, font, size) / 2
+        if rgb is not None:
+            self.color(rgb)
+        self.ops.append(b'BT /%b %b Tf %b %b Td %b Tj ET' % (
+            font.encode(), num(size), num(round(x, 2)), num(round(y, 2)), pdf_string(text)))
+        if rgb is not None:
+            self.color((0, 0, 0))
+
+    def line(self, x1, y1, x2, y2, width=0.5, gray=0.75):
+        self.ops.append(b'%b G %b w %b %b m %b %b l S' % (
+            num(gray), num(width), num(x1), num(y1), num(x2), num(y2)))
+
+    def rect(self, x, y, width, height, gray):
+        self.ops.append(b'%b g %b %b %b %b re f 0 g' % (
+            num(gray), num(x), num(y), num(width), num(height)))
+
+    def xobject(self, name, x=0, y=0, scale=1):
+        self.ops.append(b'q %b 0 0 %b %b %b cm /%b Do Q' % (
+            num(scale), num(scale), num(x), num(y), name.encode()))
+
+    def content(self):
+        return b'\n'.join(self.ops)
+
+
+# Logo
+
+SVG_NAMESPACE = '{http://www.w3.org/2000/svg}'
+PATH_TOKEN = re.compile(r'[MLQCHVZmlqchvz]|-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+TRANSLATE = re.compile(r'translate\(\s*(-?[\d.]+)[\s,]+(-?[\d.]+)\s*\)')
+CIRCLE_KAPPA = 0.5523
+
+
+def parse_color(value, gradients):
+    """SVG paint -> (r, g, b) in 0..1, or None for 'none'"""
+    if not value or value == 'none':
+        return None
+    match = re.fullmatch(r'url\(#([^)]+)\)', value.strip())
+    if match:
+        value = gradients.get(match.group(1), '#000000')
+    value = value.strip().lstrip('#')
+    if len(value) == 3:
+        value = ''.join(c * 2 for c in value)
+    try:
+        return tuple(int(value[i:i + 2], 16) / 255 for i in (0, 2, 4))
+    except ValueError:
+        return (0, 0, 0)
+
+
+def blend(rgb, opacity):
+    """Approximate opacity by mixing with the white paper (PDF 1.4 without ExtGState)"""
+    return tuple(round(c * opacity + (1 - opacity), 3) for c in rgb)
+
+
+def path_ops(d):
+    """SVG path data (M L H V Q C Z, absolute or relative) -> PDF path operators"""
+    tokens = PATH_TOKEN.findall(d)
+    ops, x, y, start, command, index = [], 0.0, 0.0, (0.0, 0.0), 'M', 0
+
+    def take(count):
+        nonlocal index
+        values = [float(v) for v in tokens[index:index + count]]
+        index += count
+        return values
+
+    while index < len(tokens):
+        if tokens[index].isalpha():
+            command = tokens[index]
+            index += 1
+            if command in 'Zz':
+                ops.append(b'h')
+                x, y = start
+                continue
+        relative = command.islower()
+        dx, dy = (x, y) if relative else (0.0, 0.0)
+        upper = command.upper()
+        if upper == 'M':
+            x, y = (v + o for v, o in zip(take(2), (dx, dy)))
+            start = (x, y)
+            ops.append(b'%b %b m' % (num(x), num(y)))
+            command = 'l' if relative else 'L'  # extra pairs are line-tos
+        elif upper == 'L':
+            x, y = (v + o for v, o in zip(take(2), (dx, dy)))
+            ops.append(b'%b %b l' % (num(x), num(y)))
+        elif upper == 'H':
+            x = take(1)[0] + dx
+            ops.append(b'%b %b l' % (num(x), num(y)))
+        elif upper == 'V':
+            y = take(1)[0] + dy
+            ops.append(b'%b %b l' % (num(x), num(y)))
+        elif upper == 'Q':
+            qx, qy, ex, ey = take(4)
+            qx, qy, ex, ey = qx + dx, qy + dy, ex + dx, ey + dy
+            # Quadratic -> cubic: control points 2/3 of the way to q
+            c1 = (x + 2 / 3 * (qx - x), y + 2 / 3 * (qy - y))
+            c2 = (ex + 2 / 3 * (qx - ex), ey + 2 / 3 * (qy - ey))
+            ops.append(b'%b %b %b %b %b %b c' % tuple(num(round(v, 3)) for v in (*c1, *c2, ex, ey)))
+            x, y = ex, ey
+        elif upper == 'C':
+            values = take(6)
+            values = [v + (dx if i % 2 == 0 else dy) for i, v in enumerate(values)]
+            ops.append(b'%b %b %b %b %b %b c' % tuple(num(round(v, 3)) for v in values))
+            x, y = values[4], values[5]
+        else:
+            index += 1  # unsupported command: skip its argument
+    return ops
+
+
+def circle_ops(cx, cy, r):
+    k = CIRCLE_KAPPA * r
+    points = [
+        (cx + r, cy), (cx + r, cy + k, cx + k, cy + r, cx, cy + r),
+        (cx - k, cy + r, cx - r, cy + k, cx - r, cy), (cx - r, cy - k, cx - k, cy - r, cx, cy - r),
+        (cx + k, cy - r, cx + r, cy - k, cx + r, cy),
+    ]
+    ops = [b'%b %b m' % (num(points[0][0]), num(points[0][1]))]
+    ops += [b'%b %b %b %b %b %b c' % tuple(num(round(v, 3)) for v in segment) for segment in points[1:]]
+    return ops + [b'h']
+
+
+def svg_ops(element, gradients, ops):
+    """Append the PDF operators for an SVG element and its children"""
+    tag = element.tag.replace(SVG_NAMESPACE, '')
+    opacity = float(element.get('opacity', 1))
+    fill = parse_color(element.get('fill'), gradients)
+    stroke = parse_color(element.get('stroke'), gradients)
+    if tag == 'g':
+        match = TRANSLATE.search(element.get('transform', ''))
+        ops.append(b'q')
+        if match:
+            ops.append(b'1 0 0 1 %b %b cm' % (num(float(match.group(1))), num(float(match.group(2)))))
+        for child in element:
+            svg_ops(child, gradients, ops)
+        ops.append(b'Q')
+    elif tag in ('circle', 'path'):
+        if tag == 'circle':
+            shape = circle_ops(float(element.get('cx', 0)), float(element.get('cy', 0)), float(element.get('r', 0)))
+        else:
+            shape = path_ops(element.get('d', ''))
+        if fill is None and stroke is None and tag == 'circle':
+            fill = (0, 0, 0)
+        if fill is not None:
+            ops.append(b'%b %b %b rg' % tuple(num(v) for v in blend(fill, opacity)))
+        if stroke is not None:
+            ops.append(b'%b %b %b RG %b w %b J' % (
+                *(num(v) for v in blend(stroke, opacity)),
+                num(float(element.get('stroke-width', 1))),
+                b'1' if element.get('stroke-linecap') == 'round' else b'0'))
+        ops.extend(shape)
+        ops.append(b'B' if fill is not None and stroke is not None else b'f' if fill is not None else b'S')
+    elif tag == 'text':
+        text = ' '.join((element.text or '').split())
+        if text:
+            font = 'F2' if int(element.get('font-weight', '400')) >= 600 else 'F1'
+            ops.append(b'%b %b %b rg' % tuple(num(v) for v in blend(fill or (0, 0, 0), opacity)))
+            # The form flips y; flip the text back upright
+            ops.append(b'BT /%b %b Tf 1 0 0 -1 %b %b Tm %b Tj ET' % (
+                font.encode(), num(float(element.get('font-size', 12))),
+                num(float(element.get('x', 0))), num(float(element.get('y', 0))), pdf_string(text)))
+    elif tag == 'svg':
+        for child in element:
+            svg_ops(child, gradients, ops)
+
+
+@functools.lru_cache(maxsize=4)
+def logo_form(path=LOGO_PATH):
+    """
+    The logo as (width, height, content stream) in its own coordinates.
+
+    Handles the SVG subset the logo uses (paths, circles, text, translate
+    groups); gradients are drawn in their first stop colour. A missing or
+    unreadable file gives an empty logo, so documents still render.
+    """
+    try:
+        root = ET.parse(path).getroot()
+        width, height = (float(v) for v in root.get('viewBox', '0 0 200 60').split()[2:])
+    except (OSError, ET.ParseError, ValueError):
+        return 200.0, 60.0, b''
+    gradients = {}
+    for gradient in root.iter(f'{SVG_NAMESPACE}linearGradient'):
+        stop = gradient.find(f'{SVG_NAMESPACE}stop')
+        if stop is not None:
+            style = dict(part.split(':', 1) for part in stop.get('style', '').split(';') if ':' in part)
+            gradients[gradient.get('id')] = stop.get('stop-color') or style.get('stop-color', '#000000')
+    ops = [b'1 0 0 -1 0 %b cm' % num(height)]
+    for child in root:
+        if child.tag.replace(SVG_NAMESPACE, '') != 'defs':
+            svg_ops(child, gradients, ops)
+    return width, height, b'\n'.join(ops)
+
+
+# Document structure
+
+class PdfWriter:
+    """
+    Serializes numbered objects in the order they are written and keeps
+    each one's byte offset for the cross-reference table.
+
+    Args:
+        prefix: Cached (bytes, offsets) of objects already at the start
+        first_free: First object number not used by the prefix
+    """
+
+    def __init__(self, prefix=(b'', {}), first_free=1):
+        self.position = len(prefix[0])
+        self.offsets = dict(prefix[1])
+        self.next_number = first_free
+
+    def reserve(self):
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+    def object(self, number, body):
+        data = b'%d 0 obj\n%b\nendobj\n' % (number, body)
+        self.offsets[number] = self.position
+        self.position += len(data)
+        return data
+
+    def stream(self, number, content, extra=b''):
+        compressed = zlib.compress(content, COMPRESS_LEVEL)
+        return self.object(number, b'<< %b/Length %d /Filter /FlateDecode >>\nstream\n%b\nendstream' % (
+            extra, len(compressed), compressed))
+
+    def trailer(self, root, info):
+        size = max(self.offsets) + 1
+        lines = [b'xref\n0 %d\n0000000000 65535 f \n' % size]
+        lines += [b'%010d 00000 n \n' % self.offsets[number] if number in self.offsets
+                  else b'0000000000 65535 f \n' for number in range(1, size)]
+        lines.append(b'trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            size, root, info, self.position))
+        return b''.join(lines)
+
+
+def statement_header(width, height):
+    """Page header drawn on every statement page: logo, title, column titles"""
+    logo_width, logo_height, _ = logo_form()
+    canvas = Canvas()
+    canvas.xobject('Logo', MARGIN, height - 40 - logo_height * 0.75, 0.75)
+    canvas.text(width - MARGIN, height - 60, 'TILIOTE', 'F2', 16, 'right')
+    canvas.text(width - MARGIN, height - 75, f'{BANK_NAME} · {BANK_DETAILS}', 'F1', 8, 'right', (0.4, 0.4, 0.4))
+    canvas.line(MARGIN, height - 95, width - MARGIN, height - 95, 1, 0.2)
+    y = FIRST_ROW_Y + 18
+    for x, title, align in STATEMENT_COLUMNS:
+        canvas.text(x, y, title, 'F2', 9, align)
+    canvas.line(MARGIN, y - 5, width - MARGIN, y - 5)
+    return canvas.content()
+
+
+def receipt_header(width, height):
+    logo_width, logo_height, _ = logo_form()
+    canvas = Canvas()
+    canvas.xobject('Logo', (width - logo_width * 0.75) / 2, height - 30 - logo_height * 0.75, 0.75)
+    canvas.text(width / 2, height - 100, 'KUITTI', 'F2', 16, 'center')
+    canvas.text(width / 2, height - 114, f'{BANK_NAME} · Y-tunnus 1234567-8', 'F1', 8, 'center', (0.4, 0.4, 0.4))
+    canvas.line(MARGIN, height - 126, width - MARGIN, height - 126, 1, 0.2)
+    canvas.text(width / 2, 60, 'Säilytä kuitti maksutositteena', 'F1', 8, 'center', (0.4, 0.4, 0.4))
+    canvas.text(width / 2, 48, BANK_DETAILS, 'F1', 8, 'center', (0.4, 0.4, 0.4))
+    return canvas.content()
+
+
+# (x, title, alignment) of the statement columns
+STATEMENT_COLUMNS = (
+    (MARGIN, 'Päivämäärä', 'left'),
+    (118, 'Kuvaus', 'left'),
+    (330, 'Kategoria', 'left'),
+    (430, 'Tila', 'left'),
+    (STATEMENT_SIZE[0] - MARGIN, 'Summa (EUR)', 'right'),
+)
+TEMPLATES = {'statement': (STATEMENT_SIZE, statement_header), 'receipt': (RECEIPT_SIZE, receipt_header)}
+
+
+@functools.lru_cache(maxsize=None)
+def document_prefix(kind):
+    """
+    Bytes and offsets of everything a document of this kind shares with
+    every other one: file header, catalog, fonts, logo, page header and
+    resources. Built once per process.
+    """
+    (width, height), header = TEMPLATES[kind]
+    writer = PdfWriter()
+    data = [b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n']
+    writer.position = len(data[0])
+    data.append(writer.object(CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES))
+    for number, (name, (base_font, _)) in zip((FONT_REGULAR, FONT_BOLD), FONTS.items()):
+        data.append(writer.object(number, b'<< /Type /Font /Subtype /Type1 /BaseFont /%b '
+                                          b'/Encoding /WinAnsiEncoding >>' % base_font.encode()))
+    fonts = b'<< /Font << /F1 %d 0 R /F2 %d 0 R >> >>' % (FONT_REGULAR, FONT_BOLD)
+    logo_width, logo_height, logo = logo_form()
+    data.append(writer.stream(LOGO, logo, b'/Type /XObject /Subtype /Form /BBox [0 0 %b %b] /Resources %b ' % (
+        num(logo_width), num(logo_height), fonts)))
+    data.append(writer.stream(HEADER, header(width, height),
+                              b'/Type /XObject /Subtype /Form /BBox [0 0 %d %d] /Resources '
+                              b'<< /Font << /F1 %d 0 R /F2 %d 0 R >> /XObject << /Logo %d 0 R >> >> ' % (
+                                  width, height, FONT_REGULAR, FONT_BOLD, LOGO)))
+    data.append(writer.object(RESOURCES, b'<< /Font << /F1 %d 0 R /F2 %d 0 R >> /XObject << /Header %d 0 R >> >>' % (
+        FONT_REGULAR, FONT_BOLD, HEADER)))
+    return b''.join(data), writer.offsets
+
+
+def warm_templates():
+    """Build the cached prefixes up front (e.g. in a pool worker's initializer)"""
+    for kind in TEMPLATES:
+        document_prefix(kind)
+
+
+class PageStream:
+    """
+    Writes the pages of one document as they are finished.
+
+    Usage:
+        pages = PageStream('statement')
+        yield pages.start()
+        yield pages.page(canvas)    # for each page
+        yield pages.finish(title)
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.size = TEMPLATES[kind][0]
+        self.prefix = document_prefix(kind)
+        self.writer = PdfWriter(self.prefix, FIRST_FREE_OBJECT)
+        self.pages = []
+
+    def start(self):
+        return self.prefix[0]
+
+    def page(self, canvas):
+        content_number, page_number = self.writer.reserve(), self.writer.reserve()
+        self.pages.append(page_number)
+        return self.writer.stream(content_number, b'q /Header Do Q\n' + canvas.content()) + self.writer.object(
+            page_number, b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %d 0 R /Contents %d 0 R >>' % (
+                PAGES, self.size[0], self.size[1], RESOURCES, content_number))
+
+    def finish(self, title):
+        info = self.writer.reserve()
+        created = datetime.datetime.now(datetime.timezone.utc).strftime('D:%Y%m%d%H%M%SZ')
+        return (self.writer.object(PAGES, b'<< /Type /Pages /Count %d /Kids [%b] >>' % (
+                    len(self.pages), b' '.join(b'%d 0 R' % page for page in self.pages)))
+                + self.writer.object(info, b'<< /Title %b /Producer %b /CreationDate (%b) >>' % (
+                    pdf_string(title), pdf_string(f'{BANK_NAME} ledger'), created.encode()))
+                + self.writer.trailer(CATALOG, info))
+
+
+# Documents
+
+def statement_chunks(batches, period, summary=None):
+    """
+    Render a statement page by page.
+
+    Args:
+        batches: Iterable of lists of Transaction dicts, oldest first
+        period: Text shown as the statement period (e.g. '1.11.2025 – 30.11.2025')
+        summary: Optional dict with opening, inflow, outflow, closing (euros)
+            and count, printed after the last row
+
+    Yields:
+        bytes: the shared prefix first, then one chunk per page, then the trailer
+    """
+    width, height = STATEMENT_SIZE
+    pages = PageStream('statement')
+    yield pages.start()
+
+    def new_page():
+        canvas = Canvas()
+        canvas.text(MARGIN, height - 109, f'Jakso: {period}', 'F1', 9)
+        canvas.text(width - MARGIN, 30, f'Sivu {len(pages.pages) + 1}', 'F1', 8, 'right', (0.4, 0.4, 0.4))
+        canvas.text(MARGIN, 30, f'{BANK_NAME} · Tiliote', 'F1', 8, 'left', (0.4, 0.4, 0.4))
+        return canvas
+
+    canvas, row = new_page(), 0
+    for batch in batches:
+        for transaction in batch:
+            if row == ROWS_PER_PAGE:
+                yield pages.page(canvas)
+                canvas, row = new_page(), 0
+            y = FIRST_ROW_Y - row * ROW_HEIGHT
+            if row % 2:
+                canvas.rect(MARGIN, y - 4, width - 2 * MARGIN, ROW_HEIGHT, 0.96)
+            title = transaction['title']
+            if transaction.get('recipient'):
+                title = f"{title} / {transaction['recipient']}"
+            canvas.text(MARGIN, y, format_date(transaction['date']), 'F1', 9)
+            canvas.text(118, y, fit_text(title, 205, 'F1', 9), 'F1', 9)
+            canvas.text(330, y, fit_text(transaction['category'], 95, 'F1', 9), 'F1', 9)
+            canvas.text(430, y, STATUS_LABELS.get(transaction['status'], transaction['status']), 'F1', 9)
+            canvas.text(width - MARGIN, y, format_amount(transaction['amount']), 'F1', 9, 'right',
+                        (0.1, 0.5, 0.2) if transaction['amount'] > 0 else None)
+            row += 1
+
+    lines = []
+    if row == 0 and not pages.pages:
+        lines.append(('Ei tapahtumia tällä jaksolla.', None))
+    if summary is not None:
+        lines += [
+            ('Yhteenveto', None),
+            ('Alkusaldo', summary['opening']),
+            ('Tulot', summary['inflow']),
+            ('Menot', -summary['outflow']),
+            ('Loppusaldo', summary['closing']),
+            (f"Tapahtumia {summary['count']} kpl", None),
+        ]
+    if lines and row + len(lines) + 1 > ROWS_PER_PAGE:
+        yield pages.page(canvas)
+        canvas, row = new_page(), 0
+    y = FIRST_ROW_Y - (row + 1) * ROW_HEIGHT
+    if lines and row:
+        canvas.line(MARGIN, y + ROW_HEIGHT - 4, width - MARGIN, y + ROW_HEIGHT - 4)
+    for label, amount in lines:
+        bold = amount is None or label == 'Loppusaldo'
+        canvas.text(330, y, label, 'F2' if bold else 'F1', 9)
+        if amount is not None:
+            canvas.text(width - MARGIN, y, format_amount(amount), 'F2' if bold else 'F1', 9, 'right')
+        y -= ROW_HEIGHT
+    yield pages.page(canvas)
+    yield pages.finish(f'Tiliote {period}')
+
+
+def receipt_chunks(transaction):
+    """
+    Render a one-page receipt for a transaction.
+
+    Yields:
+        bytes: the shared prefix, the page, then the trailer
+    """
+    width, height = RECEIPT_SIZE
+    pages = PageStream('receipt')
+    yield pages.start()
+    canvas = Canvas()
+    canvas.text(width / 2, height - 150, 'Summa', 'F1', 9, 'center', (0.4, 0.4, 0.4))
+    amount = transaction['amount']
+    canvas.text(width / 2, height - 178, f'{format_amount(amount)} €', 'F2', 24, 'center',
+                (0.1, 0.5, 0.2) if transaction['type'] == 'credit' else None)
+    details = [
+        ('Tapahtumatunnus', f"#{transaction['id'].rjust(8, '0')}"),
+        ('Päivämäärä', format_date(transaction['date'])),
+        ('Kuvaus', transaction['title']),
+        ('Saaja', transaction.get('recipient')),
+        ('IBAN', transaction.get('iban')),
+        ('Kategoria', transaction['category']),
+        ('Tyyppi', TYPE_LABELS.get(transaction['type'], transaction['type'])),
+        ('Tila', STATUS_LABELS.get(transaction['status'], transaction['status'])),
+    ]
+    y = height - 220
+    for label, value in details:
+        if not value:
+            continue
+        canvas.text(MARGIN, y, label, 'F1', 9, 'left', (0.4, 0.4, 0.4))
+        canvas.text(width - MARGIN, y, fit_text(value, width - 2 * MARGIN - 100, 'F2', 9), 'F2', 9, 'right')
+        canvas.line(MARGIN, y - 7, width - MARGIN, y - 7, 0.5, 0.9)
+        y -= 24
+    yield pages.page(canvas)
+    yield pages.finish(f"Kuitti {transaction['id']}")
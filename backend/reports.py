@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Period Report Rollups
+=====================
+
+The Raportit screens show money in and out per month, quarter or year,
+broken down by category. The ledger keeps those sums ready in the
+period_totals table, one row per (period, category):
+
+    2025-11      month
+    2025-Q4      quarter
+    2025         year
+
+Every write adds its (inflow, outflow, count) delta to the three rows of
+its month, quarter and year in the same SQLite transaction as the
+transaction itself, so a report reads a handful of rows by primary key
+however many transactions the period holds.
+
+Backfills and repairs rebuild the table with set-based SQL instead
+(REBUILD_STATEMENTS): one GROUP BY scan of the transactions for the
+months, then quarters and years rolled up from the month rows.
+"""
+
+import calendar
+import datetime
+
+PERIODS = ('month', 'quarter', 'year')
+DEFAULT_HISTORY = 6
+MAX_HISTORY = 120
+
+QUARTER_OF_MONTH = "((CAST(substr({0}, 6, 2) AS INTEGER) + 2) / 3)"
+MONTH_ROWS = "length(period) = 7 AND substr(period, 6, 1) != 'Q'"
+
+REBUILD_STATEMENTS = (
+    "DELETE FROM period_totals",
+    "INSERT INTO period_totals (period, category, inflow_cents, outflow_cents, count) "
+    "SELECT substr(date, 1, 7), category, SUM(MAX(amount_cents, 0)), SUM(MAX(-amount_cents, 0)), COUNT(*) "
+    "FROM transactions GROUP BY 1, 2",
+    "INSERT INTO period_totals (period, category, inflow_cents, outflow_cents, count) "
+    f"SELECT substr(period, 1, 4) || '-Q' || {QUARTER_OF_MONTH.format('period')}, category, "
+    f"SUM(inflow_cents), SUM(outflow_cents), SUM(count) FROM period_totals WHERE {MONTH_ROWS} GROUP BY 1, 2",
+    "INSERT INTO period_totals (period, category, inflow_cents, outflow_cents, count) "
+    "SELECT substr(period, 1, 4), category, SUM(inflow_cents), SUM(outflow_cents), SUM(count) "
+    f"FROM period_totals WHERE {MONTH_ROWS} GROUP BY 1, 2",
+)
+
+MONTHLY_TOTALS_QUERY = """
+SELECT substr(date, 1, 7), category, SUM(MAX(amount_cents, 0)), SUM(MAX(-amount_cents, 0)), COUNT(*)
+FROM transactions GROUP BY 1, 2
+"""
+
+
+def period_key(period, date):
+    """
+    Key of the month, quarter or year containing an ISO date.
+
+    Raises:
+        ValueError: Unknown period or a date without a valid YYYY-MM-DD prefix
+    """
+    day = datetime.date.fromisoformat(date[:10])
+    if period == 'month':
+        return f'{day.year:04d}-{day.month:02d}'
+    if period == 'quarter':
+        return f'{day.year:04d}-Q{(day.month + 2) // 3}'
+    if period == 'year':
+        return f'{day.year:04d}'
+    raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+
+
+def period_keys(date):
+    """(month, quarter, year) keys of a date; only its YYYY-MM part is read"""
+    year, month = date[:4], int(date[5:7])
+    return f'{year}-{month:02d}', f'{year}-Q{(month + 2) // 3}', year
+
+
+def period_bounds(key):
+    """First and last day (ISO dates) of a period key"""
+    year = int(key[:4])
+    if len(key) == 4:
+        first_month, last_month = 1, 12
+    elif key[5] == 'Q':
+        last_month = int(key[6]) * 3
+        first_month = last_month - 2
+    else:
+        first_month = last_month = int(key[5:7])
+    last_day = calendar.monthrange(year, last_month)[1]
+    return f'{year:04d}-{first_month:02d}-01', f'{year:04d}-{last_month:02d}-{last_day:02d}'
+
+
+def previous_keys(period, key, count):
+    """count keys ending with key, oldest first"""
+    keys = [key]
+    while len(keys) < count:
+        first_day = datetime.date.fromisoformat(period_bounds(keys[-1])[0])
+        if first_day.year == 1 and first_day.month == 1:
+            break
+        keys.append(period_key(period, (first_day - datetime.timedelta(days=1)).isoformat()))
+    return keys[::-1]
+
+
+def report_delta(amount_cents, sign=1):
+    """(inflow, outflow, count) contribution of one transaction; sign=-1 removes it"""
+    return (sign * max(amount_cents, 0), sign * max(-amount_cents, 0), sign)
+
+
+def add_report_delta(deltas, date, category, delta):
+    """Accumulate a delta into every period row it belongs to, keyed (period, category)"""
+    for key in period_keys(date):
+        current = deltas.get((key, category))
+        deltas[key, category] = delta if current is None else tuple(a + b for a, b in zip(current, delta))
+
+
+def rollup(monthly_rows):
+    """
+    Month, quarter and year totals from (month, category, inflow, outflow,
+    count) rows, as period_totals holds them.
+
+    Returns:
+        Dict of (period, category) -> (inflow_cents, outflow_cents, count)
+    """
+    totals = {}
+    for month, category, inflow, outflow, count in monthly_rows:
+        add_report_delta(totals, month, category, (inflow, outflow, count))
+    return totals
+
+
+def summarize(rows):
+    """Sum of (inflow_cents, outflow_cents, count) rows as a report dict in euros"""
+    inflow = sum(row[0] for row in rows)
+    outflow = sum(row[1] for row in rows)
+    return {
+        'inflow': inflow / 100,
+        'outflow': outflow / 100,
+        'net': (inflow - outflow) / 100,
+        'count': sum(row[2] for row in rows),
+    }
+
+
+def compare_rollups(label_a, rollup_a, label_b, rollup_b):
+    """
+    Describe every (period, category) whose totals differ.
+
+    Returns:
+        List of human-readable mismatch lines (empty when they agree)
+    """
+    problems = []
+    for period, category in sorted(set(rollup_a) | set(rollup_b)):
+        a = tuple(rollup_a.get((period, category), (0, 0, 0)))
+        b = tuple(rollup_b.get((period, category), (0, 0, 0)))
+        if a != b:
+            problems.append(f"{period} {category}: {label_a} {a} != {label_b} {b} "
+                            "(inflow_cents, outflow_cents, count)")
+    return problems
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Ledger HTTP API
+===============
+
+JSON endpoints over backend.ledger.Ledger, served by the stdlib
+threaded HTTP server:
+
+    GET    /api/health
+    GET    /api/transactions?limit=&cursor=&type=&category=&status=&from=&to=
+    POST   /api/transactions          (one Transaction or a list of them)
+    GET    /api/transactions/<id>
+    PATCH  /api/transactions/<id>     (PUT is accepted as well)
+    DELETE /api/transactions/<id>
+    GET    /api/balance?date=         (sum of amounts up to a day)
+    GET    /api/totals?from=&to=      (money in and out over a period)
+    GET    /api/reports?period=month|quarter|year&date=&history=
+                                      (by category, from the period rollups)
+    GET    /api/export/tiliote-<period>.csv|xlsx|pdf?from=&to=&type=&category=&status=
+    GET    /api/export/kuitti-<id>.pdf
+
+Listings are paginated: follow next_cursor until it is null. Errors are
+{"error": message} with a 4xx status. Exports are streamed with chunked
+transfer encoding (see export.py).
+
+The API has no authentication, so it listens on 127.0.0.1 by default.
+Browsers may only call it from pages served by this machine (the web app
+and Expo run on other localhost ports) or from origins passed in
+allowed_origins; a request carrying any other Origin is refused with 403
+before it reaches the ledger.
+"""
+
+import json
+import re
+import sys
+import threading
+import urllib.parse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import reports
+from .export import EXPORT_PARAMS, content_disposition, open_export
+from .ledger import DEFAULT_PAGE_SIZE, DuplicateTransaction, FILTER_FIELDS, Ledger, ValidationError
+
+SERVER_NAME = 'MobileBanksLedger'
+MAX_BODY_SIZE = 16 * 1024 * 1024
+KEEPALIVE_TIMEOUT = 15
+
+# (method, path pattern, handler method name); first match wins
+ROUTES = [
+    ('GET', r'/api/health', 'health'),
+    ('GET', r'/api/balance', 'balance'),
+    ('GET', r'/api/totals', 'totals'),
+    ('GET', r'/api/reports', 'report'),
+    ('GET', r'/api/export/(?P<name>[^/]+)', 'export'),
+    ('GET', r'/api/transactions', 'list_transactions'),
+    ('POST', r'/api/transactions', 'create_transactions'),
+    ('GET', r'/api/transactions/(?P<transaction_id>[^/]+)', 'get_transaction'),
+    ('PATCH', r'/api/transactions/(?P<transaction_id>[^/]+)', 'update_transaction'),
+    ('PUT', r'/api/transactions/(?P<transaction_id>[^/]+)', 'update_transaction'),
+    ('DELETE', r'/api/transactions/(?P<transaction_id>[^/]+)', 'delete_transaction'),
+]
+COMPILED_ROUTES = [(method, re.compile(pattern + r'/?'), name) for method, pattern, name in ROUTES]
+
+# Pages on this machine, whatever port serves them
+LOCAL_ORIGIN = re.compile(r'https?://(localhost|127\.0\.0\.1|\[::1\])(:\d+)?')
+
+
+class ApiError(Exception):
+    """Turned into an {"error": ...} response with the given status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LedgerRequestHandler(BaseHTTPRequestHandler):
+    """Routes requests to the handler methods below"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = SERVER_NAME
+    timeout = KEEPALIVE_TIMEOUT
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.dispatch()
+
+    def do_POST(self):
+        self.dispatch()
+
+    def do_PUT(self):
+        self.dispatch()
+
+    def do_PATCH(self):
+        self.dispatch()
+
+    def do_DELETE(self):
+        self.dispatch()
+
+    def do_OPTIONS(self):
+        # CORS preflight
+        if not self.origin_allowed():
+            self.send_json({'error': "origin not allowed"}, HTTPStatus.FORBIDDEN)
+            return
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.send_cors_headers()
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    @property
+    def ledger(self):
+        return self.server.ledger
+
+    def dispatch(self):
+        url = urllib.parse.urlsplit(self.path)
+        self.query = urllib.parse.parse_qs(url.query)
+        try:
+            if not self.origin_allowed():
+                raise ApiError(HTTPStatus.FORBIDDEN, "origin not allowed")
+            path_allowed = False
+            for method, pattern, name in COMPILED_ROUTES:
+                match = pattern.fullmatch(url.path)
+                if not match:
+                    continue
+                path_allowed = True
+                if method == self.command:
+                    getattr(self, name)(**{key: urllib.parse.unquote(value)
+                                           for key, value in match.groupdict().items()})
+                    return
+            if path_allowed:
+                raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{self.command} not allowed here")
+            raise ApiError(HTTPStatus.NOT_FOUND, "no such endpoint")
+        except ApiError as e:
+            self.send_json({'error': str(e)}, e.status)
+        except ValidationError as e:
+            self.send_json({'error': str(e)}, HTTPStatus.BAD_REQUEST)
+        except DuplicateTransaction as e:
+            self.send_json({'error': str(e)}, HTTPStatus.CONFLICT)
+
+    # Helpers
+
+    def origin_allowed(self):
+        """True for requests without an Origin (not from a browser page) and allowed origins"""
+        origin = self.headers.get('Origin')
+        return not origin or bool(LOCAL_ORIGIN.fullmatch(origin)) or origin in self.server.allowed_origins
+
+    def send_cors_headers(self):
+        origin = self.headers.get('Origin')
+        if origin and self.origin_allowed():
+            self.send_header('Access-Control-Allow-Origin', origin)
+        self.send_header('Vary', 'Origin')
+
+    def send_json(self, data, status=HTTPStatus.OK):
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_cors_headers()
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def send_chunked(self, headers, chunks):
+        """
+        Send a 200 response whose body is produced while it is sent.
+
+        HTTP/1.0 clients get the raw bytes and a closed connection. If
+        the generator fails midway the connection is dropped without the
+        final empty chunk, so the client sees a truncated download
+        rather than a complete-looking file.
+        """
+        chunked = self.request_version != 'HTTP/1.0'
+        self.send_response(HTTPStatus.OK)
+        self.send_cors_headers()
+        for name, value in headers:
+            self.send_header(name, value)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.close_connection = True
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if chunked:
+                    self.wfile.write(b'%X\r\n%b\r\n' % (len(chunk), chunk))
+                else:
+                    self.wfile.write(chunk)
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+        except Exception as e:
+            self.close_connection = True
+            if not isinstance(e, ConnectionError):
+                self.log_error("export failed: %r", e)
+        finally:
+            chunks.close()
+
+    def read_json(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body cannot be delimited, so the connection cannot be reused
+            self.close_connection = True
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Content-Length must be a non-negative integer")
+        if length > MAX_BODY_SIZE:
+            self.close_connection = True
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+        try:
+            return json.loads(self.rfile.read(length) or b'null')
+        except (ValueError, UnicodeDecodeError):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "request body is not valid JSON") from None
+
+    def query_value(self, name, default=None):
+        values = self.query.get(name)
+        return values[-1] if values else default
+
+    def query_int(self, name, default):
+        value = self.query_value(name)
+        if value is None:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer") from None
+
+    # Endpoints
+
+    def health(self):
+        self.send_json({'status': 'ok'})
+
+    def balance(self):
+        date = self.query_value('date')
+        self.send_json({'date': date, 'balance': self.ledger.balance_at(date)})
+
+    def totals(self):
+        date_from, date_to = self.query_value('from'), self.query_value('to')
+        self.send_json(dict({'from': date_from, 'to': date_to}, **self.ledger.totals(date_from, date_to)))
+
+    def report(self):
+        self.send_json(self.ledger.report(
+            self.query_value('period', 'month'),
+            self.query_value('date'),
+            self.query_int('history', reports.DEFAULT_HISTORY),
+        ))
+
+    def export(self, name):
+        export = open_export(self.ledger, name, {key: self.query_value(key) for key in EXPORT_PARAMS})
+        if export is None:
+            raise ApiError(HTTPStatus.NOT_FOUND,
+                           "exports are tiliote-<period>.csv|xlsx|pdf or kuitti-<id>.pdf of an existing transaction")
+        filename, content_type, chunks = export
+        self.send_chunked([
+            ('Content-Type', content_type),
+            ('Content-Disposition', content_disposition(filename)),
+            ('Cache-Control', 'no-store'),
+            ('X-Content-Type-Options', 'nosniff'),
+        ], chunks)
+
+    def list_transactions(self):
+        filters = {field: self.query_value(field) for field in FILTER_FIELDS}
+        page = self.ledger.page(
+            limit=self.query_int('limit', DEFAULT_PAGE_SIZE),
+            cursor=self.query_value('cursor'),
+            date_from=self.query_value('from'),
+            date_to=self.query_value('to'),
+            **filters
+        )
+        self.send_json(page)
+
+    def create_transactions(self):
+        data = self.read_json()
+        if isinstance(data, list):
+            count = self.ledger.add_many(data)
+            self.send_json({'inserted': count}, HTTPStatus.CREATED)
+        else:
+            self.send_json(self.ledger.add(data), HTTPStatus.CREATED)
+
+    def get_transaction(self, transaction_id):
+        transaction = self.ledger.get(transaction_id)
+        if transaction is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "no such transaction")
+        self.send_json(transaction)
+
+    def update_transaction(self, transaction_id):
+        changes = self.read_json()
+        if not isinstance(changes, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "request body must be a JSON object")
+        transaction = self.ledger.update(transaction_id, changes)
+        if transaction is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "no such transaction")
+        self.send_json(transaction)
+
+    def delete_transaction(self, transaction_id):
+        if not self.ledger.delete(transaction_id):
+            raise ApiError(HTTPStatus.NOT_FOUND, "no such transaction")
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.send_cors_headers()
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class LedgerServer(ThreadingHTTPServer):
+    """Thread-per-connection ledger API server"""
+
+    daemon_threads = True
+
+    def __init__(self, address, ledger, quiet=False, allowed_origins=()):
+        self.ledger = ledger
+        self.quiet = quiet
+        self.allowed_origins = frozenset(allowed_origins)
+        super().__init__(address, LedgerRequestHandler)
+
+    def start_background(self):
+        """Run serve_forever() in a daemon thread and return the thread"""
+        thread = threading.Thread(target=self.serve_forever, name='ledger-server', daemon=True)
+        thread.start()
+        return thread
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.ledger.release_connection()
+
+    def server_close(self):
+        super().server_close()
+        self.ledger.close()
+
+
+def create_server(db_path, port=3000, host='127.0.0.1', quiet=False, allowed_origins=()):
+    """
+    Open the ledger database and bind the API server.
+
+    Args:
+        db_path: SQLite database file (created if missing)
+        port: TCP port; 0 picks a free one
+        host: Interface to bind; '' means all interfaces, which exposes
+            the unauthenticated API to the network
+        quiet: Suppress the per-request log lines on stderr
+        allowed_origins: Browser origins (scheme://host:port) allowed to
+            call the API besides pages served from this machine
+
+    Raises:
+        OSError: The port could not be bound
+    """
+    ledger = Ledger(db_path)
+    try:
+        return LedgerServer((host, port), ledger, quiet=quiet, allowed_origins=allowed_origins)
+    except BaseException:
+        ledger.close()
+        raise
+
+
+def print_listening(server, stream=sys.stdout):
+    host, port = server.server_address[:2]
+    if host in ('', '0.0.0.0', '::'):
+        host = 'localhost'
+    stream.write(f"Ledger API listening on http://{host}:{port}/api/transactions\n")
+    stream.flush()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Running Balance Benchmark
+=========================
+
+Fills a temporary ledger (backend/) with --rows transactions spread over
+--days days, then times:
+
+    balance    balance at a random day: Ledger.balance_at() against the
+               full recomputation it replaces (SQL SUM over the rows, and
+               the apps' reduce over every amount)
+    totals     money in/out for a random period, same comparison
+    writes     add / update / delete latency, daily totals included
+    check      one run of Ledger.check_balances()
+
+Every engine answer is compared with the SQL SUM, so a wrong balance
+fails the run (exit 1).
+
+Usage:
+    python benchmarks/bench_balance.py
+    python benchmarks/bench_balance.py --rows 100000 --queries 2000 --output bench-results/balance.json
+"""
+
+import argparse
+import datetime
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import environment_info, summarize_latencies, write_report
+
+from backend import Ledger
+
+FIRST_DAY = datetime.date(2020, 1, 1)
+BATCH_SIZE = 20000
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Running balance benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Transactions in the ledger (default: 1000000)')
+    parser.add_argument('--days', type=int, default=2000, help='Days the transactions span (default: 2000)')
+    parser.add_argument('--queries', type=int, default=1000, help='Engine queries per kind (default: 1000)')
+    parser.add_argument('--scans', type=int, default=5, help='Full recomputations per kind (default: 5)')
+    parser.add_argument('--writes', type=int, default=500, help='Writes per kind (default: 500)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    return parser.parse_args()
+
+
+def random_day(rng, days):
+    return (FIRST_DAY + datetime.timedelta(days=rng.randrange(days))).isoformat()
+
+
+def fill(ledger, rows, days, rng):
+    start = time.perf_counter()
+    for offset in range(0, rows, BATCH_SIZE):
+        ledger.add_many([{
+            'id': f'bench-{index}',
+            'title': 'Ostos',
+            'amount': rng.randint(-20000, 10000) / 100,
+            'date': f'{random_day(rng, days)}T12:00:00Z',
+            'category': 'Ostokset',
+            'status': 'completed',
+            'type': 'debit',
+        } for index in range(offset, min(offset + BATCH_SIZE, rows))])
+    return time.perf_counter() - start
+
+
+def per_second(count, seconds):
+    return round(count / seconds, 1) if seconds else None
+
+
+def time_each(calls):
+    """Run each zero-argument callable; returns (results, latencies in seconds)"""
+    results, latencies = [], []
+    for call in calls:
+        start = time.perf_counter()
+        results.append(call())
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def bench_queries(ledger, args, rng):
+    connection = ledger._connection()
+    amounts = [cents for (cents,) in connection.execute('SELECT amount_cents FROM transactions')]
+
+    def sql_balance(day):
+        return connection.execute('SELECT COALESCE(SUM(amount_cents), 0) FROM transactions WHERE date <= ?',
+                                  (day + '~',)).fetchone()[0] / 100
+
+    def sql_totals(date_from, date_to):
+        return connection.execute(
+            'SELECT COALESCE(SUM(amount_cents), 0), COUNT(*) FROM transactions WHERE date >= ? AND date <= ?',
+            (date_from, date_to + '~')
+        ).fetchone()
+
+    days = [random_day(rng, args.days) for _ in range(args.queries)]
+    periods = [tuple(sorted((random_day(rng, args.days), random_day(rng, args.days))))
+               for _ in range(args.queries)]
+
+    engine_balances, balance_latencies = time_each([lambda day=day: ledger.balance_at(day) for day in days])
+    engine_totals, totals_latencies = time_each([lambda p=p: ledger.totals(*p) for p in periods])
+    sql_balances, sql_balance_latencies = time_each([lambda day=day: sql_balance(day)
+                                                     for day in days[:args.scans]])
+    sql_period_totals, sql_totals_latencies = time_each([lambda p=p: sql_totals(*p)
+                                                         for p in periods[:args.scans]])
+    _, reduce_latencies = time_each([lambda: sum(amounts) for _ in range(args.scans)])
+
+    mismatches = [day for day, engine, sql in zip(days, engine_balances, sql_balances)
+                  if round(engine * 100) != round(sql * 100)]
+    mismatches += [f'{p[0]}..{p[1]}' for p, engine, (net, count) in zip(periods, engine_totals, sql_period_totals)
+                   if (round(engine['net'] * 100), engine['count']) != (net, count)]
+
+    engine_mean = sum(balance_latencies) / len(balance_latencies)
+    sql_mean = sum(sql_balance_latencies) / len(sql_balance_latencies)
+    return {
+        'balance': {
+            'engine': summarize_latencies(balance_latencies),
+            'sql_sum': summarize_latencies(sql_balance_latencies),
+            'reduce_all_amounts': summarize_latencies(reduce_latencies),
+            'speedup_vs_sql': round(sql_mean / engine_mean, 1) if engine_mean else None,
+        },
+        'totals': {
+            'engine': summarize_latencies(totals_latencies),
+            'sql_sum': summarize_latencies(sql_totals_latencies),
+        },
+        'mismatches': mismatches,
+    }
+
+
+def bench_writes(ledger, args, rng):
+    ids = [f'write-{index}' for index in range(args.writes)]
+    new = {transaction_id: {
+        'id': transaction_id, 'title': 'Maksu', 'amount': rng.randint(-5000, 5000) / 100,
+        'date': random_day(rng, args.days), 'category': 'Maksut', 'status': 'completed', 'type': 'debit',
+    } for transaction_id in ids}
+    _, add_latencies = time_each([lambda t=t: ledger.add(t) for t in new.values()])
+    _, update_latencies = time_each([
+        lambda i=i: ledger.update(i, {'amount': rng.randint(-5000, 5000) / 100, 'date': random_day(rng, args.days)})
+        for i in ids
+    ])
+    _, delete_latencies = time_each([lambda i=i: ledger.delete(i) for i in ids])
+    return {
+        'add': summarize_latencies(add_latencies),
+        'update': summarize_latencies(update_latencies),
+        'delete': summarize_latencies(delete_latencies),
+    }
+
+
+def main():
+    args = parse_arguments()
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(Path(tmp) / 'bench.sqlite3')
+        try:
+            fill_seconds = fill(ledger, args.rows, args.days, rng)
+            queries = bench_queries(ledger, args, rng)
+            writes = bench_writes(ledger, args, rng)
+            start = time.perf_counter()
+            problems = ledger.check_balances()
+            check_seconds = time.perf_counter() - start
+        finally:
+            ledger.close()
+
+    report = {
+        'benchmark': 'balance',
+        'environment': environment_info(),
+        'rows': args.rows,
+        'days': args.days,
+        'fill': {'seconds': round(fill_seconds, 2), 'rows_per_s': per_second(args.rows, fill_seconds)},
+        'balance': queries['balance'],
+        'totals': queries['totals'],
+        'writes': writes,
+        'check': {'seconds': round(check_seconds, 3), 'problems': len(problems)},
+        'mismatches': queries['mismatches'][:20],
+    }
+    write_report(report, args.output)
+    return 1 if queries['mismatches'] or problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
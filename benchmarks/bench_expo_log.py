@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Expo Log Classifier Microbenchmark
+==================================
+
+Measures lines per second through expo_log.classify() on a synthetic
+Metro session, against the per-line checks install.py used before
+(several lower() calls, substring tests and separate re.search calls).
+
+The session is mostly bundling progress and request log lines, with the
+startup and port-conflict lines sprinkled in, like a long `expo start`.
+
+Usage:
+    python benchmarks/bench_expo_log.py
+    python benchmarks/bench_expo_log.py --lines 200000 --repeat 7 --output bench-results/expo_log.json
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+
+from common import environment_info, write_report
+
+import expo_log
+
+NOISE_LINES = [
+    'Android Bundled {n}ms node_modules/expo-router/entry.js (1342 modules)',
+    'iOS Bundled {n}ms node_modules/expo-router/entry.js (1338 modules)',
+    'Web Bundling {n}% index.js ({n}/1342)',
+    ' LOG  [statement] loaded {n} transactions',
+    ' WARN  Route "./(tabs)/_layout.tsx" is missing the required default export.',
+    'λ Bundled {n}ms (1342 modules)',
+    '› Reloading apps',
+]
+EVENT_LINES = [
+    'Starting Metro Bundler',
+    'Port 8081 is being used by another process',
+    '› Use port 8082 instead? … yes',
+    'Input is required, but Expo CLI is in non-interactive mode.',
+    'Skipping dev server',
+    '› Metro waiting on exp://192.168.1.20:8081',
+    '› Logs for your project will appear below. Press Ctrl+C to exit.',
+]
+
+
+def legacy_classify(line):
+    """The checks start_expo_and_show_qr ran per line before expo_log"""
+    events = []
+    if "is being used" in line.lower() or ("port" in line.lower() and "in use" in line.lower()):
+        events.append('port_conflict')
+        match = re.search(r"port (\d+)", line, re.IGNORECASE)
+        if match:
+            events.append(('suggested_port', int(match.group(1))))
+    match = re.search(r"(exp://[\d\.]+:\d+)", line)
+    if match:
+        events.append(('expo_url', match.group(1)))
+    if "Metro waiting" in line or "Logs for your project" in line:
+        events.append('ready')
+    return events
+
+
+def build_session(lines, event_ratio=0.01, seed=1):
+    rng = random.Random(seed)
+    session = []
+    for _ in range(lines):
+        if rng.random() < event_ratio:
+            session.append(rng.choice(EVENT_LINES))
+        else:
+            session.append(rng.choice(NOISE_LINES).format(n=rng.randint(1, 9999)))
+    return session
+
+
+def measure(func, session, repeat):
+    """Best-of-repeat lines per second"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for line in session:
+            func(line)
+        best = min(best, time.perf_counter() - started)
+    return len(session) / best
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Microbenchmark for the Expo log classifier')
+    parser.add_argument('--lines', type=int, default=100000, help='Lines in the synthetic session (default: 100000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per classifier; the best is kept (default: 5)')
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    session = build_session(args.lines)
+    classified = measure(expo_log.classify, session, args.repeat)
+    legacy = measure(legacy_classify, session, args.repeat)
+    report = {
+        'benchmark': 'expo_log',
+        'environment': environment_info(),
+        'lines': len(session),
+        'repeat': args.repeat,
+        'classify_lines_per_s': round(classified),
+        'legacy_lines_per_s': round(legacy),
+        'speedup': round(classified / legacy, 2),
+    }
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
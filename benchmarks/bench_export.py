@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Statement Export Benchmark
+==========================
+
+Fills a temporary ledger (backend/) with --rows transactions, serves it
+with static_server (as `launch_web_server.py --ledger-db` does) and
+downloads statements over HTTP:
+
+    month    tiliote-2024-06.csv|xlsx  (about 1/60 of the rows)
+    all      tiliote-kaikki.csv|xlsx   (every row)
+
+For each it reports time to first byte, total time, rows/s and MB/s,
+and, in a separate in-process pass under tracemalloc, the peak Python
+memory of producing the file. Streaming means the peak should be about
+the same for both sizes; the script exits with 1 if the full export
+peaks at more than --max-peak-ratio times the one-month export.
+
+Usage:
+    python benchmarks/bench_export.py
+    python benchmarks/bench_export.py --rows 200000 --output bench-results/export.json
+"""
+
+import argparse
+import http.client
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from common import environment_info, write_report
+
+from backend import Ledger
+from backend.export import label_range, open_export
+import static_server
+
+FORMATS = ('csv', 'xlsx')
+BATCH_SIZE = 20000
+MONTH = '2024-06'
+EXPORTS = (('month', MONTH), ('all', 'kaikki'))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Streaming statement export benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Transactions in the ledger (default: 1000000)')
+    parser.add_argument('--max-peak-ratio', type=float, default=4.0,
+                        help='Fail if the full export peaks above this multiple of the one-month export (default: 4)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    return parser.parse_args()
+
+
+def fill(ledger, rows, rng):
+    for offset in range(0, rows, BATCH_SIZE):
+        ledger.add_many([{
+            'id': f'bench-{index}',
+            'title': f'Ostos {rng.randrange(10 ** 6)}',
+            'amount': rng.randint(-20000, 10000) / 100,
+            'date': f'{2020 + index % 5}-{index % 12 + 1:02d}-{index % 28 + 1:02d}T12:00:00Z',
+            'category': rng.choice(('Ostokset', 'Asuminen', 'Tulot')),
+            'status': 'completed',
+            'type': 'debit',
+        } for index in range(offset, min(offset + BATCH_SIZE, rows))])
+
+
+def download(port, path):
+    """
+    GET path and read the body as it arrives.
+
+    Returns:
+        (seconds to first body byte, total seconds, body bytes)
+    """
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+    try:
+        start = time.perf_counter()
+        connection.request('GET', path)
+        response = connection.getresponse()
+        first = response.read1(65536)
+        first_byte = time.perf_counter() - start
+        size = len(first)
+        while chunk := response.read1(65536):
+            size += len(chunk)
+        if response.status != 200:
+            raise RuntimeError(f"{path}: HTTP {response.status}")
+        return first_byte, time.perf_counter() - start, size
+    finally:
+        connection.close()
+
+
+def peak_memory(ledger, name):
+    """Peak traced Python memory (bytes) of producing one export in process"""
+    tracemalloc.start()
+    try:
+        _, _, chunks = open_export(ledger, name, {})
+        for _ in chunks:
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    args = parse_arguments()
+    rng = random.Random(args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / 'bench.sqlite3'
+        web_dir = Path(tmp) / 'web'
+        web_dir.mkdir()
+        (web_dir / 'index.html').write_text('<!DOCTYPE html>')
+        ledger = Ledger(db_path)
+        try:
+            fill(ledger, args.rows, rng)
+            counts = {'month': ledger.totals(*label_range(MONTH))['count'], 'all': ledger.totals()['count']}
+            for fmt in FORMATS:
+                for size, label in EXPORTS:
+                    results[f'{fmt}_{size}'] = {
+                        'rows': counts[size],
+                        'peak_memory_mb': round(peak_memory(ledger, f'tiliote-{label}.{fmt}') / 2 ** 20, 2),
+                    }
+        finally:
+            ledger.close()
+
+        server = static_server.create_server(web_dir, port=0, host='127.0.0.1', quiet=True,
+                                             watch_interval=None, ledger_db=db_path)
+        thread = server.start_background()
+        try:
+            port = server.server_address[1]
+            for fmt in FORMATS:
+                for size, label in EXPORTS:
+                    first_byte, total, body = download(port, f'/api/export/tiliote-{label}.{fmt}')
+                    result = results[f'{fmt}_{size}']
+                    result.update({
+                        'first_byte_ms': round(first_byte * 1000, 2),
+                        'total_s': round(total, 3),
+                        'bytes': body,
+                        'rows_per_s': round(result['rows'] / total, 1),
+                        'mb_per_s': round(body / total / 2 ** 20, 2),
+                    })
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join(timeout=5)
+
+    failures = []
+    for fmt in FORMATS:
+        ratio = results[f'{fmt}_all']['peak_memory_mb'] / max(results[f'{fmt}_month']['peak_memory_mb'], 0.01)
+        results[f'{fmt}_all']['peak_ratio'] = round(ratio, 2)
+        if ratio > args.max_peak_ratio:
+            failures.append(f"{fmt}: full export peaks at {ratio:.1f}x the one-month export")
+
+    report = {
+        'benchmark': 'export',
+        'environment': environment_info(),
+        'rows': args.rows,
+        'exports': results,
+        'failures': failures,
+    }
+    write_report(report, args.output)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
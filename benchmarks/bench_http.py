@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+HTTP Load Benchmark for the Web Launcher
+========================================
+
+Starts `launch_web_server.py --local` on localhost (once per engine) and
+drives it with a pure-stdlib asyncio load generator over keep-alive
+connections. The request mix mirrors what real visitors do:
+
+    navigate     GET / with Accept-Encoding, like a first page load
+    revalidate   conditional GET of / and /sw.js, like sw.js on reload
+    manifest     GET /manifest.json
+    icons        GET /icon-192.svg and /logo.svg
+    shortcuts    GET /?screen=payment and /?screen=statement (manifest.json)
+
+Results (p50/p95/p99 latency, requests/s, bytes/s; overall and per
+scenario) are printed as JSON and optionally written to --output.
+
+Usage:
+    python benchmarks/bench_http.py
+    python benchmarks/bench_http.py --engine asyncio --connections 64 --duration 20
+    python benchmarks/bench_http.py --url http://localhost:8000 --output results.json
+"""
+
+import argparse
+import asyncio
+import random
+import subprocess
+import sys
+import time
+import urllib.parse
+
+from common import REPO_ROOT, environment_info, summarize_latencies, write_report
+
+from port_probe import find_free_port, wait_for_port
+from static_server import ENGINES
+
+ACCEPT_ENCODING = 'gzip, deflate, br'
+
+# name -> (weight, [(method, path, extra headers)]); '{etag:/path}' is
+# replaced with the ETag the server returned for that path while priming.
+SCENARIOS = {
+    'navigate': (35, [
+        ('GET', '/', {'Accept': 'text/html', 'Accept-Encoding': ACCEPT_ENCODING}),
+    ]),
+    'revalidate': (30, [
+        ('GET', '/', {'Accept-Encoding': ACCEPT_ENCODING, 'If-None-Match': '{etag:/}'}),
+        ('GET', '/sw.js', {'Accept-Encoding': ACCEPT_ENCODING, 'If-None-Match': '{etag:/sw.js}'}),
+    ]),
+    'manifest': (10, [
+        ('GET', '/manifest.json', {'Accept-Encoding': ACCEPT_ENCODING}),
+    ]),
+    'icons': (15, [
+        ('GET', '/icon-192.svg', {'Accept-Encoding': ACCEPT_ENCODING}),
+        ('GET', '/logo.svg', {'Accept-Encoding': ACCEPT_ENCODING}),
+    ]),
+    'shortcuts': (10, [
+        ('GET', '/?screen=payment', {'Accept': 'text/html', 'Accept-Encoding': ACCEPT_ENCODING}),
+        ('GET', '/?screen=statement', {'Accept': 'text/html', 'Accept-Encoding': ACCEPT_ENCODING}),
+    ]),
+}
+
+
+class HttpConnection:
+    """Minimal HTTP/1.1 keep-alive client on asyncio streams"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.writer = None
+
+    async def request(self, method, path, headers):
+        """
+        Send one request and read the full response.
+
+        Returns:
+            (status, response headers dict, bytes received)
+        """
+        if self.writer is None:
+            await self.connect()
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await self.writer.drain()
+
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        for line in header_lines:
+            if line:
+                name, _, value = line.partition(':')
+                response_headers[name.strip().lower()] = value.strip()
+
+        received = len(head)
+        if method == 'HEAD' or status in (204, 304):
+            pass
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            received += await self._read_chunked()
+        elif 'content-length' in response_headers:
+            body = await self.reader.readexactly(int(response_headers['content-length']))
+            received += len(body)
+        else:
+            received += len(await self.reader.read())
+
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, response_headers, received
+
+    async def _read_chunked(self):
+        received = 0
+        while True:
+            size_line = await self.reader.readline()
+            size = int(size_line.split(b';')[0], 16)
+            chunk = await self.reader.readexactly(size + 2)
+            received += len(size_line) + len(chunk)
+            if size == 0:
+                return received
+
+
+def build_mix():
+    """Flatten SCENARIOS into a weighted list of (scenario, request)"""
+    mix = []
+    for name, (weight, requests) in SCENARIOS.items():
+        for request in requests:
+            mix.extend([(name, request)] * max(1, weight // len(requests)))
+    return mix
+
+
+async def prime_etags(host, port):
+    """Fetch the revalidated paths once to learn their current ETags"""
+    etags = {}
+    conn = HttpConnection(host, port)
+    try:
+        for path in ('/', '/sw.js'):
+            _, headers, _ = await conn.request('GET', path, {'Accept-Encoding': ACCEPT_ENCODING})
+            etags[path] = headers.get('etag', '"none"')
+    finally:
+        await conn.close()
+    return etags
+
+
+def resolve_headers(headers, etags):
+    resolved = {}
+    for name, value in headers.items():
+        if value.startswith('{etag:'):
+            value = etags.get(value[6:-1], '"none"')
+        resolved[name] = value
+    return resolved
+
+
+async def run_load(host, port, connections=32, duration=10.0, warmup=1.0, seed=1):
+    """
+    Drive a server with the request mix.
+
+    Args:
+        host, port: Server address
+        connections: Concurrent keep-alive connections
+        duration: Seconds to measure
+        warmup: Seconds to run before measuring
+        seed: Random seed for the request sequence
+
+    Returns:
+        Report dict with overall and per-scenario statistics
+    """
+    etags = await prime_etags(host, port)
+    mix = build_mix()
+    latencies = {name: [] for name in SCENARIOS}
+    statuses = {}
+    totals = {'requests': 0, 'bytes': 0, 'errors': 0}
+
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        conn = HttpConnection(host, port)
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= stop_at:
+                    return
+                scenario, (method, path, headers) = rng.choice(mix)
+                sent = time.monotonic()
+                try:
+                    status, _, received = await conn.request(method, path, resolve_headers(headers, etags))
+                except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                    if sent >= measure_from:
+                        totals['errors'] += 1
+                    await conn.close()
+                    continue
+                elapsed = time.monotonic() - sent
+                if sent >= measure_from:
+                    latencies[scenario].append(elapsed)
+                    statuses[status] = statuses.get(status, 0) + 1
+                    totals['requests'] += 1
+                    totals['bytes'] += received
+        finally:
+            await conn.close()
+
+    await asyncio.gather(*(worker(i) for i in range(connections)))
+    measured = max(time.monotonic() - measure_from, 1e-9)
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        'connections': connections,
+        'duration_s': round(measured, 3),
+        'requests': totals['requests'],
+        'errors': totals['errors'],
+        'requests_per_s': round(totals['requests'] / measured, 1),
+        'bytes_per_s': round(totals['bytes'] / measured, 1),
+        'latency': summarize_latencies(all_latencies),
+        'status_counts': {str(code): count for code, count in sorted(statuses.items())},
+        'scenarios': {name: summarize_latencies(values) for name, values in latencies.items()},
+    }
+
+
+def launch_server(engine, port):
+    """
+    Start launch_web_server.py --local in a subprocess and wait for it.
+
+    Returns:
+        The Popen object
+    """
+    process = subprocess.Popen(
+        [sys.executable, str(REPO_ROOT / 'launch_web_server.py'), '--local', '--no-browser',
+         '--engine', engine, '--port', str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        stdin=subprocess.DEVNULL,
+        cwd=REPO_ROOT,
+    )
+    try:
+        wait_for_port(port, timeout=30, alive=lambda: process.poll() is None)
+    except TimeoutError:
+        process.kill()
+        process.wait()
+        raise
+    return process
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Load benchmark for the web launcher')
+    parser.add_argument('--engine', choices=ENGINES + ('all',), default='all',
+                        help='Engine(s) to start and benchmark (default: all)')
+    parser.add_argument('--url', help='Benchmark an already running server instead')
+    parser.add_argument('--port', type=int, default=8600, help='First port to try (default: 8600)')
+    parser.add_argument('--connections', type=int, default=32, help='Concurrent connections (default: 32)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Measured seconds per run (default: 10)')
+    parser.add_argument('--warmup', type=float, default=1.0, help='Warm-up seconds per run (default: 1)')
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    report = {'benchmark': 'http', 'environment': environment_info(), 'runs': []}
+
+    if args.url:
+        target = urllib.parse.urlsplit(args.url)
+        result = asyncio.run(run_load(target.hostname, target.port or 80, args.connections,
+                                      args.duration, args.warmup))
+        report['runs'].append({'target': args.url, **result})
+    else:
+        engines = ENGINES if args.engine == 'all' else (args.engine,)
+        for engine in engines:
+            port = find_free_port(args.port, attempts=100)
+            process = launch_server(engine, port)
+            try:
+                result = asyncio.run(run_load('127.0.0.1', port, args.connections,
+                                              args.duration, args.warmup))
+            finally:
+                stop_server(process)
+            report['runs'].append({'engine': engine, **result})
+
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Entry Point Import-Time Benchmark
+=================================
+
+Runs `python -X importtime -c "import <module>"` for install.py and
+launch_web_server.py in fresh interpreters and reports the cumulative
+import time of each (median of --repeat runs), plus the slowest modules
+they pull in.
+
+It also guards the lazy imports: modules that only some code paths need
+(webbrowser, urllib.request, asyncio, multiprocessing, tarfile) must
+not be loaded by a plain import. The script exits with 1 if one is, or
+if a median exceeds --budget-ms.
+
+Usage:
+    python benchmarks/bench_importtime.py
+    python benchmarks/bench_importtime.py --repeat 15 --budget-ms 150 --output bench-results/importtime.json
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+from common import REPO_ROOT, environment_info, write_report
+
+ENTRY_POINTS = ('install', 'launch_web_server')
+
+# Loaded only on the path that uses them
+DEFERRED_MODULES = {
+    'install': ('tarfile', 'urllib.request'),
+    'launch_web_server': ('webbrowser', 'urllib.request', 'asyncio', 'multiprocessing'),
+}
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Import-time benchmark for the entry points')
+    parser.add_argument('--repeat', type=int, default=9, help='Fresh interpreters per entry point (default: 9)')
+    parser.add_argument('--top', type=int, default=8, help='Slowest imported modules to list (default: 8)')
+    parser.add_argument('--budget-ms', type=float, help='Fail if a median import time exceeds this')
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    return parser.parse_args()
+
+
+def import_profile(module):
+    """
+    Import module in a fresh interpreter.
+
+    Returns:
+        Dict of imported module name -> (self_us, cumulative_us)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def measure(module, repeat, top):
+    runs = [import_profile(module) for _ in range(repeat)]
+    totals = [run[module][1] / 1000 for run in runs]
+    last = runs[-1]
+    slowest = sorted(((name, self_us) for name, (self_us, _) in last.items() if name != module),
+                     key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'median_ms': round(statistics.median(totals), 2),
+        'min_ms': round(min(totals), 2),
+        'modules': len(last),
+        'slowest_self_ms': {name: round(self_us / 1000, 2) for name, self_us in slowest},
+        'deferred_loaded': [name for name in DEFERRED_MODULES[module] if name in last],
+    }
+
+
+def main():
+    args = parse_arguments()
+    report = {
+        'benchmark': 'importtime',
+        'environment': environment_info(),
+        'repeat': args.repeat,
+        'entry_points': {module: measure(module, args.repeat, args.top) for module in ENTRY_POINTS},
+    }
+    failures = []
+    for module, result in report['entry_points'].items():
+        if result['deferred_loaded']:
+            failures.append(f"{module} imports {', '.join(result['deferred_loaded'])} eagerly")
+        if args.budget_ms is not None and result['median_ms'] > args.budget_ms:
+            failures.append(f"{module} takes {result['median_ms']} ms to import (budget {args.budget_ms} ms)")
+    report['failures'] = failures
+    write_report(report, args.output)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+PDF Statement Benchmark
+=======================
+
+Times the PDF writer (backend/pdf.py) in three ways:
+
+    templates    building the shared objects (fonts, logo, header) once,
+                 against reusing the cached bytes for a new document
+    statement    one statement of --rows transactions: pages/s, rows/s,
+                 time to the first chunk and the tracemalloc peak
+    batch        month-end run over --accounts ledgers with
+                 export.generate_statements(), one process against
+                 --workers processes
+
+Every generated file is checked to have a consistent cross-reference
+table; a broken file fails the run (exit 1).
+
+Usage:
+    python benchmarks/bench_pdf.py
+    python benchmarks/bench_pdf.py --rows 20000 --accounts 8 --output bench-results/pdf.json
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from common import environment_info, write_report
+
+from backend import Ledger
+from backend import export, pdf
+
+MONTH = '2025-11'
+BATCH_SIZE = 20000
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='PDF statement benchmark')
+    parser.add_argument('--rows', type=int, default=100000, help='Rows in the single statement (default: 100000)')
+    parser.add_argument('--accounts', type=int, default=16, help='Ledgers in the batch run (default: 16)')
+    parser.add_argument('--account-rows', type=int, default=2000,
+                        help='Rows per ledger in the batch run (default: 2000)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processes for the parallel batch run (default: CPU count)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    return parser.parse_args()
+
+
+def fill(ledger, rows, rng):
+    for offset in range(0, rows, BATCH_SIZE):
+        ledger.add_many([{
+            'id': f'bench-{index}',
+            'title': f'Ostos {rng.randrange(10 ** 6)} Kauppa Oy',
+            'amount': rng.randint(-20000, 10000) / 100,
+            'date': f'{MONTH}-{index % 30 + 1:02d}T12:00:00Z',
+            'category': rng.choice(('Ostokset', 'Asuminen', 'Tulot')),
+            'status': 'completed',
+            'type': 'debit',
+        } for index in range(offset, min(offset + BATCH_SIZE, rows))])
+
+
+def xref_is_valid(data):
+    startxref = int(data.rsplit(b'startxref\n', 1)[1].split()[0])
+    lines = data[startxref:].split(b'\n')
+    size = int(lines[1].split()[1])
+    return all(data[int(lines[2 + number][:10]):].startswith(b'%d 0 obj' % number) for number in range(1, size))
+
+
+def bench_templates():
+    pdf.document_prefix.cache_clear()
+    pdf.logo_form.cache_clear()
+    start = time.perf_counter()
+    pdf.warm_templates()
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(1000):
+        pdf.PageStream('statement').start()
+    warm = (time.perf_counter() - start) / 1000
+    return {'build_ms': round(cold * 1000, 3), 'reuse_us': round(warm * 1e6, 3)}
+
+
+def bench_statement(ledger, rows):
+    _, _, chunks = export.open_export(ledger, f'tiliote-{MONTH}.pdf', {})
+    start = time.perf_counter()
+    parts = [next(chunks)]
+    first_chunk = time.perf_counter() - start
+    parts.extend(chunks)
+    total = time.perf_counter() - start
+    data = b''.join(parts)
+    pages = int(re.search(rb'/Count (\d+)', data).group(1))
+
+    tracemalloc.start()
+    try:
+        for _ in export.open_export(ledger, f'tiliote-{MONTH}.pdf', {})[2]:
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'rows': rows,
+        'pages': pages,
+        'bytes': len(data),
+        'first_chunk_ms': round(first_chunk * 1000, 2),
+        'total_s': round(total, 3),
+        'pages_per_s': round(pages / total, 1),
+        'rows_per_s': round(rows / total, 1),
+        'peak_memory_mb': round(peak / 2 ** 20, 2),
+        'valid': xref_is_valid(data),
+    }
+
+
+def bench_batch(tmp, args, rng):
+    accounts_dir = tmp / 'accounts'
+    accounts_dir.mkdir()
+    db_paths = []
+    for account in range(args.accounts):
+        db_path = accounts_dir / f'account-{account:03d}.sqlite3'
+        ledger = Ledger(db_path)
+        try:
+            fill(ledger, args.account_rows, rng)
+        finally:
+            ledger.close()
+        db_paths.append(db_path)
+
+    results = {}
+    for name, workers in (('sequential', 1), ('pool', args.workers)):
+        start = time.perf_counter()
+        written = export.generate_statements(db_paths, MONTH, tmp / name, workers=workers)
+        seconds = time.perf_counter() - start
+        results[name] = {
+            'workers': workers,
+            'seconds': round(seconds, 3),
+            'statements_per_s': round(len(written) / seconds, 1),
+            'valid': all(xref_is_valid(path.read_bytes()) for path, _ in written),
+        }
+    results['speedup'] = round(results['sequential']['seconds'] / results['pool']['seconds'], 2)
+    return results
+
+
+def main():
+    args = parse_arguments()
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        templates = bench_templates()
+        ledger = Ledger(tmp / 'bench.sqlite3')
+        try:
+            fill(ledger, args.rows, rng)
+            statement = bench_statement(ledger, args.rows)
+        finally:
+            ledger.close()
+        batch = bench_batch(tmp, args, rng)
+
+    report = {
+        'benchmark': 'pdf',
+        'environment': environment_info(),
+        'templates': templates,
+        'statement': statement,
+        'batch': batch,
+    }
+    write_report(report, args.output)
+    valid = statement['valid'] and batch['sequential']['valid'] and batch['pool']['valid']
+    return 0 if valid else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
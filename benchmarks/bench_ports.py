@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Expo Port Allocation Benchmark
+==============================
+
+Measures how long install.start_expo_and_show_qr() takes to get Metro
+running when the preferred port is already taken, in two ways:
+
+    restart      - the old path: spawn Expo on the busy port, wait for
+                   "Port X is being used", kill it and spawn again
+    preallocated - find a free port with port_probe first and spawn once
+
+`npx expo start` is replaced by a stand-in that sleeps --boot seconds
+(the npx + Metro start-up cost) and then binds its port, printing the
+same lines Expo prints on a conflict. The busy port is held by a
+listening socket for the whole run.
+
+Usage:
+    python benchmarks/bench_ports.py
+    python benchmarks/bench_ports.py --boot 2.0 --repeat 3 --output bench-results/ports.json
+"""
+
+import argparse
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from pathlib import Path
+from unittest import mock
+
+from common import environment_info, write_report
+
+import install
+
+FAKE_EXPO = textwrap.dedent("""
+    import socket, sys, time
+    port, boot = int(sys.argv[1]), float(sys.argv[2])
+    print('Starting Metro Bundler', flush=True)
+    time.sleep(boot)
+    server = socket.socket()
+    try:
+        server.bind(('', port))
+    except OSError:
+        print(f'Port {port} is being used by another process', flush=True)
+        print(f'› Use port {port + 1} instead?', flush=True)
+        print('Input is required, but Expo CLI is in non-interactive mode.', flush=True)
+        print('Skipping dev server', flush=True)
+        sys.exit(1)
+    server.listen()
+    print(f'› Metro waiting on exp://127.0.0.1:{port}', flush=True)
+    time.sleep(60)
+""")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Benchmark Expo start-up with a busy port')
+    parser.add_argument('--boot', type=float, default=1.0,
+                        help='Simulated npx + Metro start-up time in seconds (default: 1.0)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per path (default: 3)')
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    return parser.parse_args()
+
+
+def run_path(script, busy_port, boot, preallocate):
+    """Start Expo once; returns (seconds until ready, processes spawned)"""
+    spawned = []
+
+    def fake_popen(cmd, **kwargs):
+        process = subprocess.Popen(
+            [sys.executable, str(script), cmd[-1], str(boot)],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        spawned.append(process)
+        return process
+
+    with mock.patch.object(install, 'popen', side_effect=fake_popen), \
+         mock.patch.object(install, 'QR_CACHE_DIR', script.parent / 'qr'), \
+         mock.patch.object(install, 'echo'):
+        started = time.perf_counter()
+        proc = install.start_expo_and_show_qr(interactive=False, port=busy_port, preallocate=preallocate)
+        elapsed = time.perf_counter() - started
+    for process in spawned:
+        process.kill()
+        process.wait()
+        process.stdout.close()
+    if proc is None:
+        raise RuntimeError('Expo stand-in did not start')
+    return elapsed, len(spawned)
+
+
+def main():
+    args = parse_arguments()
+    report = {
+        'benchmark': 'ports',
+        'environment': environment_info(),
+        'boot_s': args.boot,
+        'repeat': args.repeat,
+        'paths': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp, socket.socket() as busy:
+        script = Path(tmp) / 'fake_expo.py'
+        script.write_text(FAKE_EXPO)
+        busy.bind(('', 0))
+        busy.listen()
+        busy_port = busy.getsockname()[1]
+        for name, preallocate in (('restart', False), ('preallocated', True)):
+            runs = [run_path(script, busy_port, args.boot, preallocate) for _ in range(args.repeat)]
+            report['paths'][name] = {
+                'median_s': round(statistics.median(seconds for seconds, _ in runs), 3),
+                'spawns': runs[0][1],
+            }
+    paths = report['paths']
+    report['speedup'] = round(paths['restart']['median_s'] / paths['preallocated']['median_s'], 2)
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Period Report Benchmark
+=======================
+
+Fills a temporary ledger (backend/) with --rows transactions over five
+years and times:
+
+    report     Ledger.report() for a random month, quarter and year, read
+               from the period_totals rollups, against the GROUP BY scan
+               of the period's transactions it replaces
+    writes     add / update (category change) / delete latency with the
+               rollups maintained
+    rebuild    the set-based rebuild used for backfills and repairs
+
+Every rollup answer is compared with the scan, and check_balances() runs
+at the end, so a wrong report fails the run (exit 1).
+
+Usage:
+    python benchmarks/bench_reports.py
+    python benchmarks/bench_reports.py --rows 100000 --queries 500 --output bench-results/reports.json
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import environment_info, summarize_latencies, write_report
+
+from backend import Ledger
+from backend.reports import PERIODS
+
+BATCH_SIZE = 20000
+YEARS = range(2021, 2026)
+CATEGORIES = ('Ostokset', 'Asuminen', 'Ruoka', 'Liikenne', 'Viihde', 'Tulot', 'Terveys', 'Muut')
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Period report benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Transactions in the ledger (default: 1000000)')
+    parser.add_argument('--queries', type=int, default=1000, help='Rollup reports per period (default: 1000)')
+    parser.add_argument('--scans', type=int, default=5, help='GROUP BY scans per period (default: 5)')
+    parser.add_argument('--writes', type=int, default=500, help='Writes per kind (default: 500)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    return parser.parse_args()
+
+
+def random_day(rng):
+    return f'{rng.choice(YEARS)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+
+
+def fill(ledger, rows, rng):
+    start = time.perf_counter()
+    for offset in range(0, rows, BATCH_SIZE):
+        ledger.add_many([{
+            'id': f'bench-{index}',
+            'title': 'Ostos',
+            'amount': rng.randint(-20000, 10000) / 100,
+            'date': f'{random_day(rng)}T12:00:00Z',
+            'category': rng.choice(CATEGORIES),
+            'status': 'completed',
+            'type': 'debit',
+        } for index in range(offset, min(offset + BATCH_SIZE, rows))])
+    return time.perf_counter() - start
+
+
+def time_each(calls):
+    """Run each zero-argument callable; returns (results, latencies in seconds)"""
+    results, latencies = [], []
+    for call in calls:
+        start = time.perf_counter()
+        results.append(call())
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def scan(connection, date_from, date_to):
+    """Per-category (inflow, outflow, count) of a period straight from the transactions"""
+    return {row[0]: row[1:] for row in connection.execute(
+        'SELECT category, SUM(MAX(amount_cents, 0)), SUM(MAX(-amount_cents, 0)), COUNT(*) '
+        'FROM transactions WHERE date >= ? AND date <= ? GROUP BY category', (date_from, date_to + '~'))}
+
+
+def as_cents(report):
+    return {c['category']: (round(c['inflow'] * 100), round(c['outflow'] * 100), c['count'])
+            for c in report['categories']}
+
+
+def bench_reports(ledger, args, rng):
+    connection = ledger._connection()
+    results, mismatches = {}, []
+    for period in PERIODS:
+        days = [random_day(rng) for _ in range(args.queries)]
+        reports, latencies = time_each([lambda day=day: ledger.report(period, day, history=1) for day in days])
+        scans, scan_latencies = time_each([lambda r=r: scan(connection, r['from'], r['to'])
+                                           for r in reports[:args.scans]])
+        mismatches += [report['key'] for report, expected in zip(reports, scans) if as_cents(report) != expected]
+        rollup_mean = sum(latencies) / len(latencies)
+        scan_mean = sum(scan_latencies) / len(scan_latencies)
+        results[period] = {
+            'rollup': summarize_latencies(latencies),
+            'group_by_scan': summarize_latencies(scan_latencies),
+            'speedup': round(scan_mean / rollup_mean, 1) if rollup_mean else None,
+        }
+    return results, mismatches
+
+
+def bench_writes(ledger, args, rng):
+    ids = [f'write-{index}' for index in range(args.writes)]
+    _, add_latencies = time_each([lambda i=i: ledger.add({
+        'id': i, 'title': 'Maksu', 'amount': rng.randint(-5000, 5000) / 100, 'date': random_day(rng),
+        'category': rng.choice(CATEGORIES), 'status': 'completed', 'type': 'debit',
+    }) for i in ids])
+    _, update_latencies = time_each([lambda i=i: ledger.update(i, {'category': rng.choice(CATEGORIES)})
+                                     for i in ids])
+    _, delete_latencies = time_each([lambda i=i: ledger.delete(i) for i in ids])
+    return {
+        'add': summarize_latencies(add_latencies),
+        'update_category': summarize_latencies(update_latencies),
+        'delete': summarize_latencies(delete_latencies),
+    }
+
+
+def main():
+    args = parse_arguments()
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(Path(tmp) / 'bench.sqlite3')
+        try:
+            fill_seconds = fill(ledger, args.rows, rng)
+            reports, mismatches = bench_reports(ledger, args, rng)
+            writes = bench_writes(ledger, args, rng)
+            start = time.perf_counter()
+            ledger.rebuild_balances()
+            rebuild_seconds = time.perf_counter() - start
+            problems = ledger.check_balances()
+        finally:
+            ledger.close()
+
+    report = {
+        'benchmark': 'reports',
+        'environment': environment_info(),
+        'rows': args.rows,
+        'fill': {'seconds': round(fill_seconds, 2), 'rows_per_s': round(args.rows / fill_seconds, 1)},
+        'reports': reports,
+        'writes': writes,
+        'rebuild': {'seconds': round(rebuild_seconds, 3)},
+        'check': {'problems': len(problems)},
+        'mismatches': mismatches[:20],
+    }
+    write_report(report, args.output)
+    return 1 if mismatches or problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
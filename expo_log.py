@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+expo_log.py
+
+Expo/Metro-tulosteen luokittelija.
+
+Kaikki install.py:n tunnistamat rivityypit on koottu yhteen valmiiksi
+käännettyyn vaihtoehtolausekkeeseen (nimetyt ryhmät). classify() käy rivin
+läpi kerran ja palauttaa tyypitetyt tapahtumat. Tavalliset
+bundlausrivit, joita pitkässä Metro-istunnossa on tuhansia, eivät osu
+mihinkään ja palauttavat tyhjän tuplen.
+
+Tapahtumat:
+    PORT_CONFLICT      "Port 8081 is being used by another process" (port)
+    SUGGESTED_PORT     "Use port 8082 instead?" (port)
+    INPUT_REQUIRED     "Input is required, but ..." (ei-interaktiivinen Expo)
+    SKIPPING_DEV_SERVER "Skipping dev server"
+    EXPO_URL           exp://192.168.1.20:8081 (url)
+    READY              "Metro waiting on ..." / "Logs for your project ..."
+
+install.py ja test_install.py käyttävät tätä moduulia.
+"""
+from __future__ import annotations
+import re
+from typing import NamedTuple, Optional, Tuple
+
+PORT_CONFLICT = "port_conflict"
+SUGGESTED_PORT = "suggested_port"
+INPUT_REQUIRED = "input_required"
+SKIPPING_DEV_SERVER = "skipping_dev_server"
+EXPO_URL = "expo_url"
+READY = "ready"
+
+EVENT_KINDS = (PORT_CONFLICT, SUGGESTED_PORT, INPUT_REQUIRED,
+               SKIPPING_DEV_SERVER, EXPO_URL, READY)
+
+
+class ExpoEvent(NamedTuple):
+    """Yksi tunnistettu tapahtuma Expon tulosteessa"""
+    kind: str
+    port: Optional[int] = None
+    url: Optional[str] = None
+
+
+# Yksi lauseke, yksi läpikäynti. Ryhmien nimet vastaavat tapahtumia.
+# Lauseke on kirjoitettu pienillä kirjaimilla ja sitä ajetaan rivin
+# lower()-versiota vasten: IGNORECASE-vertailu on sre:ssä moninkertaisesti
+# hitaampi kuin yksi lower()-kutsu.
+EXPO_LINE_PATTERN = re.compile(
+    r"(?P<port_conflict>port (?P<conflict_port>\d+) is (?:being used|already in use)"
+    r"|address already in use \S*?:(?P<eaddrinuse_port>\d+))"
+    r"|(?P<suggested_port>use port (?P<suggested>\d+) instead)"
+    r"|(?P<input_required>input is required)"
+    r"|(?P<skipping_dev_server>skipping dev server)"
+    r"|(?P<expo_url>exp://[\w.\-]+:\d+)"
+    r"|(?P<ready>metro waiting|logs for your project)"
+)
+
+# Jokaisen tapahtuman sisältämät kirjaimelliset sanat. Tämä etsintä on
+# nopea, koska vaihtoehdot alkavat eri kirjaimilla; tavallinen bundlausrivi
+# hylätään ilman, että varsinaista lauseketta ajetaan lainkaan.
+_PREFILTER = re.compile(r"port|address|input|skipping|exp://|metro|logs for")
+
+
+def classify(line: str) -> Tuple[ExpoEvent, ...]:
+    """
+    Luokittelee yhden tulosterivin.
+
+    Returns:
+        Tuple tapahtumia rivillä esiintymisjärjestyksessä; tyhjä, jos rivi
+        ei kiinnosta
+    """
+    lowered = line.lower()
+    if _PREFILTER.search(lowered) is None:
+        return ()
+    # lower() voi muuttaa pituutta (esim. "İ"), jolloin URL luetaan
+    # pienennetystä rivistä
+    same_offsets = len(lowered) == len(line)
+    events = []
+    for match in EXPO_LINE_PATTERN.finditer(lowered):
+        kind = match.lastgroup
+        if kind == "port_conflict":
+            # lastgroup on uloin osunut ryhmä, joten sisäryhmät luetaan erikseen
+            port = match.group("conflict_port") or match.group("eaddrinuse_port")
+            events.append(ExpoEvent(PORT_CONFLICT, port=int(port)))
+        elif kind == "suggested_port":
+            events.append(ExpoEvent(SUGGESTED_PORT, port=int(match.group("suggested"))))
+        elif kind == "expo_url":
+            url = line[match.start():match.end()] if same_offsets else match.group()
+            events.append(ExpoEvent(EXPO_URL, url=url))
+        else:
+            events.append(ExpoEvent(kind))
+    return tuple(events)
+
+
+def find_expo_url(line: str) -> Optional[str]:
+    """Palauttaa rivin exp://-URL:n tai None"""
+    for event in classify(line):
+        if event.kind == EXPO_URL:
+            return event.url
+    return None
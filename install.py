@@ -9,6 +9,54 @@ Parannus (Windows):
   jolloin Windowsissa (.cmd/.bat) lista muutetaan merkkijonoksi ja shell=True.
 - popen() käyttää normalize_cmd:ia ja palauttaa subprocess.Popen-instanssin.
 - run() käyttää normalize_cmd:ia.
+
+Riippuvuusvälimuisti:
+- install_node_dependencies() ohittaa 'npm ci':n, kun package.json,
+  package-lock.json ja Node/npm-versiot ovat samat kuin edellisellä
+  onnistuneella asennuksella (leima node_modules/.install-stamp.json)
+  ja node_modules on ehjä.
+- --deps-cache DIR tallentaa node_modulesin tar-pakettina leiman
+  tiivisteen nimellä ja palauttaa sen tuoreeseen checkoutiin sekunneissa.
+
+Ympäristön tarkistus:
+- probe_environment() ajaa node/npm-versiot, `npx expo whoami`:n ja
+  backendin etsinnän rinnakkain säiepoolissa, kukin omalla aikarajallaan,
+  ja kokoaa tulokset yhdeksi raportiksi. Tarkistus kestää näin suunnilleen
+  hitaimman yksittäisen tarkistuksen verran.
+- ProbeCache tallentaa ohjelmien polut, versiot ja `expo whoami`:n
+  tuloksen tiedostoon .install_cache/probes.json. Avaimena ovat PATH,
+  ohjelman polku ja mtime (whoamille Expon state.json:n mtime) ja
+  tuloksilla on TTL. --refresh ohittaa välimuistin.
+
+Expon tuloste:
+- ExpoOutputReader lukee Expon stdoutia omassa säikeessään. Käynnistyksen
+  aikana rivit välitetään jonon kautta, joten aikaraja toimii vaikka Metro
+  olisi hiljaa. Käynnistyksen jälkeen säie jatkaa tulosteen lukemista,
+  jottei putken puskuri täyty ja pysäytä Metroa.
+- Rivit luokitellaan expo_log.classify():lla (yksi käännetty lauseke).
+
+Prosessien valvonta:
+- ProcessSupervisor käynnistää backendin ja Expon yhtä aikaa. Valmius
+  todetaan oikeista signaaleista (backendin portti vastaa, Metro
+  ilmoittaa olevansa valmis) eikä kiinteillä odotuksilla.
+- Kummankin tuloste näytetään etuliitteellä ([backend], [expo]).
+- Lopetettaessa kaikki prosessit pysäytetään rinnakkain yhteisellä
+  aikarajalla; jumiin jääneet tapetaan.
+
+Bundlen lämmitys (--warm):
+- Kun Metro on valmis, warm_metro_bundles() pyytää iOS-, Android- ja
+  web-bundlet rinnakkain paikalliselta Metrolta ja raportoi ajat ja
+  koot. QR-koodi näytetään vasta tämän jälkeen, joten ensimmäinen
+  skannaus osuu lämpimään bundleriin.
+
+Käynnistysaika:
+- Vain osalla poluista tarvittavat moduulit (tarfile, urllib.request)
+  tuodaan funktioiden sisällä, jotta valikko aukeaa nopeasti.
+
+QR-koodi:
+- qr_terminal.py koodaa ja piirtää QR-koodin ilman lisäpaketteja.
+  Piirretty koodi tallennetaan .install_cache/qr/-hakemistoon URL:n
+  mukaan, joten sama URL tulostuu seuraavalla kerralla levyltä.
 """
 from __future__ import annotations
 import os
@@ -18,12 +66,60 @@ import shutil
 import subprocess
 import re
 import time
+import hashlib
+import tempfile
 import argparse
+import concurrent.futures
+import queue
+import threading
 from pathlib import Path
-from typing import Optional, Tuple, Union
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import expo_log
+import qr_terminal
+from port_probe import find_free_port, wait_for_port
 
 ROOT = Path.cwd()
 
+# Riippuvuusleima ja sen syötteet
+DEPS_STAMP_NAME = ".install-stamp.json"
+DEPS_HASH_FILES = ("package.json", "package-lock.json", "yarn.lock")
+
+# Ympäristötarkistusten aikarajat sekunteina
+PROBE_TIMEOUTS = {
+    "node": 10.0,
+    "npm": 15.0,
+    "expo_user": 30.0,  # npx voi joutua ratkaisemaan paketin
+    "backend": 5.0,
+}
+TIMEOUT_EXIT_CODE = 124
+
+# Tarkistusvälimuisti
+PROBE_CACHE_FILE = ROOT / ".install_cache" / "probes.json"
+PROBE_CACHE_VERSION = 1
+PROGRAM_TTL = 24 * 3600  # shutil.which-tulokset ja versiot
+WHOAMI_TTL = 3600  # kirjautumistila vanhenee nopeammin
+
+EXPO_START_TIMEOUT = 30.0  # sekuntia odotetaan Expon valmiutta
+EXPO_DEFAULT_PORT = 8081
+EXPO_PORT_ATTEMPTS = 20  # montako porttia kokeillaan oletusportista ylöspäin
+
+# Bundlen lämmitys
+WARM_PLATFORMS = ("ios", "android", "web")
+WARM_TIMEOUT = 300.0  # sekuntia per bundle; kylmä bundlaus voi kestää minuutteja
+WARM_CHUNK_SIZE = 64 * 1024
+
+QR_CACHE_DIR = ROOT / ".install_cache" / "qr"  # piirretyt QR-koodit URL:n mukaan
+
+# Prosessien valvonta
+BACKEND_PORT = int(os.environ.get("PORT", "3000"))  # välitetään backendille PORT-muuttujana
+BACKEND_READY_TIMEOUT = 20.0  # sekuntia odotetaan backendin porttia
+SUPERVISOR_POLL_INTERVAL = 0.2
+SHUTDOWN_TIMEOUT = 5.0  # sekuntia odotetaan ennen kuin prosessi tapetaan
+
+# Taustasäikeet tulostavat samaan terminaaliin
+_OUTPUT_LOCK = threading.Lock()
+
 def echo(msg: str = ""):
     print(msg)
     sys.stdout.flush()
@@ -50,7 +146,8 @@ def normalize_cmd(cmd: Union[str, list, tuple]) -> Tuple[Union[str, list], bool]
             return (cmd, True)
 
 def run(cmd: Union[str, list, tuple], capture: bool = False, check: bool = False, 
-        env: Optional[dict] = None, shell: Optional[bool] = None, text: bool = True):
+        env: Optional[dict] = None, shell: Optional[bool] = None, text: bool = True,
+        quiet: bool = False, timeout: Optional[float] = None):
     """
     Suorittaa komennon käyttäen normalize_cmd:ia.
     
@@ -61,6 +158,9 @@ def run(cmd: Union[str, list, tuple], capture: bool = False, check: bool = False
         env: Ympäristömuuttujat
         shell: Jos annettu, override normalize_cmd:n shell-flag
         text: Jos True, käyttää text=True (str output)
+        quiet: Jos True, komentoa ei tulosteta
+        timeout: Aikaraja sekunteina; ylittyessä prosessi tapetaan ja
+            palautetaan (TIMEOUT_EXIT_CODE, None)
     
     Returns:
         (returncode, stdout_or_None)
@@ -73,7 +173,8 @@ def run(cmd: Union[str, list, tuple], capture: bool = False, check: bool = False
         cmd_display = " ".join(cmd)
     else:
         cmd_display = str(cmd)
-    echo(f"$ {cmd_display}")
+    if not quiet:
+        echo(f"$ {cmd_display}")
 
     try:
         if capture:
@@ -84,20 +185,26 @@ def run(cmd: Union[str, list, tuple], capture: bool = False, check: bool = False
                 env=env, 
                 shell=shell_flag, 
                 check=check, 
-                text=text
+                text=text,
+                timeout=timeout
             )
             return res.returncode, res.stdout
         else:
-            res = subprocess.run(cmd_for_subproc, env=env, shell=shell_flag)
+            res = subprocess.run(cmd_for_subproc, env=env, shell=shell_flag, timeout=timeout)
             return res.returncode, None
     except subprocess.CalledProcessError as e:
         return e.returncode, getattr(e, "output", None)
+    except subprocess.TimeoutExpired:
+        if not quiet:
+            echo(f"! Aikaraja ylittyi ({timeout:.0f} s): {cmd_display}")
+        return TIMEOUT_EXIT_CODE, None
     except FileNotFoundError as e:
         echo(f"\n! Komentoa ei löydy: {e}")
         return 2, None
 
 def popen(cmd: Union[str, list, tuple], env: Optional[dict] = None, 
-          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text: bool = True):
+          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text: bool = True,
+          cwd: Optional[Path] = None):
     """
     Käynnistää prosessin käyttäen normalize_cmd:ia.
     Palauttaa subprocess.Popen-instanssin.
@@ -109,12 +216,121 @@ def popen(cmd: Union[str, list, tuple], env: Optional[dict] = None,
         stderr=stderr, 
         env=env, 
         shell=shell_flag, 
-        text=text
+        text=text,
+        cwd=cwd
     )
 
+def kill_process(proc: subprocess.Popen, timeout: float = SHUTDOWN_TIMEOUT):
+    """Tappaa prosessin ja odottaa sitä enintään timeout sekuntia"""
+    proc.kill()
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        echo(f"! Prosessi {proc.pid} ei päättynyt edes tappamalla")
+
+def stop_process(proc: subprocess.Popen, timeout: float = SHUTDOWN_TIMEOUT) -> bool:
+    """
+    Pysäyttää prosessin: terminate, odotus enintään timeout sekuntia ja
+    sitten kill. Palauttaa False, jos prosessi jouduttiin tappamaan.
+    """
+    if proc.poll() is None:
+        proc.terminate()
+    try:
+        proc.wait(timeout)
+        return True
+    except subprocess.TimeoutExpired:
+        kill_process(proc, timeout)
+        return False
+
+class ProbeCache:
+    """
+    Pysyvä välimuisti hitaille ympäristötarkistuksille.
+    
+    Jokainen tulos tallennetaan nimen alle yhdessä sormenjäljen kanssa
+    (esim. PATH tai ohjelman polku ja mtime). Tulos kelpaa, kun sormenjälki
+    on sama ja TTL ei ole umpeutunut. Tiedosto kirjoitetaan atomisesti;
+    rikkinäinen tai vanhan muotoinen tiedosto vain ohitetaan.
+    
+    Args:
+        path: Välimuistitiedosto
+        refresh: Jos True, vanhoja tuloksia ei lueta (uudet tallennetaan)
+    """
+    
+    def __init__(self, path: Path, refresh: bool = False):
+        self.path = Path(path)
+        self.refresh = refresh
+        self._entries: Optional[dict] = None
+        self._lock = threading.Lock()
+    
+    def _load(self) -> dict:
+        if self._entries is None:
+            data = None
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                pass
+            if not isinstance(data, dict) or data.get("version") != PROBE_CACHE_VERSION:
+                data = {"version": PROBE_CACHE_VERSION, "entries": {}}
+            self._entries = data["entries"]
+        return self._entries
+    
+    def get(self, name: str, fingerprint: str, ttl: float) -> Tuple[bool, object]:
+        """Palauttaa (löytyi, arvo)"""
+        if self.refresh:
+            return False, None
+        with self._lock:
+            entry = self._load().get(name)
+        if (not entry or entry.get("fingerprint") != fingerprint
+                or time.time() - entry.get("stored", 0) > ttl):
+            return False, None
+        return True, entry.get("value")
+    
+    def put(self, name: str, fingerprint: str, value: object):
+        """Tallentaa tuloksen ja kirjoittaa tiedoston"""
+        with self._lock:
+            entries = self._load()
+            entries[name] = {"fingerprint": fingerprint, "stored": time.time(), "value": value}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"version": PROBE_CACHE_VERSION, "entries": entries}, f, indent=2)
+                os.replace(tmp_name, self.path)
+            except OSError:
+                pass  # välimuisti on vain nopeutus
+
+PROBE_CACHE = ProbeCache(PROBE_CACHE_FILE)
+
+def file_fingerprint(path: Optional[str]) -> str:
+    """Polku ja mtime_ns; muuttuu kun ohjelma päivitetään tai vaihdetaan"""
+    if not path:
+        return "-"
+    try:
+        return f"{path}@{os.stat(path).st_mtime_ns}"
+    except OSError:
+        return f"{path}@-"
+
+def find_program(prog: str) -> Optional[str]:
+    """
+    shutil.which välimuistin kautta (avaimena PATH).
+    
+    Puuttuvaa ohjelmaa ei tallenneta: juuri asennettu Node/npm löytyy
+    heti seuraavalla ajolla ilman --refreshiä.
+    """
+    fingerprint = os.environ.get("PATH", "") + "|" + os.environ.get("PATHEXT", "")
+    name = f"which:{prog}"
+    hit, path = PROBE_CACHE.get(name, fingerprint, PROGRAM_TTL)
+    if hit and path is not None and os.path.exists(path):
+        return path
+    path = shutil.which(prog)
+    if path is not None:
+        PROBE_CACHE.put(name, fingerprint, path)
+    return path
+
 def check_program(prog: str) -> bool:
     """Tarkistaa onko ohjelma saatavilla"""
-    return shutil.which(prog) is not None
+    return find_program(prog) is not None
 
 def read_json(path: Path) -> Optional[dict]:
     """Lukee JSON-tiedoston"""
@@ -143,20 +359,172 @@ def compare_major(installed_ver: str, required: str) -> bool:
     req_major = int(req_match.group(1))
     return inst[0] >= req_major
 
-def ensure_python_package(package_name: str) -> bool:
-    """Varmistaa että Python-paketti on asennettu"""
+def tool_version(prog: str, timeout: Optional[float] = None) -> Optional[str]:
+    """
+    Palauttaa ohjelman `--version`-tulosteen tai None.
+    
+    Tulos tallennetaan ProbeCacheen ohjelman polun ja mtimen mukaan;
+    epäonnistumisia ei tallenneta.
+    """
+    path = find_program(prog)
+    if path is None:
+        return None
+    name = f"version:{prog}"
+    fingerprint = file_fingerprint(path)
+    hit, version = PROBE_CACHE.get(name, fingerprint, PROGRAM_TTL)
+    if hit:
+        return version
+    code, out = run([prog, "--version"], capture=True, quiet=True, timeout=timeout)
+    if code != 0 or not out:
+        return None
+    PROBE_CACHE.put(name, fingerprint, out.strip())
+    return out.strip()
+
+def dependency_hash(root: Path = None) -> Optional[str]:
+    """
+    Laskee riippuvuusleiman tiivisteen.
+    
+    Syötteet: package.json, lukkotiedostot sekä Node- ja npm-versiot
+    (natiivimoduulit käännetään Node-versiota vasten).
+    
+    Returns:
+        SHA-256 hex, tai None jos package.json puuttuu
+    """
+    root = root or ROOT
+    if not (root / "package.json").exists():
+        return None
+    digest = hashlib.sha256()
+    for name in DEPS_HASH_FILES:
+        path = root / name
+        digest.update(name.encode() + b"\0")
+        if path.exists():
+            digest.update(path.read_bytes())
+        digest.update(b"\0")
+    for prog in ("node", "npm"):
+        digest.update(f"{prog}={tool_version(prog) or '-'}\0".encode())
+    return digest.hexdigest()
+
+def read_deps_stamp(root: Path = None) -> Optional[dict]:
+    """Lukee node_modules/.install-stamp.json -leiman"""
+    root = root or ROOT
+    try:
+        with open(root / "node_modules" / DEPS_STAMP_NAME, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_deps_stamp(deps_hash: str, installer: str, root: Path = None):
+    """Kirjoittaa leiman onnistuneen asennuksen jälkeen"""
+    root = root or ROOT
+    stamp = {
+        "hash": deps_hash,
+        "installer": installer,
+        "node": tool_version("node"),
+        "npm": tool_version("npm"),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
     try:
-        __import__(package_name)
+        with open(root / "node_modules" / DEPS_STAMP_NAME, "w", encoding="utf-8") as f:
+            json.dump(stamp, f, indent=2)
+    except OSError as e:
+        echo(f"! Riippuvuusleiman kirjoitus epäonnistui: {e}")
+
+def node_modules_intact(root: Path = None) -> bool:
+    """
+    Nopea eheystarkistus: jokaisella package.jsonin suoralla
+    riippuvuudella on node_modules/<nimi>/package.json.
+    """
+    root = root or ROOT
+    modules = root / "node_modules"
+    if not modules.is_dir():
+        return False
+    data = read_json(root / "package.json") or {}
+    for section in ("dependencies", "devDependencies"):
+        for name in data.get(section) or {}:
+            if not (modules / name / "package.json").exists():
+                return False
+    return True
+
+def dependencies_up_to_date(deps_hash: Optional[str], root: Path = None) -> bool:
+    """True kun leima vastaa tiivistettä ja node_modules on ehjä"""
+    if deps_hash is None:
+        return False
+    stamp = read_deps_stamp(root)
+    return bool(stamp) and stamp.get("hash") == deps_hash and node_modules_intact(root)
+
+def deps_cache_path(cache_dir: Path, deps_hash: str) -> Path:
+    """Tar-paketin polku välimuistissa"""
+    return Path(cache_dir) / f"node_modules-{deps_hash[:32]}.tar"
+
+def save_deps_cache(cache_dir: Path, deps_hash: str, root: Path = None) -> bool:
+    """
+    Tallentaa node_modulesin tar-pakettina (pakkaamaton: purku on
+    levyn nopeudella eikä CPU:n).
+    """
+    root = root or ROOT
+    target = deps_cache_path(cache_dir, deps_hash)
+    if target.exists():
         return True
-    except ImportError:
-        echo(f"- Asennetaan Python-paketti: {package_name}")
-        code, _ = run([sys.executable, "-m", "pip", "install", package_name], capture=True)
-        return code == 0
+    echo(f"- Tallennetaan node_modules välimuistiin: {target}")
+    import tarfile
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            with tarfile.open(tmp_name, "w") as tar:
+                tar.add(root / "node_modules", arcname="node_modules")
+            os.replace(tmp_name, target)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+    except (OSError, tarfile.TarError) as e:
+        echo(f"! Välimuistiin tallennus epäonnistui: {e}")
+        return False
+    return True
 
-def install_node_dependencies():
+def restore_deps_cache(cache_dir: Path, deps_hash: str, root: Path = None) -> bool:
+    """
+    Palauttaa node_modulesin välimuistin tar-paketista.
+    
+    Paketti puretaan ensin väliaikaiseen hakemistoon ja vaihdetaan
+    paikalleen vasta onnistuneen purun jälkeen.
+    """
+    root = root or ROOT
+    source = deps_cache_path(cache_dir, deps_hash)
+    if not source.exists():
+        return False
+    echo(f"- Palautetaan node_modules välimuistista: {source}")
+    import tarfile
+    staging = Path(tempfile.mkdtemp(dir=root, prefix=".node_modules-"))
+    try:
+        with tarfile.open(source, "r") as tar:
+            if hasattr(tarfile, "data_filter"):
+                tar.extractall(staging, filter="data")
+            else:
+                tar.extractall(staging)
+        modules = root / "node_modules"
+        if modules.exists():
+            shutil.rmtree(modules)
+        os.replace(staging / "node_modules", modules)
+    except (OSError, tarfile.TarError) as e:
+        echo(f"! Välimuistista palautus epäonnistui: {e}")
+        return False
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return node_modules_intact(root)
+
+def install_node_dependencies(force: bool = False, cache_dir: Optional[Path] = None):
     """
     Asentaa node-riippuvuudet.
     Yrittää järjestyksessä: npm ci, npm install, yarn install.
+    
+    Asennus ohitetaan, kun riippuvuusleima vastaa nykyisiä tiedostoja ja
+    työkaluversioita ja node_modules on ehjä.
+    
+    Args:
+        force: Asenna vaikka leima olisi ajan tasalla
+        cache_dir: Tar-välimuistin hakemisto (None = ei välimuistia)
     """
     echo("\n=== Asennetaan riippuvuudet ===")
     
@@ -165,6 +533,22 @@ def install_node_dependencies():
         echo("! package.json ei löydy, ohitetaan riippuvuuksien asennus")
         return False
     
+    deps_hash = dependency_hash()
+    if not force and dependencies_up_to_date(deps_hash):
+        echo(f"✓ Riippuvuudet ajan tasalla (leima {deps_hash[:12]}), ohitetaan asennus")
+        return True
+    
+    if cache_dir and not force and restore_deps_cache(cache_dir, deps_hash):
+        write_deps_stamp(deps_hash, "cache")
+        echo("✓ node_modules palautettu välimuistista")
+        return True
+    
+    def installed(installer: str) -> bool:
+        write_deps_stamp(deps_hash, installer)
+        if cache_dir:
+            save_deps_cache(cache_dir, deps_hash)
+        return True
+    
     # Tarkista package-lock.json
     has_lock = (ROOT / "package-lock.json").exists()
     has_yarn = (ROOT / "yarn.lock").exists()
@@ -174,7 +558,7 @@ def install_node_dependencies():
         code, out = run(["npm", "ci"], capture=True)
         if code == 0:
             echo("✓ npm ci onnistui")
-            return True
+            return installed("npm ci")
         else:
             echo("! npm ci epäonnistui, yritetään npm install")
     
@@ -183,7 +567,7 @@ def install_node_dependencies():
         code, out = run(["npm", "install"], capture=True)
         if code == 0:
             echo("✓ npm install onnistui")
-            return True
+            return installed("npm install")
         else:
             echo("! npm install epäonnistui")
             return False
@@ -193,25 +577,49 @@ def install_node_dependencies():
         code, out = run(["yarn", "install"], capture=True)
         if code == 0:
             echo("✓ yarn install onnistui")
-            return True
+            return installed("yarn install")
     
     echo("! Riippuvuuksien asennus epäonnistui")
     return False
 
-def expo_whoami() -> Optional[str]:
-    """Tarkistaa Expo kirjautumisen"""
-    if not check_program("npx"):
-        return None
-    code, out = run(["npx", "expo", "whoami"], capture=True)
-    if code != 0 or not out:
+def expo_state_file() -> Path:
+    """Expo CLI:n kirjautumistilan tiedosto (~/.expo/state.json)"""
+    home = os.environ.get("EXPO_HOME") or str(Path.home() / ".expo")
+    return Path(home) / "state.json"
+
+def expo_whoami(timeout: Optional[float] = None, quiet: bool = False) -> Optional[str]:
+    """
+    Tarkistaa Expo kirjautumisen.
+    
+    Tulos tallennetaan ProbeCacheen; avaimena npx:n polku ja Expon
+    state.json:n mtime, joten kirjautuminen tai uloskirjautuminen
+    mitätöi tuloksen heti.
+    """
+    npx = find_program("npx")
+    if not npx:
         return None
-    out = out.strip()
+    fingerprint = file_fingerprint(npx) + "|" + file_fingerprint(str(expo_state_file()))
+    hit, user = PROBE_CACHE.get("expo_whoami", fingerprint, WHOAMI_TTL)
+    if hit:
+        return user
+    code, out = run(["npx", "expo", "whoami"], capture=True, quiet=quiet, timeout=timeout)
+    out = (out or "").strip()
     if "Not logged in" in out or "not authenticated" in out.lower():
+        PROBE_CACHE.put("expo_whoami", fingerprint, None)
         return None
+    if code != 0 or not out:
+        return None  # aikaraja tai muu virhe: ei tallenneta
+    PROBE_CACHE.put("expo_whoami", fingerprint, out)
     return out
 
-def expo_login_interactive():
-    """Kirjautuu Expoon interaktiivisesti"""
+def expo_login_interactive(report: Optional[dict] = None):
+    """
+    Kirjautuu Expoon interaktiivisesti
+    
+    Args:
+        report: probe_environment()-raportti; jos siinä on expo_user-tulos,
+            `expo whoami`:ta ei ajeta uudelleen
+    """
     echo("\n=== Expo kirjautuminen ===")
     
     # Tarkista EXPO_TOKEN
@@ -220,7 +628,10 @@ def expo_login_interactive():
         return True
     
     # Tarkista onko jo kirjautunut
-    username = expo_whoami()
+    if report is not None and "expo_user" in report:
+        username = report["expo_user"]
+    else:
+        username = expo_whoami()
     if username:
         echo(f"✓ Olet jo kirjautunut Expoon: {username}")
         return True
@@ -246,71 +657,447 @@ def expo_login_interactive():
         echo("- Ohitetaan Expo-kirjautuminen")
         return True
 
-def start_backend_if_found():
+def find_backend(root: Path = None) -> Optional[dict]:
+    """
+    Etsii backendin backend/server/api -hakemistosta.
+    
+    Tunnistaa npm start -skriptin, Python-paketin (__main__.py, ajetaan
+    `python -m <hakemisto>` projektin juuresta) ja Node entry pointit.
+    
+    Returns:
+        {"dir": nimi, "cmd": komento, "cwd": hakemisto, "port": portti}
+        tai None
+    """
+    root = root or ROOT
+    for dirname in ["backend", "server", "api"]:
+        backend_dir = root / dirname
+        if not backend_dir.is_dir():
+            continue
+        
+        # Tarkista package.json
+        pkg = backend_dir / "package.json"
+        if pkg.exists():
+            data = read_json(pkg)
+            if data and "scripts" in data and "start" in data["scripts"]:
+                return {"dir": dirname, "cmd": ["npm", "run", "start"], "cwd": backend_dir,
+                        "port": BACKEND_PORT}
+        
+        # Python-paketti (esim. backend/: stdlib-pohjainen tapahtuma-API)
+        if (backend_dir / "__main__.py").exists():
+            return {"dir": dirname, "cmd": [sys.executable, "-m", dirname], "cwd": root,
+                    "port": BACKEND_PORT}
+        
+        # Etsi entry point (index.js, server.js, app.js)
+        for entry in ["index.js", "server.js", "app.js"]:
+            entry_path = backend_dir / entry
+            if entry_path.exists():
+                return {"dir": dirname, "cmd": ["node", str(entry_path)], "cwd": backend_dir,
+                        "port": BACKEND_PORT}
+    return None
+
+def start_backend_if_found(report: Optional[dict] = None,
+                           supervisor: Optional["ProcessSupervisor"] = None):
     """
     Käynnistää backendin jos löytyy backend/server/api -hakemisto.
     Palauttaa Popen-olion tai None.
+    
+    Backend saa portin PORT-ympäristömuuttujana. Funktio ei odota
+    backendin valmiutta: valvoja tarkistaa portin taustalla, ja
+    supervisor.wait_ready("backend") kertoo tuloksen.
+    
+    Args:
+        report: probe_environment()-raportti; sen backend-tulosta käytetään
+            eikä hakemistoja etsitä uudelleen
+        supervisor: Valvoja, jolle prosessi rekisteröidään; oletuksena
+            uusi ProcessSupervisor
     """
     echo("\n=== Tarkistetaan backend ===")
     
-    for dirname in ["backend", "server", "api"]:
-        backend_dir = ROOT / dirname
-        if backend_dir.exists() and backend_dir.is_dir():
-            echo(f"- Löytyi backend-hakemisto: {dirname}")
-            
-            # Tarkista package.json
-            pkg = backend_dir / "package.json"
-            if pkg.exists():
-                data = read_json(pkg)
-                if data and "scripts" in data and "start" in data["scripts"]:
-                    echo(f"- Käynnistetään backend: npm run start (hakemistossa {dirname})")
-                    proc = popen(["npm", "run", "start"], env=os.environ.copy())
-                    time.sleep(2)
-                    echo("✓ Backend käynnistetty taustalla")
-                    return proc
-            
-            # Etsi entry point (index.js, server.js, app.js)
-            for entry in ["index.js", "server.js", "app.js"]:
-                entry_path = backend_dir / entry
-                if entry_path.exists():
-                    echo(f"- Käynnistetään backend: node {entry}")
-                    proc = popen(["node", str(entry_path)], env=os.environ.copy())
-                    time.sleep(2)
-                    echo("✓ Backend käynnistetty taustalla")
-                    return proc
-    
-    echo("- Backend-hakemistoa ei löytynyt, ohitetaan")
-    return None
+    if report is not None and "backend" in report:
+        backend = report["backend"]
+    else:
+        backend = find_backend()
+    if backend is None:
+        echo("- Backend-hakemistoa ei löytynyt, ohitetaan")
+        return None
+    
+    supervisor = supervisor or ProcessSupervisor()
+    port = backend.get("port", BACKEND_PORT)
+    echo(f"- Löytyi backend-hakemisto: {backend['dir']}")
+    cwd = backend["cwd"] or Path.cwd()
+    echo(f"- Käynnistetään backend: {' '.join(backend['cmd'])} (hakemistossa {cwd}, portti {port})")
+    env = os.environ.copy()
+    env.setdefault("PORT", str(port))
+    proc = supervisor.start("backend", backend["cmd"], env=env, cwd=backend["cwd"], port=port)
+    echo("✓ Backend käynnistyy taustalla")
+    return proc
+
+def _timed(func: Callable[[], object]) -> Tuple[object, float]:
+    started = time.monotonic()
+    return func(), time.monotonic() - started
+
+def probe_environment(names: Tuple[str, ...] = ("node", "npm", "expo_user", "backend"),
+                      timeouts: Optional[Dict[str, float]] = None) -> dict:
+    """
+    Ajaa ympäristötarkistukset rinnakkain.
+    
+    Jokaisella tarkistuksella on oma aikaraja (PROBE_TIMEOUTS): aliprosessi
+    tapetaan rajan ylittyessä ja tulokseksi jää None.
+    
+    Args:
+        names: Ajettavat tarkistukset (node, npm, expo_user, backend)
+        timeouts: Aikarajojen ylikirjoitukset
+    
+    Returns:
+        Raportti: tarkistuksen nimi -> tulos, sekä "timings" (s per
+        tarkistus), "timed_out" (lista) ja "elapsed" (s yhteensä)
+    """
+    limits = dict(PROBE_TIMEOUTS, **(timeouts or {}))
+    probes = {
+        "node": lambda: tool_version("node", timeout=limits["node"]),
+        "npm": lambda: tool_version("npm", timeout=limits["npm"]),
+        "expo_user": lambda: expo_whoami(timeout=limits["expo_user"], quiet=True),
+        "backend": find_backend,
+    }
+    report = {"timings": {}, "timed_out": []}
+    started = time.monotonic()
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=len(names),
+                                                 thread_name_prefix="probe")
+    try:
+        futures = {name: pool.submit(_timed, probes[name]) for name in names}
+        for name, future in futures.items():
+            # Vararaja siltä varalta, ettei tarkistus itse noudata aikarajaa
+            remaining = limits[name] + 1.0 - (time.monotonic() - started)
+            try:
+                report[name], report["timings"][name] = future.result(timeout=max(0.0, remaining))
+            except concurrent.futures.TimeoutError:
+                report[name] = None
+                report["timings"][name] = time.monotonic() - started
+            if report["timings"][name] >= limits[name]:
+                report["timed_out"].append(name)
+    finally:
+        pool.shutdown(wait=False)
+    report["elapsed"] = time.monotonic() - started
+    return report
+
+def print_environment_report(report: dict):
+    """Tulostaa probe_environment()-raportin"""
+    labels = {"node": "Node.js", "npm": "npm", "expo_user": "Expo", "backend": "Backend"}
+    for name, label in labels.items():
+        if name not in report:
+            continue
+        value = report[name]
+        if name in report["timed_out"]:
+            echo(f"! {label}: aikaraja ylittyi")
+        elif name == "expo_user":
+            echo(f"✓ {label}: {value}" if value else f"- {label}: ei kirjautunut")
+        elif name == "backend":
+            echo(f"✓ {label}: {value['dir']}" if value else f"- {label}: ei löytynyt")
+        elif value:
+            echo(f"✓ {label}: {value}")
+        else:
+            echo(f"! {label}: ei löydy")
+    total = sum(report["timings"].values())
+    echo(f"- Tarkistukset: {report['elapsed']:.1f} s (peräkkäin {total:.1f} s)")
 
 def find_expo_url_from_line(line: str) -> Optional[str]:
     """Etsii exp:// URL:n riviltä"""
-    match = re.search(r"(exp://[\d\.]+:\d+)", line)
-    if match:
-        return match.group(1)
-    return None
+    return expo_log.find_expo_url(line)
+
+class ExpoOutputReader:
+    """
+    Lukee prosessin stdoutia omassa säikeessään.
+    
+    Käytetään Expolle ja ProcessSupervisorin kautta myös backendille.
+    
+    Jokainen rivi tulostetaan heti. Niin kauan kuin kuuntelu on päällä,
+    rivit laitetaan myös jonoon, josta next_line() lukee ne aikarajan kanssa.
+    stop_listening() jälkeen säie vain tulostaa rivejä, kunnes prosessi
+    sulkee putken.
+    
+    Args:
+        proc: Popen, jonka stdout on tekstimuotoinen putki
+        prefix: Tulostettavien rivien etuliite
+    """
+    
+    EOF = object()  # next_line() palauttaa tämän, kun putki on suljettu
+    
+    def __init__(self, proc: subprocess.Popen, prefix: str = ""):
+        self.proc = proc
+        self.prefix = prefix
+        self._lines: "queue.Queue" = queue.Queue()
+        self._listening = True
+        self._thread = threading.Thread(target=self._run, name="expo-output", daemon=True)
+    
+    def start(self) -> "ExpoOutputReader":
+        self._thread.start()
+        return self
+    
+    def next_line(self, timeout: float):
+        """
+        Palauttaa seuraavan rivin, EOF:n tai None jos aikaraja ylittyi.
+        """
+        try:
+            return self._lines.get(timeout=max(0.0, timeout))
+        except queue.Empty:
+            return None
+    
+    def stop_listening(self):
+        """Lopettaa rivien jonottamisen; tulostus ja lukeminen jatkuvat"""
+        self._listening = False
+        # Tyhjennä jo jonotetut, jottei niitä jää muistiin
+        while True:
+            try:
+                self._lines.get_nowait()
+            except queue.Empty:
+                break
+    
+    def join(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
+    
+    def _run(self):
+        try:
+            for line in iter(self.proc.stdout.readline, ""):
+                with _OUTPUT_LOCK:
+                    echo(self.prefix + line.rstrip())
+                if self._listening:
+                    self._lines.put(line)
+        except (OSError, ValueError):
+            pass  # putki suljettiin kesken lukemisen
+        finally:
+            self._lines.put(self.EOF)
+
+def backend_port_ready(port: int, proc: Optional[subprocess.Popen] = None,
+                       timeout: float = BACKEND_READY_TIMEOUT) -> bool:
+    """
+    Odottaa, kunnes porttiin saa yhteyden (port_probe.wait_for_port).
+    
+    Returns:
+        True, jos portti vastasi aikarajan sisällä; False, jos aika loppui
+        tai proc päättyi ensin
+    """
+    alive = (lambda: proc.poll() is None) if proc is not None else None
+    try:
+        wait_for_port(port, timeout=timeout, alive=alive)
+        return True
+    except TimeoutError:
+        return False
+
+class ProcessSupervisor:
+    """
+    Pitää kirjaa käynnistetyistä prosesseista (backend, Expo).
+    
+    Jokaisen prosessin tuloste luetaan omassa säikeessään ja tulostetaan
+    etuliitteellä "[nimi] ". Valmiustarkistukset (portti vastaa) ajetaan
+    taustalla, joten prosessit käynnistyvät yhtä aikaa. shutdown()
+    pysäyttää kaikki rinnakkain yhteisellä aikarajalla.
+    """
+    
+    def __init__(self):
+        self._procs: Dict[str, subprocess.Popen] = {}
+        self._readers: Dict[str, ExpoOutputReader] = {}
+        self._ready: Dict[str, concurrent.futures.Future] = {}
+        self._pool = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="health")
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._procs
+    
+    def start(self, name: str, cmd: Union[str, list, tuple], env: Optional[dict] = None,
+              cwd: Optional[Path] = None, port: Optional[int] = None) -> subprocess.Popen:
+        """
+        Käynnistää prosessin ja sen tulosteen lukijan.
+        
+        Args:
+            port: Jos annettu, prosessi on valmis kun porttiin saa yhteyden;
+                muuten heti käynnistyttyään
+        """
+        proc = popen(cmd, env=env, cwd=cwd)
+        reader = ExpoOutputReader(proc, prefix=f"[{name}] ")
+        reader.stop_listening()  # kukaan ei lue jonoa; vain tulostus
+        self.adopt(name, proc, reader.start())
+        if port is not None:
+            self._ready[name] = self._pool.submit(backend_port_ready, port, proc)
+        return proc
+    
+    def adopt(self, name: str, proc: subprocess.Popen, reader: Optional[ExpoOutputReader] = None,
+              ready: bool = True):
+        """
+        Ottaa valvontaan muualla käynnistetyn prosessin (esim. Expo, jonka
+        valmius on jo todettu Metro-rivistä).
+        """
+        self._procs[name] = proc
+        if reader is not None:
+            self._readers[name] = reader
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        future.set_result(ready)
+        self._ready.setdefault(name, future)
+    
+    def wait_ready(self, name: str, timeout: Optional[float] = None) -> bool:
+        """True, jos prosessi ilmoitti valmiutensa (ei nosta aikarajasta)"""
+        try:
+            return bool(self._ready[name].result(timeout=timeout))
+        except concurrent.futures.TimeoutError:
+            return False
+    
+    def wait(self) -> Tuple[str, int]:
+        """Odottaa, kunnes jokin prosesseista päättyy; palauttaa (nimi, koodi)"""
+        while True:
+            for name, proc in self._procs.items():
+                code = proc.poll()
+                if code is not None:
+                    return name, code
+            time.sleep(SUPERVISOR_POLL_INTERVAL)
+    
+    def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT):
+        """Pysäyttää kaikki prosessit; aikarajan ylittäneet tapetaan"""
+        # Signaali kaikille ensin, sitten odotus yhteistä aikarajaa vasten
+        for proc in self._procs.values():
+            if proc.poll() is None:
+                proc.terminate()
+        deadline = time.monotonic() + timeout
+        for name, proc in self._procs.items():
+            try:
+                proc.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                echo(f"! {name} ei pysähtynyt {timeout:.0f} s kuluessa, lopetetaan väkisin")
+                kill_process(proc, timeout)
+        for reader in self._readers.values():
+            reader.join(timeout=1.0)
+        self._pool.shutdown(wait=False)
+        self._procs.clear()
+        self._readers.clear()
+
+def metro_entry_path(root: Path = None) -> str:
+    """
+    Palauttaa Metron bundle-polun package.json:n "main"-kentästä.
+    
+    "expo-router/entry" -> "/node_modules/expo-router/entry.bundle",
+    "./index.js" -> "/index.bundle".
+    """
+    root = root or ROOT
+    data = read_json(root / "package.json") or {}
+    main = str(data.get("main") or "index").replace("\\", "/")
+    if main.startswith("./"):
+        main = main[2:]
+    main = re.sub(r"\.[jt]sx?$", "", main)
+    local = any(root.joinpath(main + ext).exists() for ext in (".js", ".jsx", ".ts", ".tsx"))
+    if not local:
+        # Paketin sisäinen polku, kuten expo-router/entry
+        main = "node_modules/" + main
+    return f"/{main}.bundle"
+
+def warm_bundle(url: str, timeout: float = WARM_TIMEOUT) -> dict:
+    """
+    Hakee yhden bundlen ja heittää sisällön pois paloina.
+    
+    Returns:
+        {"status": HTTP-koodi, "bytes": koko, "seconds": kesto} tai
+        {"error": viesti, "seconds": kesto}
+    """
+    import urllib.request
+    started = time.monotonic()
+    size = 0
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            while True:
+                chunk = response.read(WARM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+            return {"status": response.status, "bytes": size,
+                    "seconds": time.monotonic() - started}
+    except OSError as e:
+        # urllib.error.URLError ja HTTPError ovat OSErrorin aliluokkia
+        return {"error": str(getattr(e, "reason", e)), "seconds": time.monotonic() - started}
+
+def warm_metro_bundles(port: int, platforms: Tuple[str, ...] = WARM_PLATFORMS,
+                       timeout: float = WARM_TIMEOUT, host: str = "127.0.0.1",
+                       entry: Optional[str] = None) -> Dict[str, dict]:
+    """
+    Pyytää Metrolta bundlet kaikille alustoille rinnakkain.
+    
+    Laitteen lopullinen pyyntö voi sisältää lisää kyselyparametreja, mutta
+    Metron muunnosvälimuisti on tiedostokohtainen, joten raskain työ
+    (kaikkien moduulien muuntaminen) on silti tehty.
+    
+    Returns:
+        Alusta -> warm_bundle()-tulos
+    """
+    entry = entry or metro_entry_path()
+    urls = {platform: f"http://{host}:{port}{entry}?platform={platform}&dev=true&minify=false"
+            for platform in platforms}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(urls),
+                                               thread_name_prefix="warm") as pool:
+        futures = {platform: pool.submit(warm_bundle, url, timeout) for platform, url in urls.items()}
+        return {platform: future.result() for platform, future in futures.items()}
+
+def print_warm_report(results: Dict[str, dict]):
+    """Tulostaa warm_metro_bundles()-tuloksen"""
+    for platform, result in results.items():
+        if "error" in result:
+            echo(f"! {platform}: {result['error']} ({result['seconds']:.1f} s)")
+        else:
+            echo(f"✓ {platform}: {result['bytes'] / (1024 * 1024):.1f} MiB, {result['seconds']:.1f} s")
 
-def start_expo_and_show_qr(interactive: bool = True, max_retries: int = 3) -> Optional[subprocess.Popen]:
+def confirm_port(port: int, interactive: bool) -> bool:
+    """
+    Kysyy interaktiivisessa tilassa, käytetäänkö porttia.
+    
+    Returns:
+        False, jos käyttäjä kieltäytyi tai keskeytti
+    """
+    if not interactive or not sys.stdin.isatty():
+        # Ilman terminaalia input() ei voi kysyä mitään
+        echo(f"- Ei-interaktiivinen tila, käytetään automaattisesti porttia {port}")
+        return True
+    try:
+        ans = input(f"Yritetäänkö portilla {port}? (k/e) [k]: ").strip().lower()
+    except (KeyboardInterrupt, EOFError):
+        echo("\n- Keskeytetty")
+        return False
+    if ans == "e":
+        echo("- Käyttäjä keskeytti")
+        return False
+    return True
+
+def start_expo_and_show_qr(interactive: bool = True, max_retries: int = 3,
+                           supervisor: Optional[ProcessSupervisor] = None,
+                           port: int = EXPO_DEFAULT_PORT,
+                           preallocate: bool = True,
+                           warm: bool = False) -> Optional[subprocess.Popen]:
     """
     Käynnistää Expo dev-serverin ja näyttää QR-koodin.
     
-    Käsittelee "Port X is being used" -viestit:
+    Vapaa portti etsitään ennen käynnistystä (port_probe.find_free_port),
+    joten Expo käynnistetään normaalisti vain kerran. Jos portti ehtii
+    silti varautua, "Port X is being used" -viestit käsitellään:
     - Jos interaktiivinen, kysyy käyttäjältä hyväksyntää
     - Jos ei-interaktiivinen, yrittää automaattisesti uudelleen
     
     Args:
         interactive: Jos True, kysyy käyttäjältä vahvistusta porttivaihdolle
         max_retries: Maksimi yritysten määrä porttien kanssa
+        supervisor: Jos annettu, käynnistynyt Expo rekisteröidään sille
+            nimellä "expo" ja tuloste saa etuliitteen [expo]
+        port: Ensisijainen portti
+        preallocate: Jos False, portin varausta ei tarkisteta etukäteen
+            (vanha käynnistä-ja-yritä-uudelleen -polku, vertailua varten)
+        warm: Jos True, bundlet haetaan Metrolta ennen QR-koodin näyttämistä
     
     Returns:
         Popen-olio tai None
     """
     echo("\n=== Käynnistetään Expo ===")
     
-    # Varmista pyqrcode ja pypng
-    ensure_python_package("pyqrcode")
-    ensure_python_package("pypng")
-    
-    port = 8081  # Oletus portti
+    if preallocate:
+        free_port = find_free_port(port, attempts=EXPO_PORT_ATTEMPTS)
+        if free_port is None:
+            echo(f"! Portit {port}-{port + EXPO_PORT_ATTEMPTS - 1} ovat varattuja, yritetään silti portilla {port}")
+        elif free_port != port:
+            echo(f"! Portti {port} on käytössä, vapaa portti: {free_port}")
+            if not confirm_port(free_port, interactive):
+                return None
+            port = free_port
     attempt = 0
     
     while attempt < max_retries:
@@ -318,117 +1105,115 @@ def start_expo_and_show_qr(interactive: bool = True, max_retries: int = 3) -> Op
         echo(f"- Yritetään käynnistää Expo portilla {port}")
         
         proc = popen(cmd, env=os.environ.copy())
+        reader = ExpoOutputReader(proc, prefix="[expo] " if supervisor else "").start()
         
         # Lue output hetken aikaa ja etsi porttikonflikti
         qr_url = None
         port_conflict = False
         suggested_port = None
+        started = False
         
-        start_time = time.time()
-        timeout = 30  # 30 sekuntia timeout
+        deadline = time.monotonic() + EXPO_START_TIMEOUT
         
         try:
-            while time.time() - start_time < timeout:
-                line = proc.stdout.readline()
-                if not line:
-                    # Prosessi on lopettanut
+            while True:
+                line = reader.next_line(deadline - time.monotonic())
+                if line is None:
+                    echo(f"! Expo ei ilmoittanut valmiutta {EXPO_START_TIMEOUT:.0f} s kuluessa")
                     break
-                
-                echo(line.rstrip())
-                
-                # Tarkista porttikonflikti
-                if "is being used" in line.lower() or ("port" in line.lower() and "in use" in line.lower()):
-                    port_conflict = True
-                    # Yritä löytää ehdotettu portti
-                    match = re.search(r"port (\d+)", line, re.IGNORECASE)
-                    if match:
-                        suggested_port = int(match.group(1))
-                
-                # Etsi QR URL
-                url = find_expo_url_from_line(line)
-                if url:
-                    qr_url = url
+                if line is ExpoOutputReader.EOF:
+                    # Prosessi on lopettanut
                     break
                 
-                # Jos näkyvissä "Metro waiting", oletamme että käynnistyi
-                if "Metro waiting" in line or "Logs for your project" in line:
+                for event in expo_log.classify(line):
+                    if event.kind == expo_log.PORT_CONFLICT:
+                        port_conflict = True
+                    elif event.kind == expo_log.SUGGESTED_PORT:
+                        # Expon ehdottama portti ("Use port 8082 instead?")
+                        suggested_port = event.port
+                    elif event.kind == expo_log.EXPO_URL:
+                        qr_url = event.url
+                        started = True
+                    elif event.kind == expo_log.READY:
+                        # "Metro waiting" tms.: oletamme että käynnistyi
+                        started = True
+                if started and not port_conflict:
                     break
             
+            # Käynnistys ratkesi; lukija jatkaa tulosteen tyhjentämistä
+            reader.stop_listening()
+            if supervisor is not None and not port_conflict:
+                supervisor.adopt("expo", proc, reader, ready=started)
+            
             if port_conflict:
                 echo(f"\n! Portti {port} on käytössä")
-                proc.terminate()
-                proc.wait()
+                stop_process(proc)
+                reader.join(timeout=5)
                 
                 if suggested_port:
                     port = suggested_port
                 else:
                     port += 1
                 
-                if interactive:
-                    try:
-                        ans = input(f"Yritetäänkö portilla {port}? (k/e) [k]: ").strip().lower()
-                        if ans == "e":
-                            echo("- Käyttäjä keskeytti")
-                            return None
-                    except (KeyboardInterrupt, EOFError):
-                        echo("\n- Keskeytetty")
-                        return None
-                else:
-                    echo(f"- Ei-interaktiivinen tila, yritetään automaattisesti portilla {port}")
+                if not confirm_port(port, interactive):
+                    return None
                 
                 attempt += 1
                 continue
             
+            if warm and started:
+                echo(f"\n=== Lämmitetään Metro-bundlet ({', '.join(WARM_PLATFORMS)}) ===")
+                print_warm_report(warm_metro_bundles(port))
+            
             # Jos löytyi QR URL, näytä se
             if qr_url:
                 echo(f"\n✓ Expo käynnistetty: {qr_url}")
                 try:
-                    import pyqrcode
-                    qr = pyqrcode.create(qr_url)
-                    echo("\n" + qr.terminal(quiet_zone=1))
+                    echo("\n" + qr_terminal.terminal_qr(qr_url, QR_CACHE_DIR))
                     echo("\n✓ Skannaa QR-koodi Expo Go -sovelluksella\n")
-                except ImportError:
-                    echo("! pyqrcode ei saatavilla, QR-koodia ei voitu näyttää")
-                except Exception as e:
+                except ValueError as e:
                     echo(f"! QR-koodin luonti epäonnistui: {e}")
             
             return proc
         
         except KeyboardInterrupt:
             echo("\n- Keskeytetty käyttäjän toimesta")
-            proc.terminate()
-            proc.wait()
+            stop_process(proc)
             return None
     
     echo(f"\n! Expo-käynnistys epäonnistui {max_retries} yrityksen jälkeen")
     return None
 
-def guided_full_flow():
+def guided_full_flow(force_install: bool = False, deps_cache: Optional[Path] = None,
+                     warm: bool = False):
     """
     Vaihtoehto 1: Full guided install and start
+    
+    Args:
+        force_install: Asenna riippuvuudet vaikka leima olisi ajan tasalla
+        deps_cache: node_modules-välimuistin hakemisto
+        warm: Lämmitä Metro-bundlet ennen QR-koodin näyttämistä
     """
     echo("\n" + "="*60)
     echo("  FULL GUIDED INSTALL AND START")
     echo("="*60 + "\n")
     
-    # 1. Tarkista Node ja npm
-    echo("=== Tarkistetaan Node.js ja npm ===")
-    if not check_program("node"):
+    # 1. Tarkista Node, npm, Expo-kirjautuminen ja backend rinnakkain
+    echo("=== Tarkistetaan ympäristö ===")
+    probes = ("node", "npm", "backend")
+    if not os.environ.get("EXPO_TOKEN"):
+        probes += ("expo_user",)
+    report = probe_environment(probes)
+    print_environment_report(report)
+    
+    node_ver = report["node"]
+    if not node_ver:
         echo("! Node.js ei löydy. Asenna se: https://nodejs.org/")
         return False
-    
-    code, node_ver = run(["node", "--version"], capture=True)
-    if code == 0 and node_ver:
-        echo(f"✓ Node.js: {node_ver.strip()}")
-    
-    if not check_program("npm"):
+    if not report["npm"]:
         echo("! npm ei löydy")
         return False
     
-    code, npm_ver = run(["npm", "--version"], capture=True)
-    if code == 0 and npm_ver:
-        echo(f"✓ npm: {npm_ver.strip()}")
-    
     # 2. Tarkista package.json engines
     pkg_json = ROOT / "package.json"
     if pkg_json.exists():
@@ -448,40 +1233,47 @@ def guided_full_flow():
                     echo(f"✓ Node-versio täyttää vaatimukset")
     
     # 3. Asenna riippuvuudet
-    if not install_node_dependencies():
+    if not install_node_dependencies(force=force_install, cache_dir=deps_cache):
         echo("\n! Riippuvuuksien asennus epäonnistui")
         return False
     
     # 4. Expo kirjautuminen
-    expo_login_interactive()
-    
-    # 5. Backend
-    backend_proc = start_backend_if_found()
-    
-    # 6. Expo
-    expo_proc = start_expo_and_show_qr(interactive=True)
-    if not expo_proc:
-        echo("! Expo-käynnistys epäonnistui")
-        if backend_proc:
-            backend_proc.terminate()
-        return False
-    
-    echo("\n✓ Kaikki valmista! Sovellus käynnissä.")
-    echo("  Paina Ctrl+C lopettaaksesi\n")
+    expo_login_interactive(report)
     
+    # 5. Backend ja Expo käynnistyvät yhtä aikaa
+    supervisor = ProcessSupervisor()
     try:
-        expo_proc.wait()
+        start_backend_if_found(report, supervisor)
+        
+        # 6. Expo (backendin portti tarkistetaan taustalla sillä välin)
+        if not start_expo_and_show_qr(interactive=True, supervisor=supervisor, warm=warm):
+            echo("! Expo-käynnistys epäonnistui")
+            return False
+        
+        if "backend" in supervisor:
+            if supervisor.wait_ready("backend"):
+                echo("✓ Backend vastaa portissa")
+            else:
+                echo("! Backend ei vastannut portissa, katso [backend]-rivit yllä")
+        
+        echo("\n✓ Kaikki valmista! Sovellus käynnissä.")
+        echo("  Paina Ctrl+C lopettaaksesi\n")
+        
+        name, code = supervisor.wait()
+        echo(f"\n! {name} pysähtyi (koodi {code}), pysäytetään muut")
     except KeyboardInterrupt:
         echo("\n- Pysäytetään sovellus...")
-        expo_proc.terminate()
-        if backend_proc:
-            backend_proc.terminate()
+    finally:
+        supervisor.shutdown()
     
     return True
 
-def quick_start():
+def quick_start(warm: bool = False):
     """
     Vaihtoehto 2: Quick start (no input)
+    
+    Args:
+        warm: Lämmitä Metro-bundlet ennen QR-koodin näyttämistä
     """
     echo("\n" + "="*60)
     echo("  QUICK START")
@@ -490,50 +1282,48 @@ def quick_start():
     echo("- Oletetaan että riippuvuudet on asennettu")
     echo("- Käynnistetään Expo ei-interaktiivisesti\n")
     
-    expo_proc = start_expo_and_show_qr(interactive=False)
-    if not expo_proc:
-        echo("! Expo-käynnistys epäonnistui")
-        return False
-    
-    echo("\n✓ Sovellus käynnissä (quick start)")
-    echo("  Paina Ctrl+C lopettaaksesi\n")
-    
+    supervisor = ProcessSupervisor()
     try:
-        expo_proc.wait()
+        if not start_expo_and_show_qr(interactive=False, supervisor=supervisor, warm=warm):
+            echo("! Expo-käynnistys epäonnistui")
+            return False
+        
+        echo("\n✓ Sovellus käynnissä (quick start)")
+        echo("  Paina Ctrl+C lopettaaksesi\n")
+        
+        supervisor.wait()
     except KeyboardInterrupt:
         echo("\n- Pysäytetään sovellus...")
-        expo_proc.terminate()
+    finally:
+        supervisor.shutdown()
     
     return True
 
-def install_only():
+def install_only(force_install: bool = False, deps_cache: Optional[Path] = None):
     """
     Vaihtoehto 3: Install dependencies only
+    
+    Args:
+        force_install: Asenna riippuvuudet vaikka leima olisi ajan tasalla
+        deps_cache: node_modules-välimuistin hakemisto
     """
     echo("\n" + "="*60)
     echo("  INSTALL DEPENDENCIES ONLY")
     echo("="*60 + "\n")
     
-    # Tarkista Node ja npm
+    # Tarkista Node ja npm rinnakkain
     echo("=== Tarkistetaan Node.js ja npm ===")
-    if not check_program("node"):
+    report = probe_environment(("node", "npm"))
+    print_environment_report(report)
+    if not report["node"]:
         echo("! Node.js ei löydy. Asenna se: https://nodejs.org/")
         return False
-    
-    code, node_ver = run(["node", "--version"], capture=True)
-    if code == 0 and node_ver:
-        echo(f"✓ Node.js: {node_ver.strip()}")
-    
-    if not check_program("npm"):
+    if not report["npm"]:
         echo("! npm ei löydy")
         return False
     
-    code, npm_ver = run(["npm", "--version"], capture=True)
-    if code == 0 and npm_ver:
-        echo(f"✓ npm: {npm_ver.strip()}")
-    
     # Asenna riippuvuudet
-    if not install_node_dependencies():
+    if not install_node_dependencies(force=force_install, cache_dir=deps_cache):
         echo("\n! Riippuvuuksien asennus epäonnistui")
         return False
     
@@ -581,6 +1371,27 @@ def parse_args():
         action="store_true",
         help="Install dependencies only (vaihtoehto 3)"
     )
+    parser.add_argument(
+        "--force-install",
+        action="store_true",
+        help="Aja npm ci vaikka riippuvuusleima olisi ajan tasalla"
+    )
+    parser.add_argument(
+        "--deps-cache",
+        metavar="DIR",
+        type=Path,
+        help="Tallenna/palauta node_modules tar-pakettina hakemistosta DIR"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ohita tallennetut tarkistustulokset (.install_cache) ja tarkista kaikki uudelleen"
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Hae iOS-, Android- ja web-bundlet Metrolta heti käynnistyksen jälkeen (nopeampi ensimmäinen skannaus)"
+    )
     return parser.parse_args()
 
 def main():
@@ -592,18 +1403,21 @@ def main():
     echo("  Käyttöönotto-assistentti")
     echo("="*60)
     
+    deps_options = {"force_install": args.force_install, "deps_cache": args.deps_cache}
+    PROBE_CACHE.refresh = args.refresh
+    
     # Jos annettu lippuja, suorita suoraan
     if args.auto:
         echo("\n[--auto] Suoritetaan full guided install")
-        return guided_full_flow()
+        return guided_full_flow(warm=args.warm, **deps_options)
     
     if args.quick:
         echo("\n[--quick] Suoritetaan quick start")
-        return quick_start()
+        return quick_start(warm=args.warm)
     
     if args.install_only:
         echo("\n[--install-only] Asennetaan vain riippuvuudet")
-        return install_only()
+        return install_only(**deps_options)
     
     # Muuten näytä valikko
     while True:
@@ -619,11 +1433,11 @@ def main():
             choice = "1"
         
         if choice == "1":
-            return guided_full_flow()
+            return guided_full_flow(warm=args.warm, **deps_options)
         elif choice == "2":
-            return quick_start()
+            return quick_start(warm=args.warm)
         elif choice == "3":
-            return install_only()
+            return install_only(**deps_options)
         elif choice == "4":
             echo("\n- Poistutaan...")
             return True
@@ -12,22 +12,39 @@ Usage:
     python launch_web_server.py --local      # Start local server directly
     python launch_web_server.py --ngrok      # Start with ngrok directly
     python launch_web_server.py --port 8080  # Use custom port
+    python launch_web_server.py --engine asyncio  # Use the asyncio serving engine
+    python launch_web_server.py --access-log logs/access.jsonl  # Log requests as JSON lines
+    python launch_web_server.py --ledger-db backend/data/ledger.sqlite3  # Serve statement exports
+    python launch_web_server.py --ledger-db backend/data/ledger.sqlite3 --public-exports  # ...to the LAN too
     
     Or double-click the .bat file on Windows
+
+Modules only some paths need (webbrowser, json, urllib.request for the
+ngrok API) are imported where they are used, so `--local` starts
+without loading them.
 """
 
 import os
 import sys
 import subprocess
 import shutil
+import re
+import threading
 import time
-import webbrowser
 import argparse
-import json
-import urllib.request
-import urllib.error
 from pathlib import Path
 
+from static_server import ENGINES, DEFAULT_ENGINE, create_server
+from server_metrics import METRICS_PATH
+from port_probe import DEFAULT_PORT_ATTEMPTS, find_free_port, wait_for_port
+from worker_pool import workers_supported
+
+# Where tunnel mode writes its access log unless --access-log says otherwise
+DEFAULT_NGROK_ACCESS_LOG = Path(__file__).parent / 'logs' / 'access.jsonl'
+
+# Ledger that local mode streams statement exports from, if it exists
+DEFAULT_LEDGER_DB = Path(__file__).parent / 'backend' / 'data' / 'ledger.sqlite3'
+
 # Color codes for terminal output
 if os.name == 'nt':  # Windows
     os.system('color')
@@ -183,6 +200,9 @@ def get_ngrok_public_url(max_attempts=10, delay=1):
     Returns:
         The public URL or None if not found
     """
+    import json
+    import urllib.request
+    
     api_url = "http://localhost:4040/api/tunnels"
     
     for attempt in range(max_attempts):
@@ -200,7 +220,7 @@ def get_ngrok_public_url(max_attempts=10, delay=1):
                     if public_url.startswith('https://'):
                         return public_url
                     
-        except (urllib.error.URLError, urllib.error.HTTPError, json.JSONDecodeError, Exception):
+        except Exception:
             # API not ready yet, wait and retry
             if attempt < max_attempts - 1:
                 time.sleep(delay)
@@ -208,6 +228,116 @@ def get_ngrok_public_url(max_attempts=10, delay=1):
     
     return None
 
+# How long to wait for ngrok to report the tunnel before asking its API
+NGROK_READY_TIMEOUT = 20
+
+# key=value pairs of a logfmt line; values may be double-quoted
+LOGFMT_PAIR = re.compile(r'([\w.-]+)=("(?:[^"\\]|\\.)*"|\S*)')
+
+def parse_ngrok_log_line(line):
+    """
+    Parse one ngrok log line into a dict
+    
+    ngrok writes either JSON records (--log-format=json) or logfmt
+    (t=... lvl=info msg="started tunnel" url=https://...), so both are
+    accepted.
+    
+    Returns:
+        Dict of the record's fields (empty for blank or unparseable lines)
+    """
+    line = line.strip()
+    if not line:
+        return {}
+    if line.startswith('{'):
+        import json
+        try:
+            record = json.loads(line)
+            return record if isinstance(record, dict) else {}
+        except json.JSONDecodeError:
+            return {}
+    
+    record = {}
+    for key, value in LOGFMT_PAIR.findall(line):
+        if value.startswith('"') and value.endswith('"') and len(value) >= 2:
+            value = re.sub(r'\\(.)', r'\1', value[1:-1])
+        record[key] = value
+    return record
+
+class NgrokLogWatcher:
+    """
+    Reads ngrok's log from its stdout pipe in a background thread
+    
+    The public URL is available the moment ngrok logs "started tunnel",
+    and the pipe keeps being drained afterwards so ngrok never blocks on a
+    full pipe buffer.
+    """
+    
+    def __init__(self, process):
+        self.process = process
+        self.public_url = None
+        self.error = None
+        self._ready = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Start reading the log in a daemon thread"""
+        self._thread = threading.Thread(target=self._run, name='ngrok-log', daemon=True)
+        self._thread.start()
+        return self
+    
+    def wait_for_url(self, timeout=NGROK_READY_TIMEOUT):
+        """
+        Wait until the tunnel is up, ngrok reports an error or exits
+        
+        Returns:
+            The public HTTPS URL or None
+        """
+        self._ready.wait(timeout)
+        return self.public_url
+    
+    def handle_record(self, record):
+        """Update state from one parsed log record"""
+        url = record.get('url', '')
+        if record.get('msg') == 'started tunnel' and url.startswith('https://'):
+            self.public_url = url
+            self._ready.set()
+        elif record.get('lvl') in ('eror', 'error', 'crit') and record.get('err'):
+            if self.error is None:
+                self.error = record['err']
+            if not self.public_url:
+                self._ready.set()
+    
+    def _run(self):
+        try:
+            for line in self.process.stdout:
+                self.handle_record(parse_ngrok_log_line(line))
+        except (OSError, ValueError):
+            pass
+        finally:
+            # ngrok exited; nobody should keep waiting for a URL
+            self._ready.set()
+
+def start_ngrok_tunnel(port, ngrok_cmd=None):
+    """
+    Start ngrok for a local port and begin watching its log
+    
+    Args:
+        port: Local port to expose
+        ngrok_cmd: Command prefix to run instead of 'ngrok' (for testing)
+        
+    Returns:
+        (ngrok_process, NgrokLogWatcher)
+    """
+    cmd = list(ngrok_cmd or ['ngrok']) + ['http', str(port), '--log=stdout', '--log-format=json']
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1
+    )
+    return process, NgrokLogWatcher(process).start()
+
 def get_web_directory():
     """Get the web directory path"""
     script_dir = Path(__file__).parent
@@ -219,12 +349,69 @@ def get_web_directory():
     
     return web_dir
 
-def start_local_server(web_dir, port=8000):
-    """Start a local Python HTTP server"""
+def start_ready_server(web_dir, port, engine, **server_options):
+    """
+    Bind a server (moving to the next free port if needed), run it in a
+    background thread and wait until it accepts connections
+    
+    Returns:
+        (server, thread, port) or None if no server could be started
+    """
+    started = time.monotonic()
+    free_port = find_free_port(port)
+    if free_port is None:
+        print_color(f"❌ No free port found in {port}-{port + DEFAULT_PORT_ATTEMPTS - 1}", Colors.RED)
+        return None
+    if free_port != port:
+        print_color(f"⚠️  Port {port} is in use, using port {free_port} instead", Colors.YELLOW)
+    if server_options.get('workers', 1) > 1:
+        print_color(f"⚙️  Worker processes: {server_options['workers']} (metrics are per worker)", Colors.BLUE)
+    if server_options.get('access_log'):
+        print_color(f"📝 Access log: {server_options['access_log']}", Colors.BLUE)
+    if server_options.get('ledger_db'):
+        audience = 'all clients' if server_options.get('public_exports') else 'this machine only'
+        print_color(f"📊 Statement export: /api/export/tiliote-<period>.csv|xlsx|pdf from "
+                    f"{server_options['ledger_db']} ({audience})", Colors.BLUE)
+    
+    try:
+        server = create_server(web_dir, free_port, engine=engine, **server_options)
+    except OSError as e:
+        print_color(f"❌ Could not start server on port {free_port}: {e}", Colors.RED)
+        return None
+    thread = server.start_background()
+    
+    try:
+        wait_for_port(free_port, alive=thread.is_alive)
+    except TimeoutError as e:
+        print_color(f"❌ Server did not become ready: {e}", Colors.RED)
+        server.shutdown()
+        server.server_close()
+        return None
+    
+    print_color(f"⚡ Server ready in {(time.monotonic() - started) * 1000:.0f} ms", Colors.BLUE)
+    return server, thread, free_port
+
+def start_local_server(web_dir, port=8000, engine=DEFAULT_ENGINE, open_browser=True, **server_options):
+    """
+    Start the local web server in this process
+    
+    Args:
+        web_dir: Directory to serve
+        port: Port to listen on
+        engine: Serving engine ('threaded' or 'asyncio')
+        open_browser: Open the local URL in the default browser
+        **server_options: Passed through to static_server.create_server
+    """
     print_color(f"\n🚀 Starting local web server on port {port}...", Colors.GREEN)
     print_color(f"📁 Serving directory: {web_dir}", Colors.BLUE)
+    print_color(f"⚙️  Engine: {engine}", Colors.BLUE)
     print()
     
+    started = start_ready_server(web_dir, port, engine, **server_options)
+    if started is None:
+        return
+    server, thread, port = started
+    
     local_url = f"http://localhost:{port}"
     print_color(f"✅ Server started successfully!", Colors.GREEN)
     print_color(f"🌐 Local URL: {local_url}", Colors.CYAN + Colors.BOLD)
@@ -232,43 +419,46 @@ def start_local_server(web_dir, port=8000):
     print_color("📝 Access the application at:", Colors.YELLOW)
     print_color(f"   • Local:   {local_url}", Colors.CYAN)
     print_color(f"   • Network: http://<your-ip>:{port}", Colors.CYAN)
+    print_color(f"   • Metrics: {local_url}{METRICS_PATH} (this machine only)", Colors.CYAN)
     print()
     print_color("💡 Press Ctrl+C to stop the server", Colors.YELLOW)
     print()
     
-    # Open browser after a short delay
-    time.sleep(2)
-    print_color("🌐 Opening browser...", Colors.BLUE)
-    webbrowser.open(local_url)
+    # The server is already accepting connections
+    if open_browser:
+        import webbrowser
+        print_color("🌐 Opening browser...", Colors.BLUE)
+        webbrowser.open(local_url)
     
-    # Start the server
-    os.chdir(web_dir)
+    # Serve until interrupted
     try:
-        subprocess.run([sys.executable, '-m', 'http.server', str(port)])
+        while thread.is_alive():
+            thread.join(0.5)
     except KeyboardInterrupt:
         print_color("\n\n✋ Server stopped by user", Colors.YELLOW)
     except Exception as e:
         print_color(f"\n❌ Error: {e}", Colors.RED)
+    finally:
+        server.shutdown()
+        server.server_close()
 
-def start_ngrok_server(web_dir, port=8000):
+def start_ngrok_server(web_dir, port=8000, engine=DEFAULT_ENGINE, open_browser=True, **server_options):
     """Start a local server and expose it with ngrok"""
     print_color(f"\n🚀 Starting local web server on port {port}...", Colors.GREEN)
     print_color(f"📁 Serving directory: {web_dir}", Colors.BLUE)
+    print_color(f"⚙️  Engine: {engine}", Colors.BLUE)
     print()
     
-    # Change to web directory
-    os.chdir(web_dir)
-    
-    # Start local server in background
-    print_color("🔧 Starting Python HTTP server...", Colors.BLUE)
-    server_process = subprocess.Popen(
-        [sys.executable, '-m', 'http.server', str(port)],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
+    # Requests are not printed in tunnel mode, so log them to a file
+    if not server_options.get('access_log'):
+        server_options['access_log'] = str(DEFAULT_NGROK_ACCESS_LOG)
     
-    # Wait for server to start
-    time.sleep(2)
+    # Start local server in a background thread
+    print_color("🔧 Starting web server...", Colors.BLUE)
+    started = start_ready_server(web_dir, port, engine, quiet=True, **server_options)
+    if started is None:
+        return
+    server, _, port = started
     
     # Start ngrok
     print_color("🌍 Starting ngrok tunnel...", Colors.CYAN)
@@ -277,16 +467,21 @@ def start_ngrok_server(web_dir, port=8000):
     
     ngrok_process = None
     try:
-        ngrok_process = subprocess.Popen(
-            ['ngrok', 'http', str(port), '--log=stdout'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        ngrok_process, log_watcher = start_ngrok_tunnel(port)
         
-        # Wait for ngrok to start and get the public URL
+        # Wait for ngrok to report the tunnel in its log
         print_color("🔍 Retrieving your public URL...", Colors.BLUE)
-        public_url = get_ngrok_public_url(max_attempts=15, delay=1)
+        started = time.monotonic()
+        public_url = log_watcher.wait_for_url()
+        
+        # Fall back to the local API if the log did not tell us
+        if not public_url and log_watcher.error is None and ngrok_process.poll() is None:
+            public_url = get_ngrok_public_url(max_attempts=5, delay=1)
+        
+        if log_watcher.error:
+            raise RuntimeError(log_watcher.error)
+        if public_url:
+            print_color(f"⚡ Tunnel ready in {time.monotonic() - started:.1f}s", Colors.BLUE)
         
         if public_url:
             print_color("\n" + "="*60, Colors.GREEN)
@@ -298,6 +493,7 @@ def start_ngrok_server(web_dir, port=8000):
             print()
             print_color("📱 Share this URL with anyone to give them access!", Colors.CYAN)
             print_color("🔒 The URL uses HTTPS for secure access", Colors.CYAN)
+            print_color(f"📊 Metrics: http://localhost:{port}{METRICS_PATH} (this machine only)", Colors.CYAN)
             print()
             print_color("💡 Tips:", Colors.YELLOW)
             print_color("   • This URL works from anywhere on the internet", Colors.BLUE)
@@ -308,11 +504,13 @@ def start_ngrok_server(web_dir, port=8000):
             print()
             
             # Try to open the URL in browser
-            try:
-                print_color("🌐 Opening public URL in browser...", Colors.BLUE)
-                webbrowser.open(public_url)
-            except:
-                pass
+            if open_browser:
+                try:
+                    import webbrowser
+                    print_color("🌐 Opening public URL in browser...", Colors.BLUE)
+                    webbrowser.open(public_url)
+                except:
+                    pass
                 
         else:
             print_color("\n⚠️  Warning: Could not retrieve public URL from ngrok", Colors.YELLOW)
@@ -345,13 +543,10 @@ def start_ngrok_server(web_dir, port=8000):
         print_color("\n🧹 Cleaning up...", Colors.BLUE)
         
         try:
-            server_process.terminate()
-            server_process.wait(timeout=5)
+            server.shutdown()
+            server.server_close()
         except:
-            try:
-                server_process.kill()
-            except:
-                pass
+            pass
         
         try:
             if ngrok_process:
@@ -408,6 +603,8 @@ Examples:
   python launch_web_server.py --local      # Start local server
   python launch_web_server.py --ngrok      # Start with ngrok
   python launch_web_server.py --port 8080  # Use port 8080
+  python launch_web_server.py --local --engine asyncio
+  python launch_web_server.py --local --workers 4
         """
     )
     
@@ -430,6 +627,47 @@ Examples:
         help='Port to use (default: 8000)'
     )
     
+    parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default=DEFAULT_ENGINE,
+        help=f'Serving engine to use (default: {DEFAULT_ENGINE})'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Serve with N processes sharing the port via SO_REUSEPORT (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--precompress-dir',
+        metavar='DIR',
+        help='Store gzip/Brotli variants of web assets in DIR and reuse them on later launches'
+    )
+    
+    parser.add_argument(
+        '--access-log',
+        metavar='FILE',
+        help='Append one JSON line per request to FILE (ngrok mode default: logs/access.jsonl)'
+    )
+    
+    parser.add_argument(
+        '--ledger-db',
+        metavar='FILE',
+        help='Stream statement exports from this ledger database to this machine '
+             f'(local mode default: $LEDGER_DB or {DEFAULT_LEDGER_DB.relative_to(Path(__file__).parent)} if it exists)'
+    )
+    
+    parser.add_argument(
+        '--public-exports',
+        action='store_true',
+        help='Serve statement exports to every client that can reach the server (LAN, ngrok), '
+             'not just this machine; they have no login in front of them'
+    )
+    
     parser.add_argument(
         '--no-browser',
         action='store_true',
@@ -438,6 +676,11 @@ Examples:
     
     return parser.parse_args()
 
+def default_ledger_db():
+    """The ledger database local mode exports from, or None if there is none"""
+    path = Path(os.environ.get('LEDGER_DB') or DEFAULT_LEDGER_DB)
+    return str(path) if path.is_file() else None
+
 def main():
     """Main application entry point"""
     # Parse command line arguments
@@ -449,11 +692,31 @@ def main():
     # Use custom port if specified
     port = args.port
     
+    # Worker processes need SO_REUSEPORT
+    workers = max(1, args.workers)
+    if workers > 1 and not workers_supported():
+        print_color("⚠️  --workers needs SO_REUSEPORT, which this platform lacks; using 1 process", Colors.YELLOW)
+        workers = 1
+    
+    # Options shared by both launch modes
+    server_options = {
+        'workers': workers,
+        'open_browser': not args.no_browser,
+        'precompress_dir': args.precompress_dir,
+        'access_log': args.access_log,
+        'ledger_db': args.ledger_db or default_ledger_db(),
+        # Exports are only served to this machine unless asked for
+        'public_exports': args.public_exports,
+    }
+    # A tunnel makes the site public; statements only go through it when
+    # --ledger-db names the database and --public-exports opens them up
+    ngrok_options = dict(server_options, ledger_db=args.ledger_db)
+    
     # Check for direct mode (skip menu)
     if args.local:
         print_banner()
         print_color("🚀 Starting in LOCAL mode...\n", Colors.GREEN)
-        start_local_server(web_dir, port)
+        start_local_server(web_dir, port, args.engine, **server_options)
         return
     
     if args.ngrok:
@@ -479,7 +742,7 @@ def main():
                 sys.exit(1)
         
         print_color("🌍 Starting in NGROK mode...\n", Colors.CYAN)
-        start_ngrok_server(web_dir, port)
+        start_ngrok_server(web_dir, port, args.engine, **ngrok_options)
         return
     
     # Interactive mode (default)
@@ -490,7 +753,7 @@ def main():
     
     if choice == '1':
         # Local server
-        start_local_server(web_dir, port)
+        start_local_server(web_dir, port, args.engine, **server_options)
     
     elif choice == '2':
         # Public server with ngrok
@@ -513,7 +776,7 @@ def main():
                 input("Press Enter to exit...")
                 sys.exit(1)
         
-        start_ngrok_server(web_dir, port)
+        start_ngrok_server(web_dir, port, args.engine, **ngrok_options)
     
     elif choice == '3':
         # Exit
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Port Readiness Helpers for MobileBanks
+======================================
+
+Small socket helpers shared by the launchers:
+
+    is_port_free(port)      - can we bind the port right now?
+    find_free_port(start)   - first bindable port at or above start
+    wait_for_port(port)     - block until something accepts connections,
+                              probing with exponential backoff
+
+They replace fixed time.sleep() calls: a server that is ready is noticed
+within a few milliseconds, and one that failed is noticed immediately.
+"""
+
+import os
+import socket
+import time
+
+DEFAULT_READY_TIMEOUT = 10.0
+INITIAL_PROBE_DELAY = 0.005  # seconds; doubles after every failed probe
+MAX_PROBE_DELAY = 0.25
+DEFAULT_PORT_ATTEMPTS = 20
+
+
+def is_port_free(port, host=''):
+    """
+    Check whether a TCP port can be bound.
+
+    The probe uses the same address-reuse rules as the servers do, so a
+    port held only by TIME_WAIT connections counts as free while a port
+    with a listener does not.
+
+    Args:
+        port: Port number to test
+        host: Interface to test; '' means all interfaces
+
+    Returns:
+        True if the port can be bound right now
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        if os.name == 'nt':
+            # SO_REUSEADDR on Windows would let us bind over a live listener
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+    return True
+
+
+def find_free_port(start, attempts=DEFAULT_PORT_ATTEMPTS, host=''):
+    """
+    Find the first bindable port in start .. start + attempts - 1.
+
+    Returns:
+        The port number, or None if every port in the range is taken
+    """
+    for port in range(start, min(start + attempts, 65536)):
+        if is_port_free(port, host):
+            return port
+    return None
+
+
+def wait_for_port(port, host='127.0.0.1', timeout=DEFAULT_READY_TIMEOUT,
+                  initial_delay=INITIAL_PROBE_DELAY, max_delay=MAX_PROBE_DELAY,
+                  alive=None):
+    """
+    Wait until a TCP port accepts connections.
+
+    Args:
+        port: Port to probe
+        host: Host to connect to
+        timeout: Give up after this many seconds
+        initial_delay: First pause between probes; doubled each time up
+            to max_delay
+        alive: Optional callable; when it returns False the wait is
+            abandoned at once (e.g. the server process has exited)
+
+    Returns:
+        Seconds it took until the port accepted a connection
+
+    Raises:
+        TimeoutError: The port did not become ready in time, or alive()
+            reported that the server is gone
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    delay = initial_delay
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            with socket.create_connection((host, port), timeout=max(0.05, min(1.0, remaining))):
+                return time.monotonic() - started
+        except OSError:
+            pass
+        if alive is not None and not alive():
+            raise TimeoutError(f"server on port {port} exited before accepting connections")
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError(f"port {port} not ready after {timeout:.1f}s")
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
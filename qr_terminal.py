@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+qr_terminal.py
+
+Riippuvuudeton QR-koodin kooderi ja terminaalitulostus.
+
+Expo Go -linkit (exp://192.168.1.20:8081) ovat lyhyitä, joten tuetaan
+vain se, mitä ne tarvitsevat: tavutila, virheenkorjaustaso M ja versiot
+1-10 (enintään 213 tavua). Maski valitaan standardin
+rangaistuspisteillä kuten muissakin kirjastoissa.
+
+render() piirtää koodin puolikorkeilla lohkomerkeillä (▀ ▄ █), jolloin
+kaksi moduuliriviä mahtuu yhdelle tekstiriville. terminal_qr() tallentaa
+valmiin tekstin tiedostoon URL:n tiivisteen nimellä, joten saman URL:n
+koodi tulostetaan seuraavalla kerralla suoraan levyltä.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+# Virheenkorjaustaso M: versio -> (EC-sanoja per lohko, [(lohkoja, datasanoja per lohko)])
+EC_BLOCKS_M = {
+    1: (10, [(1, 16)]),
+    2: (16, [(1, 28)]),
+    3: (26, [(1, 44)]),
+    4: (18, [(2, 32)]),
+    5: (24, [(2, 43)]),
+    6: (16, [(4, 27)]),
+    7: (18, [(4, 31)]),
+    8: (22, [(2, 38), (2, 39)]),
+    9: (22, [(3, 36), (2, 37)]),
+    10: (26, [(4, 43), (1, 44)]),
+}
+MAX_VERSION = max(EC_BLOCKS_M)
+EC_LEVEL_M_BITS = 0b00  # formaattibitit: L=01, M=00, Q=11, H=10
+
+ALIGNMENT_POSITIONS = {
+    1: [], 2: [6, 18], 3: [6, 22], 4: [6, 26], 5: [6, 30], 6: [6, 34],
+    7: [6, 22, 38], 8: [6, 24, 42], 9: [6, 26, 46], 10: [6, 28, 50],
+}
+
+QUIET_ZONE = 2  # moduulia; skannerit pärjäävät standardin neljää kapeammalla
+RENDER_VERSION = 1  # välimuistin avaimessa: muutos piirrossa mitätöi vanhat
+
+Matrix = List[List[bool]]
+
+# GF(256), primitiivipolynomi x^8 + x^4 + x^3 + x^2 + 1
+_EXP = [0] * 512
+_LOG = [0] * 256
+_value = 1
+for _i in range(255):
+    _EXP[_i] = _value
+    _LOG[_value] = _i
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= 0x11D
+for _i in range(255, 512):
+    _EXP[_i] = _EXP[_i - 255]
+
+
+def _gf_mul(a: int, b: int) -> int:
+    if a == 0 or b == 0:
+        return 0
+    return _EXP[_LOG[a] + _LOG[b]]
+
+
+def rs_generator(degree: int) -> List[int]:
+    """Reed-Solomon-generaattoripolynomin kertoimet, korkein aste ensin"""
+    poly = [1]
+    for i in range(degree):
+        # kerro (x - a^i):llä
+        poly = [a ^ _gf_mul(b, _EXP[i]) for a, b in zip(poly + [0], [0] + poly)]
+    return poly
+
+
+def rs_remainder(data: List[int], degree: int) -> List[int]:
+    """Virheenkorjaussanat datasanoille"""
+    generator = rs_generator(degree)
+    remainder = [0] * degree
+    for byte in data:
+        factor = byte ^ remainder[0]
+        remainder = remainder[1:] + [0]
+        if factor:
+            for i in range(degree):
+                remainder[i] ^= _gf_mul(generator[i + 1], factor)
+    return remainder
+
+
+def data_capacity(version: int) -> int:
+    """Datasanojen määrä versiolla (taso M)"""
+    _, groups = EC_BLOCKS_M[version]
+    return sum(count * words for count, words in groups)
+
+
+def choose_version(length: int) -> int:
+    """
+    Pienin versio, johon length tavua mahtuu tavutilassa.
+
+    Raises:
+        ValueError: Data ei mahdu versioon 10
+    """
+    for version in range(1, MAX_VERSION + 1):
+        count_bits = 8 if version <= 9 else 16
+        if 4 + count_bits + 8 * length <= 8 * data_capacity(version):
+            return version
+    raise ValueError(f"{length} tavua ei mahdu QR-koodiin (versio {MAX_VERSION}, taso M)")
+
+
+def data_codewords(data: bytes, version: int) -> List[int]:
+    """Tavutilan bittivirta tavuiksi, täytteineen"""
+    capacity_bits = 8 * data_capacity(version)
+    bits = []
+
+    def append(value: int, length: int):
+        bits.extend((value >> i) & 1 for i in reversed(range(length)))
+
+    append(0b0100, 4)
+    append(len(data), 8 if version <= 9 else 16)
+    for byte in data:
+        append(byte, 8)
+    append(0, min(4, capacity_bits - len(bits)))
+    append(0, -len(bits) % 8)
+    words = [int("".join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8)]
+    pad = 0xEC
+    while len(words) < capacity_bits // 8:
+        words.append(pad)
+        pad ^= 0xEC ^ 0x11
+    return words
+
+
+def interleave(words: List[int], version: int) -> List[int]:
+    """Jakaa datan lohkoihin, laskee EC-sanat ja lomittaa ne"""
+    ec_length, groups = EC_BLOCKS_M[version]
+    blocks = []
+    offset = 0
+    for count, length in groups:
+        for _ in range(count):
+            blocks.append(words[offset:offset + length])
+            offset += length
+    ec_blocks = [rs_remainder(block, ec_length) for block in blocks]
+    result = []
+    for i in range(max(len(block) for block in blocks)):
+        result.extend(block[i] for block in blocks if i < len(block))
+    for i in range(ec_length):
+        result.extend(block[i] for block in ec_blocks)
+    return result
+
+
+def _bch_format(mask: int) -> int:
+    data = EC_LEVEL_M_BITS << 3 | mask
+    remainder = data
+    for _ in range(10):
+        remainder = (remainder << 1) ^ ((remainder >> 9) * 0x537)
+    return (data << 10 | remainder) ^ 0x5412
+
+
+def _bch_version(version: int) -> int:
+    remainder = version
+    for _ in range(12):
+        remainder = (remainder << 1) ^ ((remainder >> 11) * 0x1F25)
+    return version << 12 | remainder
+
+
+def _mask_bit(mask: int, x: int, y: int) -> bool:
+    if mask == 0:
+        return (x + y) % 2 == 0
+    if mask == 1:
+        return y % 2 == 0
+    if mask == 2:
+        return x % 3 == 0
+    if mask == 3:
+        return (x + y) % 3 == 0
+    if mask == 4:
+        return (x // 3 + y // 2) % 2 == 0
+    if mask == 5:
+        return x * y % 2 + x * y % 3 == 0
+    if mask == 6:
+        return (x * y % 2 + x * y % 3) % 2 == 0
+    return ((x + y) % 2 + x * y % 3) % 2 == 0
+
+
+class _Symbol:
+    """Yksi QR-symboli rakennusvaiheessa (modules[y][x])"""
+
+    def __init__(self, version: int):
+        self.version = version
+        self.size = 17 + 4 * version
+        self.modules = [[False] * self.size for _ in range(self.size)]
+        self.function = [[False] * self.size for _ in range(self.size)]
+        self._draw_function_patterns()
+
+    def set_function(self, x: int, y: int, dark: bool):
+        self.modules[y][x] = dark
+        self.function[y][x] = True
+
+    def _draw_function_patterns(self):
+        size = self.size
+        for i in range(size):
+            self.set_function(6, i, i % 2 == 0)
+            self.set_function(i, 6, i % 2 == 0)
+        for cx, cy in ((3, 3), (size - 4, 3), (3, size - 4)):
+            for dy in range(-4, 5):
+                for dx in range(-4, 5):
+                    x, y = cx + dx, cy + dy
+                    if 0 <= x < size and 0 <= y < size:
+                        self.set_function(x, y, max(abs(dx), abs(dy)) not in (2, 4))
+        positions = ALIGNMENT_POSITIONS[self.version]
+        last = len(positions) - 1
+        for i, cx in enumerate(positions):
+            for j, cy in enumerate(positions):
+                if (i, j) in ((0, 0), (0, last), (last, 0)):
+                    continue  # päällekkäin paikannuskuvioiden kanssa
+                for dy in range(-2, 3):
+                    for dx in range(-2, 3):
+                        self.set_function(cx + dx, cy + dy, max(abs(dx), abs(dy)) != 1)
+        self.draw_format(0)  # varaa alueet; oikeat bitit maskin valinnan jälkeen
+        if self.version >= 7:
+            bits = _bch_version(self.version)
+            for i in range(18):
+                dark = (bits >> i) & 1 == 1
+                a, b = size - 11 + i % 3, i // 3
+                self.set_function(a, b, dark)
+                self.set_function(b, a, dark)
+
+    def draw_format(self, mask: int):
+        bits = _bch_format(mask)
+        size = self.size
+
+        def bit(i: int) -> bool:
+            return (bits >> i) & 1 == 1
+
+        for i in range(6):
+            self.set_function(8, i, bit(i))
+        self.set_function(8, 7, bit(6))
+        self.set_function(8, 8, bit(7))
+        self.set_function(7, 8, bit(8))
+        for i in range(9, 15):
+            self.set_function(14 - i, 8, bit(i))
+        for i in range(8):
+            self.set_function(size - 1 - i, 8, bit(i))
+        for i in range(8, 15):
+            self.set_function(8, size - 15 + i, bit(i))
+        self.set_function(8, size - 8, True)  # aina tumma moduuli
+
+    def draw_codewords(self, codewords: List[int]):
+        size = self.size
+        index = 0
+        total = len(codewords) * 8
+        right = size - 1
+        while right >= 1:
+            if right == 6:
+                right = 5  # pystysuora ajoituskuvio
+            upward = (right + 1) & 2 == 0
+            for vert in range(size):
+                y = size - 1 - vert if upward else vert
+                for x in (right, right - 1):
+                    if not self.function[y][x] and index < total:
+                        self.modules[y][x] = (codewords[index >> 3] >> (7 - (index & 7))) & 1 == 1
+                        index += 1
+            right -= 2
+
+    def apply_mask(self, mask: int):
+        for y in range(self.size):
+            row, function = self.modules[y], self.function[y]
+            for x in range(self.size):
+                if not function[x] and _mask_bit(mask, x, y):
+                    row[x] = not row[x]
+
+
+def _run_penalty(line: List[bool]) -> int:
+    penalty = 0
+    run = 1
+    for previous, current in zip(line, line[1:]):
+        if current == previous:
+            run += 1
+        else:
+            if run >= 5:
+                penalty += run - 2
+            run = 1
+    if run >= 5:
+        penalty += run - 2
+    return penalty
+
+
+_FINDER_LIKE = ((True, False, True, True, True, False, True, False, False, False, False),
+                (False, False, False, False, True, False, True, True, True, False, True))
+
+
+def penalty_score(modules: Matrix) -> int:
+    """Standardin rangaistuspisteet N1-N4"""
+    size = len(modules)
+    columns = [[modules[y][x] for y in range(size)] for x in range(size)]
+    score = 0
+    for line in modules + columns:
+        score += _run_penalty(line)
+        padded = tuple(line)
+        for start in range(size - 10):
+            if padded[start:start + 11] in _FINDER_LIKE:
+                score += 40
+    for y in range(size - 1):
+        for x in range(size - 1):
+            color = modules[y][x]
+            if color == modules[y][x + 1] == modules[y + 1][x] == modules[y + 1][x + 1]:
+                score += 3
+    dark = sum(sum(row) for row in modules)
+    total = size * size
+    score += 10 * ((abs(dark * 20 - total * 10) + total - 1) // total - 1)
+    return score
+
+
+def encode(data: Union[str, bytes]) -> Matrix:
+    """
+    Koodaa datan QR-koodiksi (tavutila, taso M).
+
+    Returns:
+        Moduulimatriisi rivi kerrallaan; True = tumma
+
+    Raises:
+        ValueError: Data on liian pitkä
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    version = choose_version(len(data))
+    codewords = interleave(data_codewords(data, version), version)
+    symbol = _Symbol(version)
+    symbol.draw_codewords(codewords)
+
+    best: Optional[Tuple[int, int]] = None
+    for mask in range(8):
+        symbol.apply_mask(mask)
+        symbol.draw_format(mask)
+        score = penalty_score(symbol.modules)
+        if best is None or score < best[0]:
+            best = (score, mask)
+        symbol.apply_mask(mask)  # XOR kumoaa maskin
+    mask = best[1]
+    symbol.apply_mask(mask)
+    symbol.draw_format(mask)
+    return symbol.modules
+
+
+def render(modules: Matrix, quiet_zone: int = QUIET_ZONE) -> str:
+    """
+    Piirtää matriisin tekstiksi, kaksi moduuliriviä per tekstirivi.
+
+    Vaaleat moduulit piirretään lohkomerkeillä ja tummat jätetään
+    tyhjiksi, joten koodi näkyy oikein tummataustaisessa terminaalissa.
+    """
+    size = len(modules) + 2 * quiet_zone
+
+    def light(x: int, y: int) -> bool:
+        x -= quiet_zone
+        y -= quiet_zone
+        if 0 <= y < len(modules) and 0 <= x < len(modules):
+            return not modules[y][x]
+        return True
+
+    glyphs = {(True, True): "█", (True, False): "▀", (False, True): "▄", (False, False): " "}
+    lines = []
+    for y in range(0, size, 2):
+        lines.append("".join(glyphs[light(x, y), y + 1 < size and light(x, y + 1)]
+                             for x in range(size)))
+    return "\n".join(lines)
+
+
+def cache_path(cache_dir: Path, data: str) -> Path:
+    key = hashlib.sha256(f"{RENDER_VERSION}:{data}".encode("utf-8")).hexdigest()[:32]
+    return Path(cache_dir) / f"{key}.txt"
+
+
+def terminal_qr(data: str, cache_dir: Optional[Path] = None) -> str:
+    """
+    Palauttaa QR-koodin terminaalitekstinä, levylle tallennettuna.
+
+    Args:
+        data: Koodattava teksti (esim. exp://-URL)
+        cache_dir: Välimuistihakemisto; None = ei välimuistia
+    """
+    path = cache_path(cache_dir, data) if cache_dir is not None else None
+    if path is not None:
+        try:
+            return path.read_text(encoding="utf-8")
+        except OSError:
+            pass
+    text = render(encode(data))
+    if path is not None:
+        tmp_name = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_name, path)
+        except OSError:
+            pass  # välimuisti on vain nopeutus
+        finally:
+            if tmp_name is not None and os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+    return text
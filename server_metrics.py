@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Request Metrics and Access Log for the MobileBanks Web Server
+============================================================
+
+ServerMetrics keeps request counters, latency histograms, bytes out and
+asset cache outcomes per route and status code, and renders them in the
+Prometheus text format for the local-only /__metrics endpoint.
+
+Each process counts only its own requests. With --workers N the kernel
+hands every scrape to one of the workers, so worker processes label all
+of their series with worker="<pid>"; Prometheus then keeps one series
+per worker and sum without (worker) gives the totals.
+
+Recording takes no lock: every thread owns a shard of plain dicts that
+only it writes to. A scrape merges the shards; shards of threads that
+have exited (the threaded engine runs one thread per connection) are
+folded into a single retired shard so they do not pile up.
+
+AccessLog writes one JSON object per request to a file. The request path
+only puts a dict on a bounded queue; a background thread serializes and
+writes whatever has queued up in one batch, so a slow disk never holds
+up a response. When the queue is full, records are dropped and counted
+rather than blocking.
+"""
+
+import bisect
+import datetime
+import ipaddress
+import json
+import queue
+import threading
+from pathlib import Path
+
+METRICS_PATH = '/__metrics'
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRIC_PREFIX = 'mobilebanks'
+
+# Latency histogram bucket bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Cache outcomes reported by StaticSite: answered from memory, streamed
+# from disk (file-backed asset), or not in the asset table at all
+CACHE_RESULTS = ('hit', 'disk', 'miss')
+
+ACCESS_LOG_BATCH_SIZE = 512
+ACCESS_LOG_MAX_PENDING = 10000
+
+
+def is_local_request(client, headers):
+    """
+    True when a request comes straight from this machine.
+
+    Requests relayed by ngrok also arrive from 127.0.0.1 but carry
+    X-Forwarded-For, so those count as remote.
+    """
+    if not client or headers.get('x-forwarded-for') or headers.get('forwarded'):
+        return False
+    try:
+        address = ipaddress.ip_address(client)
+    except ValueError:
+        return False
+    if getattr(address, 'ipv4_mapped', None):
+        address = address.ipv4_mapped
+    return address.is_loopback
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Shard:
+    """Metrics written by one thread"""
+
+    __slots__ = ('requests', 'latency', 'bytes_out', 'cache')
+
+    def __init__(self):
+        self.requests = {}  # (route, status) -> count
+        self.latency = {}  # route -> [bucket counts..., +Inf count, sum]
+        self.bytes_out = {}  # route -> bytes
+        self.cache = {}  # result -> count
+
+    def merge_into(self, other):
+        """Add this shard's values to other"""
+        for key, count in list(self.requests.items()):
+            other.requests[key] = other.requests.get(key, 0) + count
+        for route, values in list(self.latency.items()):
+            target = other.latency.setdefault(route, [0] * (len(LATENCY_BUCKETS) + 1) + [0.0])
+            for index, value in enumerate(list(values)):
+                target[index] += value
+        for route, count in list(self.bytes_out.items()):
+            other.bytes_out[route] = other.bytes_out.get(route, 0) + count
+        for result, count in list(self.cache.items()):
+            other.cache[result] = other.cache.get(result, 0) + count
+
+
+class ServerMetrics:
+    """
+    Per-route request metrics of one server process.
+
+    Args:
+        access_log: Optional AccessLog whose dropped-record count is exported
+        worker: Optional worker label (the PID of a worker process) added
+            to every series
+    """
+
+    def __init__(self, access_log=None, worker=None):
+        self.access_log = access_log
+        self.worker = worker
+        self._local = threading.local()
+        self._shards = []  # (thread, shard)
+        self._retired = _Shard()
+        self._registry_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._registry_lock:
+                self._retire_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_dead_shards(self):
+        # Caller holds _registry_lock. A dead thread can no longer write
+        # to its shard, so folding it in is safe.
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                shard.merge_into(self._retired)
+        self._shards = alive
+
+    def observe(self, route, status, seconds, sent, cache=None):
+        """
+        Record one finished request.
+
+        Args:
+            route: Bounded route label (URL path of an asset or a fixed name)
+            status: HTTP status code
+            seconds: Time from request read to response written
+            sent: Body bytes sent
+            cache: One of CACHE_RESULTS, or None when no asset lookup was made
+        """
+        shard = self._shard()
+        key = (route, int(status))
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+
+        values = shard.latency.get(route)
+        if values is None:
+            values = shard.latency[route] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        values[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        values[-1] += seconds
+
+        shard.bytes_out[route] = shard.bytes_out.get(route, 0) + sent
+        if cache is not None:
+            shard.cache[cache] = shard.cache.get(cache, 0) + 1
+
+    def snapshot(self):
+        """Return a merged _Shard of everything recorded so far"""
+        total = _Shard()
+        with self._registry_lock:
+            self._retire_dead_shards()
+            self._retired.merge_into(total)
+            for _, shard in self._shards:
+                shard.merge_into(total)
+        return total
+
+    def cache_hit_ratio(self, snapshot=None):
+        """Share of asset lookups answered from memory (0.0 before any)"""
+        cache = (snapshot or self.snapshot()).cache
+        lookups = sum(cache.values())
+        return cache.get('hit', 0) / lookups if lookups else 0.0
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        common = [('worker', self.worker)] if self.worker is not None else []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{name} {kind}')
+
+        def sample(name, labels, value):
+            label_text = ','.join(f'{key}="{_escape_label(val)}"' for key, val in common + labels)
+            label_text = '{' + label_text + '}' if label_text else ''
+            lines.append(f'{METRIC_PREFIX}_{name}{label_text} {_format_value(value)}')
+
+        family('http_requests_total', 'counter', 'HTTP requests served, by route and status.')
+        for (route, status), count in sorted(snapshot.requests.items()):
+            sample('http_requests_total', [('route', route), ('status', status)], count)
+
+        family('http_request_duration_seconds', 'histogram', 'Time to answer a request, by route.')
+        for route, values in sorted(snapshot.latency.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), values):
+                cumulative += count
+                sample('http_request_duration_seconds_bucket', [('route', route), ('le', bound)], cumulative)
+            sample('http_request_duration_seconds_sum', [('route', route)], float(values[-1]))
+            sample('http_request_duration_seconds_count', [('route', route)], cumulative)
+
+        family('http_response_bytes_total', 'counter', 'Response body bytes sent, by route.')
+        for route, count in sorted(snapshot.bytes_out.items()):
+            sample('http_response_bytes_total', [('route', route)], count)
+
+        family('asset_cache_lookups_total', 'counter',
+               'Asset lookups: hit (memory), disk (file-backed) or miss.')
+        for result in CACHE_RESULTS:
+            sample('asset_cache_lookups_total', [('result', result)], snapshot.cache.get(result, 0))
+
+        family('asset_cache_hit_ratio', 'gauge', 'Share of asset lookups answered from memory.')
+        sample('asset_cache_hit_ratio', [], float(self.cache_hit_ratio(snapshot)))
+
+        if self.access_log is not None:
+            family('access_log_dropped_total', 'counter', 'Access log records dropped because the queue was full.')
+            sample('access_log_dropped_total', [], self.access_log.dropped)
+
+        return '\n'.join(lines) + '\n'
+
+
+class AccessLog:
+    """
+    JSON-lines access log written from a background thread.
+
+    Args:
+        path: Log file; parent directories are created, lines are appended
+        batch_size: Most records written with one write() call
+        max_pending: Queue bound; records beyond it are dropped
+    """
+
+    def __init__(self, path, batch_size=ACCESS_LOG_BATCH_SIZE, max_pending=ACCESS_LOG_MAX_PENDING):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        # Unbuffered append: each batch is a single write(), so worker
+        # processes sharing the file interleave whole lines
+        self._file = open(self.path, 'ab', buffering=0)
+        self._queue = queue.Queue(max_pending)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='access-log', daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self):
+        """Number of records dropped so far"""
+        return self._dropped
+
+    def log(self, record):
+        """Queue a record (a JSON-serializable dict); never blocks"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            # Only taken when the queue is full, so it never slows a
+            # request that got its record queued
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def close(self):
+        """Write everything still queued and close the file"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            done = None in batch
+            records = [record for record in batch if record is not None]
+            if records:
+                self._write(records)
+            if done:
+                return
+
+    def _write(self, records):
+        lines = []
+        for record in records:
+            record = dict(record)
+            record['ts'] = datetime.datetime.fromtimestamp(
+                record['ts'], datetime.timezone.utc).isoformat(timespec='milliseconds')
+            lines.append(json.dumps(record, separators=(',', ':')))
+        try:
+            self._file.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        except OSError:
+            pass  # a full disk must not take the server down
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useMemo, useState } from 'react';
 import { View, Text, StyleSheet, ScrollView, TouchableOpacity, Animated } from 'react-native';
 import { SafeAreaView } from 'react-native-safe-area-context';
 import { useTheme } from '../theme/theme';
@@ -27,8 +27,18 @@ const Raportit: React.FC = () => {
     setSelectedPeriod(period);
   };
 
-  const totalIncome = mockMonthlyData.reduce((sum, item) => sum + item.income, 0);
-  const totalExpenses = mockMonthlyData.reduce((sum, item) => sum + item.expenses, 0);
+  // One pass over the months; the bars all scale to the same maximum
+  const { totalIncome, totalExpenses, maxValue } = useMemo(() => {
+    let income = 0;
+    let expenses = 0;
+    let max = 0;
+    for (const item of mockMonthlyData) {
+      income += item.income;
+      expenses += item.expenses;
+      max = Math.max(max, item.income, item.expenses);
+    }
+    return { totalIncome: income, totalExpenses: expenses, maxValue: max || 1 };
+  }, []);
   const netBalance = totalIncome - totalExpenses;
 
   return (
@@ -85,7 +95,6 @@ const Raportit: React.FC = () => {
           
           {mockMonthlyData.map((data, index) => {
             const net = data.income - data.expenses;
-            const maxValue = Math.max(...mockMonthlyData.map(d => Math.max(d.income, d.expenses)));
             const incomeBar = (data.income / maxValue) * 100;
             const expenseBar = (data.expenses / maxValue) * 100;
             
@@ -0,0 +1,953 @@
+#!/usr/bin/env python3
+"""
+Static Serving Engine for MobileBanks
+=====================================
+
+In-process HTTP server used by launch_web_server.py to serve the web/
+folder. It replaces the forked `python -m http.server`, which handles one
+request at a time and closes every connection.
+
+Two engines are available:
+    threaded  - ThreadingHTTPServer, one thread per connection
+    asyncio   - a single event loop, one coroutine per connection
+
+Both engines speak HTTP/1.1 with keep-alive and share StaticSite, which
+turns a request into a Response. Anything that decides *what* to send
+lives in StaticSite; the engines only move bytes. StaticSite answers from
+the in-memory AssetCache (see asset_cache.py), so no request for a cached
+asset touches the filesystem. Files too large to cache are sent straight
+from disk with sendfile(), and byte ranges (206 Partial Content) are
+served from memoryview slices or file offsets, so neither path copies
+the body through Python buffers.
+
+Every request is counted in ServerMetrics (see server_metrics.py), which
+loopback clients can scrape at /__metrics, and optionally written to a
+JSON-lines AccessLog.
+
+Given a ledger database, StaticSite also serves statement downloads
+under /api/export/ (see backend/export.py). Those bodies are a
+ChunkedBody, produced while they are sent and written with chunked
+transfer encoding.
+
+Usage:
+    server = create_server(web_dir, port=8000, engine='asyncio')
+    server.serve_forever()          # blocking
+    server.start_background()       # or in a daemon thread
+    server.shutdown(); server.server_close()
+"""
+
+import email.utils
+import os
+import posixpath
+import socket
+import sys
+import threading
+import time
+import urllib.parse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from asset_cache import AssetCache, CacheWatcher, DEFAULT_WATCH_INTERVAL, file_headers
+from server_metrics import (AccessLog, METRICS_CONTENT_TYPE, METRICS_PATH, ServerMetrics,
+                            is_local_request)
+
+ENGINES = ('threaded', 'asyncio')
+DEFAULT_ENGINE = 'threaded'
+
+SERVER_NAME = 'MobileBanks'
+LISTEN_BACKLOG = 128
+KEEPALIVE_TIMEOUT = 15  # seconds an idle keep-alive connection is held open
+MAX_HEADER_LINES = 100
+COALESCE_LIMIT = 16 * 1024  # bodies up to this size are sent with the headers
+
+class FileBody:
+    """
+    Response body that is a byte span of an open file.
+
+    The engines pass it to sendfile(); whoever sends the response must
+    call close().
+    """
+
+    __slots__ = ('file', 'offset', 'count')
+
+    def __init__(self, file, offset, count):
+        self.file = file
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.file.close()
+
+
+class ChunkedBody:
+    """
+    Response body of unknown length, produced while it is sent.
+
+    The engines send frames() with Transfer-Encoding: chunked, or raw
+    followed by closing the connection for HTTP/1.0 clients; whoever
+    sends the response must call close(). len() is the number of body
+    bytes sent so far, which is what ServerMetrics records.
+
+    Args:
+        chunks: Iterable of bytes, e.g. a generator
+    """
+
+    __slots__ = ('chunks', 'sent')
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.sent = 0
+
+    def __len__(self):
+        return self.sent
+
+    def __bool__(self):
+        return True
+
+    def frames(self, chunked=True):
+        """Yield the bytes to write, with chunk framing when chunked"""
+        for chunk in self.chunks:
+            if not chunk:
+                continue  # an empty chunk would end the body
+            self.sent += len(chunk)
+            yield b'%X\r\n%b\r\n' % (len(chunk), chunk) if chunked else chunk
+        if chunked:
+            yield b'0\r\n\r\n'
+
+    def close(self):
+        close = getattr(self.chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+class Response:
+    """
+    A fully resolved HTTP response: status, header list and body.
+
+    The body is bytes, a memoryview slice of a cached body, a FileBody or
+    a ChunkedBody. route and cache label the request in ServerMetrics.
+    """
+
+    __slots__ = ('status', 'headers', 'body', 'route', 'cache')
+
+    def __init__(self, status, headers=None, body=b'', route=None, cache=None):
+        self.status = HTTPStatus(status)
+        self.headers = list(headers or [])
+        self.body = body
+        self.route = route
+        self.cache = cache
+
+    def close(self):
+        """Release the open file of a FileBody or the generator of a ChunkedBody"""
+        if isinstance(self.body, (FileBody, ChunkedBody)):
+            self.body.close()
+
+
+def parse_accept_encoding(value):
+    """
+    Parse an Accept-Encoding header into {coding: qvalue}.
+
+    Codings are lower-cased; a missing q parameter means 1.0.
+    """
+    codings = {}
+    for item in (value or '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, val = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def negotiate_encoding(accept_encoding, offered):
+    """
+    Pick the content coding to send.
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header (or None)
+        offered: Codings available for the asset, most preferred first
+
+    Returns:
+        One of offered, or None to send the identity representation
+    """
+    if not accept_encoding or not offered:
+        return None
+    codings = parse_accept_encoding(accept_encoding)
+    wildcard = codings.get('*', 0.0)
+    best, best_q = None, 0.0
+    for coding in offered:
+        q = codings.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Weak comparison of an If-None-Match header against an ETag.
+
+    Returns:
+        True when any listed tag (or '*') matches
+    """
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(if_none_match, if_modified_since, etag, mtime):
+    """
+    Evaluate conditional GET/HEAD headers (RFC 9110, section 13.2.2).
+
+    If-Modified-Since is only consulted when If-None-Match is absent.
+
+    Args:
+        if_none_match: If-None-Match header value or None
+        if_modified_since: If-Modified-Since header value or None
+        etag: ETag of the selected representation
+        mtime: Modification time of the asset in whole seconds
+
+    Returns:
+        True when the client's copy is current and a 304 should be sent
+    """
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if if_modified_since:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since is None:
+            return False
+        return mtime <= since.timestamp()
+    return False
+
+
+def parse_byte_range(value, size):
+    """
+    Parse a Range header against a representation of size bytes.
+
+    Only a single byte range is supported; anything else (several ranges,
+    other units, bad syntax) is ignored and the full body is sent, which
+    RFC 9110 allows.
+
+    Returns:
+        (first, last) inclusive offsets, 'unsatisfiable', or None to
+        ignore the header
+    """
+    unit, _, spec = (value or '').partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                return 'unsatisfiable'
+            return max(0, size - suffix), size - 1
+        first = int(first)
+        last = int(last) if last else None
+    except ValueError:
+        return None
+    if first < 0 or (last is not None and last < first):
+        return None
+    if first >= size:
+        return 'unsatisfiable'
+    if last is None:
+        last = size - 1
+    return first, min(last, size - 1)
+
+
+def if_range_matches(if_range, etag, mtime):
+    """
+    Evaluate If-Range: the range is only honoured while the client's copy
+    is current. ETags use strong comparison; a date must equal
+    Last-Modified exactly.
+    """
+    if_range = if_range.strip()
+    if if_range.startswith('W/'):
+        return False
+    if if_range.startswith('"'):
+        return if_range == etag
+    try:
+        date = email.utils.parsedate_to_datetime(if_range)
+    except (TypeError, ValueError):
+        return False
+    return date is not None and int(date.timestamp()) == mtime
+
+
+# Headers a 304 must repeat from the 200 it stands in for
+NOT_MODIFIED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+
+def not_modified_response(headers):
+    """Build a 304 repeating the validators of the representation headers"""
+    return Response(HTTPStatus.NOT_MODIFIED, [
+        (name, value) for name, value in headers if name in NOT_MODIFIED_HEADERS
+    ])
+
+
+def partial_response(headers, size, byte_range, slice_body):
+    """
+    Build a 206 (or 416) for a parsed byte range.
+
+    Args:
+        headers: Headers of the full identity representation
+        size: Size of the full representation
+        byte_range: Result of parse_byte_range (not None)
+        slice_body: Callable (first, count) returning the body for the span
+    """
+    if byte_range == 'unsatisfiable':
+        return error_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                              [('Content-Range', f'bytes */{size}')])
+    first, last = byte_range
+    count = last - first + 1
+    headers = [(name, value) for name, value in headers if name != 'Content-Length']
+    headers += [('Content-Length', str(count)),
+                ('Content-Range', f'bytes {first}-{last}/{size}')]
+    return Response(HTTPStatus.PARTIAL_CONTENT, headers, slice_body(first, count))
+
+
+def error_response(status, headers=None):
+    """Build a small plain-text error response"""
+    status = HTTPStatus(status)
+    body = f"{status.value} {status.phrase}\n".encode()
+    return Response(status, [
+        ('Content-Type', 'text/plain; charset=utf-8'),
+        ('Content-Length', str(len(body))),
+    ] + list(headers or []), body)
+
+
+class StaticSite:
+    """
+    Maps requests onto the in-memory asset table of a web directory.
+
+    Args:
+        web_dir: Directory to serve (the launcher's web/ folder)
+        cache: Optional preloaded AssetCache for web_dir
+        precompress_dir: Where to persist compressed variants (see AssetCache)
+        access_log: Optional AccessLog that every request is written to
+        ledger_db: Optional ledger database (backend/) to serve statement
+            exports from under EXPORT_PREFIX
+        public_exports: Serve exports to every client; by default only
+            loopback clients get them, like /__metrics
+        worker_id: Worker label for ServerMetrics (see worker_pool.py)
+    """
+
+    # Route labels for requests that did not resolve to an asset; keeps
+    # the metrics cardinality bounded however many paths are probed
+    UNMATCHED_ROUTE = '(unmatched)'
+    REDIRECT_ROUTE = '(redirect)'
+    EXPORT_PREFIX = '/api/export/'
+
+    def __init__(self, web_dir, cache=None, precompress_dir=None, access_log=None, ledger_db=None,
+                 public_exports=False, worker_id=None):
+        self.web_dir = Path(web_dir).resolve()
+        self.cache = cache or AssetCache(self.web_dir, precompress_dir=precompress_dir)
+        self.watcher = None
+        self.access_log = access_log
+        self.metrics = ServerMetrics(access_log, worker=worker_id)
+        self.ledger_db = ledger_db
+        self.public_exports = public_exports
+        self._ledger = None
+        self._ledger_lock = threading.Lock()
+
+    def start_watching(self, interval=DEFAULT_WATCH_INTERVAL):
+        """Reload changed files in the background every interval seconds"""
+        if self.watcher is None:
+            self.watcher = CacheWatcher(self.cache, interval).start()
+
+    def close(self):
+        """Stop the file watcher, flush the access log and close the ledger, if any"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        if self.access_log is not None:
+            self.access_log.close()
+        with self._ledger_lock:
+            if self._ledger is not None:
+                self._ledger.close()
+                self._ledger = None
+
+    def release_thread(self):
+        """Close the calling request thread's ledger connection, if it opened one"""
+        ledger = self._ledger
+        if ledger is not None:
+            ledger.release_connection()
+
+    def ledger(self):
+        """The ledger behind exports, opened on first use"""
+        with self._ledger_lock:
+            if self._ledger is None:
+                # Imported here so serving only static files never loads it
+                from backend import Ledger
+                self._ledger = Ledger(self.ledger_db)
+            return self._ledger
+
+    def lookup(self, url_path):
+        """
+        Find the cached asset for a URL path.
+
+        Returns:
+            (asset, redirect_location); both None when nothing matches
+        """
+        path = '/' + posixpath.normpath(urllib.parse.unquote(url_path)).lstrip('/')
+        if path == '/' or url_path.endswith('/'):
+            return self.cache.get(path.rstrip('/') + '/index.html'), None
+        asset = self.cache.get(path)
+        if asset is None and self.cache.get(path + '/index.html') is not None:
+            return None, url_path + '/'
+        return asset, None
+
+    def respond(self, method, target, headers, client=None):
+        """
+        Build the response for a request.
+
+        Args:
+            method: Request method ('GET', 'HEAD', ...)
+            target: Request target as sent by the client, including query
+            headers: Case-insensitive mapping of request headers
+            client: IP address of the peer; /__metrics is only served to
+                loopback clients
+
+        Returns:
+            A Response
+        """
+        response = self._respond(method, target, headers, client)
+        if response.route is None:
+            response.route = self.UNMATCHED_ROUTE
+        return response
+
+    def _respond(self, method, target, headers, client):
+        if method not in ('GET', 'HEAD'):
+            return error_response(HTTPStatus.NOT_IMPLEMENTED, [('Allow', 'GET, HEAD')])
+
+        url_path = urllib.parse.urlsplit(target).path or '/'
+        if url_path == METRICS_PATH and is_local_request(client, headers):
+            return self.metrics_response(method)
+        if (self.ledger_db is not None and url_path.startswith(self.EXPORT_PREFIX)
+                and (self.public_exports or is_local_request(client, headers))):
+            return self.export_response(method, target, url_path)
+
+        asset, redirect = self.lookup(url_path)
+        if redirect is not None:
+            response = error_response(HTTPStatus.MOVED_PERMANENTLY, [('Location', redirect)])
+            response.route = self.REDIRECT_ROUTE
+            return response
+        if asset is None:
+            response = error_response(HTTPStatus.NOT_FOUND)
+            response.cache = 'miss'
+            return response
+
+        if asset.file_backed:
+            response = self.respond_from_file(method, asset, headers)
+            response.route, response.cache = asset.url_path, 'disk'
+            return response
+
+        response = self.respond_from_memory(method, asset, headers)
+        response.route, response.cache = asset.url_path, 'hit'
+        return response
+
+    def respond_from_memory(self, method, asset, headers):
+        """Answer a request for a cached asset (200, 206, 304 or 416)"""
+        byte_range = self.requested_range(method, headers, asset.etag, asset.mtime, asset.size)
+        if byte_range is not None:
+            # Ranges address the identity bytes, never a compressed variant
+            representation = asset
+        else:
+            encoding = negotiate_encoding(headers.get('accept-encoding'),
+                                          [variant.encoding for variant in asset.variants])
+            representation = asset.variant(encoding) if encoding is not None else asset
+
+        if not_modified(headers.get('if-none-match'), headers.get('if-modified-since'),
+                        representation.etag, asset.mtime):
+            return not_modified_response(representation.headers)
+        if byte_range is not None:
+            return partial_response(representation.headers, asset.size, byte_range,
+                                    lambda first, count: memoryview(asset.body)[first:first + count])
+        return Response(HTTPStatus.OK, representation.headers, representation.body)
+
+    def respond_from_file(self, method, asset, headers):
+        """
+        Answer a request for a file-backed asset with a FileBody.
+
+        The file is opened and stat'ed per request; when it changed since
+        the last scan the headers are rebuilt from the fresh stat, so
+        Content-Length always matches what sendfile() will send.
+        """
+        try:
+            f = open(asset.file_path, 'rb')
+        except OSError:
+            return error_response(HTTPStatus.NOT_FOUND)
+        try:
+            st = os.fstat(f.fileno())
+            if (st.st_mtime_ns, st.st_size) == (asset.mtime_ns, asset.size):
+                base_headers, etag = asset.headers, asset.etag
+            else:
+                content_type = dict(asset.headers)['Content-Type']
+                base_headers, etag = file_headers(asset.url_path, content_type, st)
+            mtime = st.st_mtime_ns // 1_000_000_000
+
+            if not_modified(headers.get('if-none-match'), headers.get('if-modified-since'),
+                            etag, mtime):
+                f.close()
+                return not_modified_response(base_headers)
+            byte_range = self.requested_range(method, headers, etag, mtime, st.st_size)
+            if byte_range is not None:
+                response = partial_response(base_headers, st.st_size, byte_range,
+                                            lambda first, count: FileBody(f, first, count))
+            else:
+                response = Response(HTTPStatus.OK, base_headers, FileBody(f, 0, st.st_size))
+        except BaseException:
+            f.close()
+            raise
+        if not isinstance(response.body, FileBody) or method == 'HEAD':
+            f.close()
+            if method == 'HEAD':
+                response.body = b''
+        return response
+
+    def metrics_response(self, method):
+        """Render ServerMetrics for a scrape"""
+        body = self.metrics.render().encode('utf-8')
+        return Response(HTTPStatus.OK, [
+            ('Content-Type', METRICS_CONTENT_TYPE),
+            ('Content-Length', str(len(body))),
+            ('Cache-Control', 'no-store'),
+        ], body if method == 'GET' else b'', route=METRICS_PATH)
+
+    def export_response(self, method, target, url_path):
+        """Start a streamed statement download (see backend/export.py)"""
+        from backend.export import EXPORT_PARAMS, content_disposition, open_export
+        from backend.ledger import ValidationError
+
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(target).query)
+        params = {key: values[-1] for key, values in query.items() if key in EXPORT_PARAMS}
+        try:
+            export = open_export(self.ledger(), urllib.parse.unquote(url_path[len(self.EXPORT_PREFIX):]),
+                                 params)
+        except ValidationError:
+            export = False
+        if not export:
+            response = error_response(HTTPStatus.NOT_FOUND if export is None else HTTPStatus.BAD_REQUEST)
+            response.route = self.EXPORT_PREFIX
+            return response
+
+        filename, content_type, chunks = export
+        headers = [
+            ('Content-Type', content_type),
+            ('Content-Disposition', content_disposition(filename)),
+            ('Cache-Control', 'no-store'),
+            ('X-Content-Type-Options', 'nosniff'),
+        ]
+        if method == 'HEAD':
+            chunks.close()
+            return Response(HTTPStatus.OK, headers, route=self.EXPORT_PREFIX)
+        return Response(HTTPStatus.OK, headers, ChunkedBody(chunks), route=self.EXPORT_PREFIX)
+
+    def finish(self, response, client, method, target, version, headers, seconds):
+        """
+        Record a request that has been answered.
+
+        Args:
+            response: The Response that was sent
+            client: IP address of the peer
+            method, target, version: From the request line
+            headers: Request headers
+            seconds: Time from request read to response written
+        """
+        sent = len(response.body) if method != 'HEAD' else 0
+        self.metrics.observe(response.route, response.status.value, seconds, sent, response.cache)
+        if self.access_log is not None:
+            self.access_log.log({
+                'ts': time.time(),
+                'client': client,
+                'forwarded_for': headers.get('x-forwarded-for'),
+                'method': method,
+                'target': target,
+                'version': version,
+                'status': response.status.value,
+                'bytes': sent,
+                'duration_ms': round(seconds * 1000, 3),
+                'cache': response.cache,
+                'referer': headers.get('referer'),
+                'user_agent': headers.get('user-agent'),
+            })
+
+    @staticmethod
+    def requested_range(method, headers, etag, mtime, size):
+        """
+        Return the byte range to serve (see parse_byte_range), or None
+        when the request is not a usable range request.
+        """
+        range_header = headers.get('range')
+        if method != 'GET' or not range_header:
+            return None
+        if_range = headers.get('if-range')
+        if if_range and not if_range_matches(if_range, etag, mtime):
+            return None
+        return parse_byte_range(range_header, size)
+
+
+class BackgroundServingMixin:
+    """Adds start_background() to the server classes"""
+
+    def start_background(self):
+        """Run serve_forever() in a daemon thread and return the thread"""
+        thread = threading.Thread(target=self.serve_forever, name='static-server', daemon=True)
+        thread.start()
+        return thread
+
+
+class StaticRequestHandler(BaseHTTPRequestHandler):
+    """Threaded-engine handler; all decisions are delegated to StaticSite"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = SERVER_NAME
+    timeout = KEEPALIVE_TIMEOUT
+    # Headers and body are separate writes; without this Nagle's algorithm
+    # holds small bodies back until the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_site_response()
+
+    def do_HEAD(self):
+        self.send_site_response()
+
+    def send_site_response(self):
+        started = time.perf_counter()
+        site = self.server.site
+        client = self.client_address[0]
+        response = site.respond(self.command, self.path, self.headers, client)
+        self.send_response(response.status)
+        for name, value in response.headers:
+            self.send_header(name, value)
+        chunked = self.request_version != 'HTTP/1.0'
+        if isinstance(response.body, ChunkedBody):
+            if chunked:
+                self.send_header('Transfer-Encoding', 'chunked')
+            else:
+                self.close_connection = True  # the end of the body is the end of the stream
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            if self.command == 'HEAD' or not response.body:
+                return
+            if isinstance(response.body, FileBody):
+                # Zero-copy: the kernel moves the bytes from the page cache
+                self.connection.sendfile(response.body.file, response.body.offset,
+                                         response.body.count)
+            elif isinstance(response.body, ChunkedBody):
+                for frame in response.body.frames(chunked):
+                    self.wfile.write(frame)
+            else:
+                self.wfile.write(response.body)
+        finally:
+            response.close()
+            site.finish(response, client, self.command, self.path, self.request_version,
+                        self.headers, time.perf_counter() - started)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class ThreadedStaticServer(BackgroundServingMixin, ThreadingHTTPServer):
+    """Thread-per-connection engine built on the stdlib HTTP server"""
+
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, address, site, quiet=False, reuse_port=False):
+        self.site = site
+        self.quiet = quiet
+        self.allow_reuse_port = reuse_port
+        super().__init__(address, StaticRequestHandler)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.site.release_thread()
+
+    def server_close(self):
+        super().server_close()
+        self.site.close()
+
+
+class AsyncioStaticServer(BackgroundServingMixin):
+    """
+    Event-loop engine: one coroutine per connection.
+
+    The listening socket is bound in the constructor so bind errors surface
+    immediately, exactly like ThreadedStaticServer.
+    """
+
+    def __init__(self, address, site, quiet=False, reuse_port=False):
+        self.site = site
+        self.quiet = quiet
+        self.socket = socket.create_server(address, backlog=LISTEN_BACKLOG, reuse_port=reuse_port)
+        self.server_address = self.socket.getsockname()[:2]
+        self._loop = None
+        self._stop = None
+        self._serving = threading.Event()
+        self._stopped = threading.Event()
+        self._shutdown_requested = threading.Event()
+        self._connections = {}  # task -> writer
+
+    def serve_forever(self):
+        """Serve until shutdown() is called"""
+        # asyncio is imported here and in the coroutines below, so the
+        # threaded engine (the default) never pays for loading it
+        import asyncio
+        self._stopped.clear()
+        self._serving.set()
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._serving.clear()
+            self._shutdown_requested.clear()
+            self._stopped.set()
+
+    def shutdown(self):
+        """Stop serve_forever() and wait for it to return"""
+        self._shutdown_requested.set()
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._stop.set)
+            except RuntimeError:
+                pass  # loop already closed
+        if self._serving.is_set():
+            self._stopped.wait()
+
+    def server_close(self):
+        """Close the listening socket"""
+        self.socket.close()
+        self.site.close()
+
+    async def _serve(self):
+        import asyncio
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        try:
+            if self._shutdown_requested.is_set():
+                return
+            server = await asyncio.start_server(self._handle_connection, sock=self.socket)
+            async with server:
+                await self._stop.wait()
+                # Idle keep-alive connections would otherwise hold shutdown
+                for writer in list(self._connections.values()):
+                    writer.close()
+                await asyncio.gather(*self._connections, return_exceptions=True)
+        finally:
+            self._loop = None
+
+    async def _handle_connection(self, reader, writer):
+        import asyncio
+        peer = writer.get_extra_info('peername') or ('-', 0)
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            # Same reason as StaticRequestHandler.disable_nagle_algorithm
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                request = await asyncio.wait_for(self._read_request(reader), KEEPALIVE_TIMEOUT)
+                if request is None:
+                    break
+                method, target, version, headers = request
+                started = time.perf_counter()
+
+                response = self.site.respond(method, target, headers, peer[0])
+                keep_alive = self._keep_alive(version, headers)
+                if isinstance(response.body, ChunkedBody) and version == 'HTTP/1.0':
+                    keep_alive = False
+                try:
+                    self._write_response(writer, method, version, response, keep_alive)
+                    await writer.drain()
+                    if isinstance(response.body, FileBody) and method != 'HEAD':
+                        body = response.body
+                        await asyncio.get_running_loop().sendfile(
+                            writer.transport, body.file, body.offset, body.count)
+                    elif isinstance(response.body, ChunkedBody) and method != 'HEAD':
+                        await self._write_chunks(writer, response.body, version != 'HTTP/1.0')
+                finally:
+                    response.close()
+                    self.site.finish(response, peer[0], method, target, version, headers,
+                                     time.perf_counter() - started)
+                self._log(peer, method, target, version, response)
+
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass  # loop shutting down; nothing left to answer
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def _read_request(self, reader):
+        """
+        Read one request head (and discard any body).
+
+        Returns:
+            (method, target, version, headers) or None at end of stream
+        """
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        method, target, version = line.decode('latin-1').split()
+        if not version.startswith('HTTP/1.'):
+            raise ValueError(f"unsupported protocol {version}")
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise ValueError("too many headers")
+
+        length = int(headers.get('content-length') or 0)
+        if length:
+            await reader.readexactly(length)
+        return method, target, version, headers
+
+    @staticmethod
+    def _keep_alive(version, headers):
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    @staticmethod
+    async def _write_chunks(writer, body, chunked):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        frames = body.frames(chunked)
+        while True:
+            # The chunks may come from blocking reads (e.g. SQLite); keep
+            # them off the event loop
+            frame = await loop.run_in_executor(None, next, frames, None)
+            if frame is None:
+                break
+            writer.write(frame)
+            await writer.drain()
+
+    @staticmethod
+    def _write_response(writer, method, version, response, keep_alive):
+        head = [f"HTTP/1.1 {response.status.value} {response.status.phrase}",
+                f"Server: {SERVER_NAME}",
+                f"Date: {email.utils.formatdate(usegmt=True)}"]
+        head.extend(f"{name}: {value}" for name, value in response.headers)
+        if isinstance(response.body, ChunkedBody) and version != 'HTTP/1.0':
+            head.append('Transfer-Encoding: chunked')
+        if not keep_alive:
+            head.append('Connection: close')
+        elif version == 'HTTP/1.0':
+            head.append('Connection: keep-alive')
+        data = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+        body = response.body if method != 'HEAD' else b''
+        if isinstance(body, (FileBody, ChunkedBody)):
+            writer.write(data)  # the caller sends the body with sendfile() or _write_chunks()
+        elif len(body) <= COALESCE_LIMIT:
+            # One write keeps small responses in a single segment
+            writer.write(data + body)
+        else:
+            writer.write(data)
+            writer.write(body)
+
+    def _log(self, peer, method, target, version, response):
+        if self.quiet:
+            return
+        sys.stderr.write(
+            f'{peer[0]} - - [{email.utils.formatdate(localtime=True)}] '
+            f'"{method} {target} {version}" {response.status.value} -\n'
+        )
+
+
+def create_server(web_dir, port=8000, engine=DEFAULT_ENGINE, host='', quiet=False,
+                  watch_interval=DEFAULT_WATCH_INTERVAL, precompress_dir=None,
+                  workers=1, reuse_port=False, access_log=None, ledger_db=None, public_exports=False,
+                  worker_id=None):
+    """
+    Create (and bind) a static server for web_dir.
+
+    Args:
+        web_dir: Directory to serve
+        port: TCP port to listen on
+        engine: 'threaded' or 'asyncio'
+        host: Interface to bind; '' means all interfaces like http.server
+        quiet: Suppress the per-request log lines on stderr
+        watch_interval: Seconds between checks for changed files; None
+            serves the files as they were at startup
+        precompress_dir: Directory to store gzip/Brotli variants in and
+            reuse them from on later launches
+        workers: Number of serving processes; above 1 a WorkerSupervisor
+            (see worker_pool.py) is returned instead of a single server
+        reuse_port: Bind with SO_REUSEPORT (used by the worker processes)
+        access_log: Path of a JSON-lines access log to append to
+        ledger_db: Ledger database (see backend/) to stream statement
+            exports from under /api/export/; None disables them
+        public_exports: Serve the exports to remote clients too; by
+            default they are only served to this machine
+        worker_id: Label for this server's metrics series (set by the
+            worker processes to their PID)
+
+    Returns:
+        A server with serve_forever(), start_background(), shutdown()
+        and server_close()
+
+    Raises:
+        ValueError: Unknown engine
+        OSError: The port could not be bound
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; choose one of {', '.join(ENGINES)}")
+
+    if workers > 1:
+        from worker_pool import WorkerSupervisor
+        return WorkerSupervisor(web_dir, port, workers, engine, host=host, quiet=quiet,
+                                watch_interval=watch_interval, precompress_dir=precompress_dir,
+                                access_log=access_log, ledger_db=ledger_db, public_exports=public_exports)
+
+    site = StaticSite(web_dir, precompress_dir=precompress_dir,
+                      access_log=AccessLog(access_log) if access_log else None,
+                      ledger_db=str(ledger_db) if ledger_db else None, public_exports=public_exports,
+                      worker_id=worker_id)
+    server_class = ThreadedStaticServer if engine == 'threaded' else AsyncioStaticServer
+    try:
+        server = server_class((host, port), site, quiet=quiet, reuse_port=reuse_port)
+    except BaseException:
+        site.close()
+        raise
+    if watch_interval:
+        site.start_watching(watch_interval)
+    return server
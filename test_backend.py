@@ -0,0 +1,775 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the ledger backend (backend/)
+Runs the SQLite store directly and the JSON API over HTTP.
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import threading
+import time
+import http.client
+import json
+import random
+import zipfile
+import io
+import re
+import zlib
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+# Add the current directory to the path so we can import backend
+sys.path.insert(0, os.path.dirname(__file__))
+
+from backend import ledger as ledger_module
+from backend import export
+from backend import pdf
+from backend import reports
+from backend.balance import DailyBalances, FenwickTree
+from backend import DuplicateTransaction, Ledger, ValidationError, create_server
+
+
+def make_transaction(index, **fields):
+    transaction = {
+        'id': f'tx-{index}',
+        'title': f'Ostos {index}',
+        'amount': -(index % 100) - 0.1,
+        'date': f'2025-{index % 12 + 1:02d}-{index % 28 + 1:02d}',
+        'category': ('Ostokset', 'Tulot', 'Asuminen')[index % 3],
+        'status': 'completed',
+        'type': 'debit',
+    }
+    transaction.update(fields)
+    return transaction
+
+
+class LedgerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = Path(self.tmp.name) / 'ledger.sqlite3'
+        self.ledger = Ledger(self.db_path)
+        self.addCleanup(self.ledger.close)
+
+
+class TestLedger(LedgerTestCase):
+    """Test the SQLite transaction store."""
+
+    def test_add_and_get_round_trip(self):
+        stored = self.ledger.add(make_transaction(1, recipient='Kauppa Oy', iban='FI21 1234 5678 9012 34'))
+        self.assertEqual(stored, make_transaction(1, recipient='Kauppa Oy', iban='FI21 1234 5678 9012 34'))
+        self.assertEqual(self.ledger.get('tx-1'), stored)
+        self.assertIsNone(self.ledger.get('missing'))
+
+    def test_amounts_are_exact_cents(self):
+        self.ledger.add(make_transaction(1, amount=0.1))
+        self.ledger.add(make_transaction(2, amount=0.2))
+        rows = self.ledger._connection().execute('SELECT SUM(amount_cents) FROM transactions').fetchone()
+        self.assertEqual(rows[0], 30)
+
+    def test_generated_id_and_web_status(self):
+        # Shape of web/index.html createPayment()
+        stored = self.ledger.add({'title': 'Maksu', 'amount': -12.5, 'date': '2025-11-08',
+                                  'type': 'debit', 'category': 'Maksut', 'status': 'Valmis'})
+        self.assertTrue(stored['id'])
+        self.assertEqual(stored['status'], 'completed')
+
+    def test_validation(self):
+        for bad in [{'amount': 'abc'}, {'type': 'transfer'}, {'status': 'done'},
+                    {'title': ''}, {'amount': True}, {'iban': 5}, {'amount': 1e300}, {'amount': '-1e20'}]:
+            with self.subTest(bad=bad):
+                with self.assertRaises(ValidationError):
+                    self.ledger.add(make_transaction(1, **bad))
+        self.assertIsNone(self.ledger.get('tx-1'))
+
+    def test_duplicate_id(self):
+        self.ledger.add(make_transaction(1))
+        with self.assertRaises(DuplicateTransaction):
+            self.ledger.add(make_transaction(1))
+
+    def test_add_many_is_all_or_nothing(self):
+        with self.assertRaises(ValidationError):
+            self.ledger.add_many([make_transaction(1), make_transaction(2, type='bad')])
+        self.assertIsNone(self.ledger.get('tx-1'))
+        self.assertEqual(self.ledger.add_many([make_transaction(i) for i in range(10)]), 10)
+
+    def test_update_and_delete(self):
+        self.ledger.add(make_transaction(1))
+        updated = self.ledger.update('tx-1', {'status': 'failed', 'amount': -5, 'id': 'other'})
+        self.assertEqual(updated['status'], 'failed')
+        self.assertEqual(updated['amount'], -5)
+        self.assertEqual(updated['id'], 'tx-1')
+        self.assertIsNone(self.ledger.update('missing', {'status': 'failed'}))
+        self.assertTrue(self.ledger.delete('tx-1'))
+        self.assertFalse(self.ledger.delete('tx-1'))
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        self.ledger.add_many([make_transaction(i) for i in range(257)])
+        seen = []
+        cursor = None
+        while True:
+            page = self.ledger.page(limit=50, cursor=cursor)
+            seen.extend(page['items'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 257)
+        self.assertEqual(len({item['id'] for item in seen}), 257)
+        dates = [item['date'] for item in seen]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_filters_and_date_range(self):
+        self.ledger.add_many([make_transaction(i) for i in range(120)])
+        self.ledger.add(make_transaction(500, date='2025-03-15T23:59:00Z', category='Tulot'))
+        page = self.ledger.page(limit=500, category='Tulot', date_from='2025-03-01', date_to='2025-03-15')
+        self.assertTrue(page['items'])
+        for item in page['items']:
+            self.assertEqual(item['category'], 'Tulot')
+            self.assertTrue('2025-03-01' <= item['date'][:10] <= '2025-03-15')
+        self.assertIn('tx-500', [item['id'] for item in page['items']])
+
+    def test_filtered_listing_uses_an_index(self):
+        plan = self.ledger._connection().execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM transactions WHERE status = ? AND (date, seq) < (?, ?) '
+            'ORDER BY date DESC, seq DESC LIMIT 51', ('completed', '2025-06-01', 10)
+        ).fetchall()
+        self.assertIn('transactions_by_status', str(plan))
+        self.assertNotIn('TEMP B-TREE', str(plan))
+
+    def test_bad_page_arguments(self):
+        for kwargs in [{'limit': 0}, {'limit': ledger_module.MAX_PAGE_SIZE + 1},
+                       {'cursor': 'not-a-cursor'}, {'iban': 'x'}]:
+            with self.subTest(kwargs=kwargs):
+                with self.assertRaises(ValidationError):
+                    self.ledger.page(**kwargs)
+
+    def test_wal_mode(self):
+        mode = self.ledger._connection().execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+
+class TestBalances(LedgerTestCase):
+    """Test the per-day running balance against brute-force sums."""
+
+    def expected(self, transactions, date_from=None, date_to=None):
+        cents = [round(t['amount'] * 100) for t in transactions.values()
+                 if (date_from is None or t['date'][:10] >= date_from)
+                 and (date_to is None or t['date'][:10] <= date_to)]
+        return sum(cents), sum(c for c in cents if c > 0), len(cents)
+
+    def test_fenwick_prefix_sums(self):
+        values = [random.randint(-50, 50) for _ in range(100)]
+        tree = FenwickTree(values)
+        tree.add(17, 5)
+        values[17] += 5
+        for slot in (-1, 0, 17, 50, 99, 150):
+            self.assertEqual(tree.prefix(slot), sum(values[:max(slot + 1, 0)]))
+
+    def test_days_outside_the_range_grow_it(self):
+        balances = DailyBalances([('2025-06-01', 100, 100, 1)])
+        balances.apply('1999-01-01', (-5, 0, 1))
+        balances.apply('2090-12-31T10:00:00Z', (7, 7, 1))
+        self.assertEqual(balances.balance_at('1998-12-31'), 0)
+        self.assertEqual(balances.balance_at('2025-06-01'), 95)
+        self.assertEqual(balances.balance_at(), 102)
+        self.assertEqual(balances.totals('2000-01-01', '2100-01-01')['count'], 2)
+
+    def test_random_writes_match_brute_force(self):
+        rng = random.Random(7)
+        transactions = {}
+        for step in range(400):
+            action = rng.random()
+            if action < 0.6 or not transactions:
+                transaction = make_transaction(step, amount=rng.randint(-20000, 20000) / 100,
+                                               date=f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}')
+                self.ledger.add(transaction)
+                transactions[transaction['id']] = transaction
+            elif action < 0.8:
+                transaction_id = rng.choice(list(transactions))
+                changes = {'amount': rng.randint(-5000, 5000) / 100}
+                if rng.random() < 0.5:
+                    changes['date'] = f'2024-{rng.randint(1, 12):02d}-01T12:00:00Z'
+                self.ledger.update(transaction_id, changes)
+                transactions[transaction_id].update(changes)
+            else:
+                transaction_id = rng.choice(list(transactions))
+                self.assertTrue(self.ledger.delete(transaction_id))
+                del transactions[transaction_id]
+
+        for date in ('2023-12-31', '2024-06-01', '2025-03-15', '2025-12-31', None):
+            with self.subTest(date=date):
+                self.assertAlmostEqual(self.ledger.balance_at(date),
+                                       self.expected(transactions, date_to=date)[0] / 100)
+        net, inflow, count = self.expected(transactions, '2025-02-01', '2025-05-31')
+        totals = self.ledger.totals('2025-02-01', '2025-05-31')
+        self.assertAlmostEqual(totals['net'], net / 100)
+        self.assertAlmostEqual(totals['inflow'], inflow / 100)
+        self.assertAlmostEqual(totals['outflow'], (inflow - net) / 100)
+        self.assertEqual(totals['count'], count)
+        self.assertEqual(self.ledger.check_balances(), [])
+
+    def test_balances_survive_reopening(self):
+        self.ledger.add_many([make_transaction(i) for i in range(50)])
+        expected = self.ledger.balance_at('2025-06-30')
+        self.ledger.close()
+        reopened = Ledger(self.db_path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.balance_at('2025-06-30'), expected)
+        self.assertEqual(reopened.check_balances(), [])
+
+    def test_second_ledger_sees_other_writers(self):
+        reader = Ledger(self.db_path)
+        self.addCleanup(reader.close)
+        self.assertEqual(reader.balance_at(), 0)
+        self.ledger.add(make_transaction(1, amount=100, date='2025-01-01'))
+        self.assertEqual((reader.balance_at(), reader.totals()['count']), (100.0, 1))
+        # Writes interleaved from both sides keep both views exact
+        reader.add(make_transaction(2, amount=-30, date='2025-01-02'))
+        self.ledger.update('tx-1', {'amount': 50})
+        reader.delete('tx-2')
+        self.ledger.add(make_transaction(3, amount=5, date='2025-01-03'))
+        for ledger in (self.ledger, reader):
+            self.assertEqual(ledger.balance_at(), 55.0)
+            self.assertEqual(ledger.check_balances(), [])
+        reader.rebuild_balances()
+        self.assertEqual(self.ledger.totals('2025-01-03', '2025-01-03')['count'], 1)
+
+    def test_reads_never_see_a_half_applied_write(self):
+        # Every transaction is +1.00, so any consistent view has net == count;
+        # the dates keep widening the range, which rebuilds the trees
+        days = [f'{1950 + (i * 7) % 120}-{i % 12 + 1:02d}-01' for i in range(60)]
+        views, done = [], threading.Event()
+
+        def read():
+            while not done.is_set():
+                totals = self.ledger.totals()
+                views.append((totals['net'], totals['count']))
+
+        readers = [threading.Thread(target=read) for _ in range(3)]
+        # Yield between the per-metric tree updates so reads land inside them
+        add = FenwickTree.add
+        self.addCleanup(setattr, FenwickTree, 'add', add)
+        FenwickTree.add = lambda tree, slot, delta: (add(tree, slot, delta), time.sleep(0.0001))
+        for thread in readers:
+            thread.start()
+        try:
+            for index, day in enumerate(days):
+                self.ledger.add(make_transaction(index, amount=1, date=day))
+        finally:
+            done.set()
+            for thread in readers:
+                thread.join()
+        self.assertTrue(views)
+        self.assertEqual([view for view in views if view[0] != view[1]], [])
+        self.assertEqual(self.ledger.totals()['count'], len(days))
+
+    def test_existing_database_is_backfilled(self):
+        self.ledger.add_many([make_transaction(i) for i in range(20)])
+        connection = self.ledger._connection()
+        connection.execute('DELETE FROM daily_totals')
+        connection.execute('PRAGMA user_version = 0')
+        connection.commit()
+        self.ledger.close()
+        reopened = Ledger(self.db_path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.check_balances(), [])
+        self.assertEqual(reopened.totals()['count'], 20)
+
+    def test_checker_finds_and_rebuild_repairs_drift(self):
+        self.ledger.add_many([make_transaction(i) for i in range(20)])
+        connection = self.ledger._connection()
+        connection.execute("UPDATE transactions SET amount_cents = amount_cents + 1 WHERE id = 'tx-3'")
+        connection.commit()
+        before = self.ledger.balance_at()
+        problems = self.ledger.check_balances()
+        # The day, and the month, quarter and year rollups of tx-3's category
+        self.assertEqual(len(problems), 4)
+        self.assertIn(make_transaction(3)['date'], problems[0])
+        self.ledger.rebuild_balances()
+        self.assertEqual(self.ledger.check_balances(), [])
+        self.assertAlmostEqual(self.ledger.balance_at(), before + 0.01)
+        self.ledger.balances.apply('2025-01-01', (5, 5, 1))
+        self.assertIn('memory', self.ledger.check_balances()[0])
+
+    def test_invalid_dates(self):
+        with self.assertRaises(ValidationError):
+            self.ledger.add(make_transaction(1, date='yesterday'))
+        with self.assertRaises(ValidationError):
+            self.ledger.balance_at('2025-13-01')
+        with self.assertRaises(ValidationError):
+            self.ledger.totals(date_from='soon')
+
+
+class TestReports(LedgerTestCase):
+    """Test the month/quarter/year rollups against brute-force sums."""
+
+    def expected(self, transactions, date_from, date_to):
+        cents = [(round(t['amount'] * 100), t['category']) for t in transactions.values()
+                 if date_from <= t['date'][:10] <= date_to]
+        by_category = {}
+        for amount, category in cents:
+            inflow, outflow, count = by_category.get(category, (0, 0, 0))
+            by_category[category] = (inflow + max(amount, 0), outflow + max(-amount, 0), count + 1)
+        return by_category
+
+    def test_period_keys(self):
+        self.assertEqual(reports.period_keys('2025-11-08T10:00:00Z'), ('2025-11', '2025-Q4', '2025'))
+        self.assertEqual(reports.period_bounds('2024-Q1'), ('2024-01-01', '2024-03-31'))
+        self.assertEqual(reports.period_bounds('2024-02'), ('2024-02-01', '2024-02-29'))
+        self.assertEqual(reports.period_bounds('2024'), ('2024-01-01', '2024-12-31'))
+        self.assertEqual(reports.previous_keys('quarter', '2025-Q1', 3), ['2024-Q3', '2024-Q4', '2025-Q1'])
+        self.assertEqual(reports.previous_keys('month', '0001-02', 5), ['0001-01', '0001-02'])
+
+    def test_random_writes_match_brute_force(self):
+        rng = random.Random(11)
+        categories = ('Ostokset', 'Asuminen', 'Tulot', 'Ruoka')
+        transactions = {}
+        for step in range(300):
+            action = rng.random()
+            if action < 0.6 or not transactions:
+                transaction = make_transaction(step, amount=rng.randint(-20000, 20000) / 100,
+                                               category=rng.choice(categories),
+                                               date=f'{rng.randint(2024, 2025)}-{rng.randint(1, 12):02d}-01')
+                self.ledger.add(transaction)
+                transactions[transaction['id']] = transaction
+            elif action < 0.8:
+                transaction_id = rng.choice(list(transactions))
+                changes = rng.choice([
+                    {'amount': rng.randint(-5000, 5000) / 100},
+                    {'category': rng.choice(categories)},
+                    {'date': f'2024-{rng.randint(1, 12):02d}-15', 'category': rng.choice(categories)},
+                    {'title': 'Muutettu'},
+                ])
+                self.ledger.update(transaction_id, changes)
+                transactions[transaction_id].update(changes)
+            else:
+                transaction_id = rng.choice(list(transactions))
+                self.assertTrue(self.ledger.delete(transaction_id))
+                del transactions[transaction_id]
+
+        for period, date in (('month', '2025-03-09'), ('quarter', '2024-11-30'), ('year', '2025-01-01')):
+            with self.subTest(period=period):
+                report = self.ledger.report(period, date)
+                by_category = self.expected(transactions, report['from'], report['to'])
+                self.assertEqual({c['category']: (round(c['inflow'] * 100), round(c['outflow'] * 100), c['count'])
+                                  for c in report['categories']}, by_category)
+                self.assertEqual(report['count'], sum(count for _, _, count in by_category.values()))
+                self.assertEqual(report['history'][-1]['count'], report['count'])
+        self.assertEqual(self.ledger.check_balances(), [])
+
+    def test_report_shape(self):
+        self.ledger.add_many([
+            make_transaction(1, amount=2500, date='2025-11-01', category='Palkka', type='credit'),
+            make_transaction(2, amount=-800, date='2025-11-02', category='Asuminen'),
+            make_transaction(3, amount=-45.5, date='2025-11-20', category='Ruoka'),
+            make_transaction(4, amount=-60, date='2025-09-30', category='Ruoka'),
+        ])
+        report = self.ledger.report('month', '2025-11-15', history=3)
+        self.assertEqual((report['key'], report['from'], report['to']), ('2025-11', '2025-11-01', '2025-11-30'))
+        self.assertEqual((report['inflow'], report['outflow'], report['net'], report['count']),
+                         (2500.0, 845.5, 1654.5, 3))
+        self.assertEqual([c['category'] for c in report['categories']], ['Asuminen', 'Ruoka', 'Palkka'])
+        self.assertEqual([(h['key'], h['count']) for h in report['history']],
+                         [('2025-09', 1), ('2025-10', 0), ('2025-11', 3)])
+        self.assertEqual(self.ledger.report('year', '2025-01-01', history=1)['outflow'], 905.5)
+
+    def test_existing_database_gets_rollups(self):
+        self.ledger.add_many([make_transaction(i) for i in range(30)])
+        expected = self.ledger.report('quarter', '2025-05-01')
+        connection = self.ledger._connection()
+        connection.execute('DELETE FROM period_totals')
+        connection.execute('PRAGMA user_version = 1')
+        connection.commit()
+        self.ledger.close()
+        reopened = Ledger(self.db_path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.report('quarter', '2025-05-01'), expected)
+        self.assertEqual(reopened.check_balances(), [])
+
+    def test_invalid_reports(self):
+        for arguments in (('week',), ('month', '2025-02-30'), ('month', None, 0),
+                          ('month', None, reports.MAX_HISTORY + 1)):
+            with self.subTest(arguments=arguments):
+                with self.assertRaises(ValidationError):
+                    self.ledger.report(*arguments)
+
+
+class TestExport(LedgerTestCase):
+    """Test the streaming CSV/XLSX statement export."""
+
+    SHEET = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+    def export(self, name, **params):
+        filename, content_type, chunks = export.open_export(self.ledger, name, params)
+        return list(chunks)
+
+    def test_label_range(self):
+        self.assertEqual(export.label_range('2024-02'), ('2024-02-01', '2024-02-29'))
+        self.assertEqual(export.label_range('2025'), ('2025-01-01', '2025-12-31'))
+        self.assertEqual(export.label_range('2025-11-08'), ('2025-11-08', '2025-11-08'))
+        self.assertEqual(export.label_range('kaikki'), (None, None))
+        with self.assertRaises(ValidationError):
+            export.label_range('2025-13')
+
+    def test_iter_batches_is_oldest_first_in_batches(self):
+        self.ledger.add_many([make_transaction(i) for i in range(95)])
+        batches = list(self.ledger.iter_batches(batch_size=20))
+        self.assertEqual([len(batch) for batch in batches], [20, 20, 20, 20, 15])
+        dates = [t['date'] for batch in batches for t in batch]
+        self.assertEqual(dates, sorted(dates))
+        self.assertEqual(len({t['id'] for batch in batches for t in batch}), 95)
+        with self.assertRaises(ValidationError):
+            self.ledger.iter_batches(iban='x')
+
+    def test_csv(self):
+        self.ledger.add_many([
+            make_transaction(1, date='2025-11-02T08:00:00Z', amount=-1234.5, title='=HYPERLINK("x")'),
+            make_transaction(2, date='2025-11-01', amount=10, type='credit', recipient='Kauppa; Oy'),
+            make_transaction(3, date='2025-10-31'),
+        ])
+        lines = b''.join(self.export('tiliote-2025-11.csv')).decode('utf-8').splitlines()
+        self.assertTrue(lines[0].startswith('\ufeffPäivämäärä;'))
+        self.assertEqual(lines[1], '2025-11-01;Ostos 2;"Kauppa; Oy";;Asuminen;Valmis;Hyvitys;10,00')
+        self.assertEqual(lines[2], '2025-11-02;"\'=HYPERLINK(""x"")";;;Tulot;Valmis;Veloitus;-1234,50')
+        self.assertEqual(len(lines), 3)
+
+    def test_query_overrides_label_and_filters(self):
+        self.ledger.add_many([make_transaction(i) for i in range(60)])
+        csv_rows = b''.join(self.export('tiliote-kaikki.csv', category='Tulot', **{'from': '2025-06-01'}))
+        rows = csv_rows.decode('utf-8-sig').splitlines()[1:]
+        expected = [t for t in map(make_transaction, range(60))
+                    if t['category'] == 'Tulot' and t['date'] >= '2025-06-01']
+        self.assertEqual(len(rows), len(expected))
+
+    def test_header_is_sent_before_any_row_is_read(self):
+        def batches():
+            raise AssertionError("rows read before the header was sent")
+            yield
+        self.assertIn('Päivämäärä'.encode(), next(export.csv_chunks(batches())))
+        self.assertIn(b'[Content_Types].xml', next(export.xlsx_chunks(batches())))
+
+    def test_xlsx_is_a_valid_workbook(self):
+        self.ledger.add_many([make_transaction(i, title=f'A & <B> {i}') for i in range(5000)])
+        chunks = self.export('tiliote-kaikki.xlsx')
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertIn('xl/styles.xml', archive.namelist())
+            sheet = ET.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        rows = sheet.iter(f'{self.SHEET}row')
+        next(rows)
+        first = [cell for cell in next(rows)]
+        # 2025-01-01 as an Excel serial date, and the amount as a number
+        self.assertEqual(first[0].find(f'{self.SHEET}v').text, '45658')
+        self.assertTrue(first[1].find(f'.//{self.SHEET}t').text.startswith('A & <B>'))
+        self.assertEqual(sum(1 for _ in rows) + 1, 5000)
+
+    def test_csv_chunks_stay_bounded(self):
+        def batches():
+            for start in range(0, 100000, 1000):
+                yield [make_transaction(i) for i in range(start, start + 1000)]
+        sizes = [len(chunk) for chunk in export.csv_chunks(batches())]
+        self.assertGreater(len(sizes), 50)
+        self.assertLess(max(sizes), export.CHUNK_SIZE + 200 * 1000)
+
+
+def parse_pdf(data):
+    """
+    Check the file structure of a PDF written by backend.pdf.
+
+    Returns:
+        (Pages /Count, list of decompressed stream contents)
+    """
+    assert data.startswith(b'%PDF-1.4\n') and data.endswith(b'%%EOF\n')
+    startxref = int(data.rsplit(b'startxref\n', 1)[1].split()[0])
+    lines = data[startxref:].split(b'\n')
+    assert lines[0] == b'xref'
+    size = int(lines[1].split()[1])
+    for number in range(1, size):
+        offset = int(lines[2 + number][:10])
+        assert data[offset:].startswith(b'%d 0 obj\n' % number), f"xref entry {number} is off"
+    streams = []
+    for match in re.finditer(rb'/Length (\d+) /Filter /FlateDecode >>\nstream\n', data):
+        raw = data[match.end():match.end() + int(match.group(1))]
+        assert data[match.end() + len(raw):].startswith(b'\nendstream')
+        streams.append(zlib.decompress(raw))
+    count = int(re.search(rb'/Type /Pages /Count (\d+)', data).group(1))
+    assert count == data.count(b'/Type /Page /Parent')
+    return count, streams
+
+
+class TestPdf(LedgerTestCase):
+    """Test the streaming PDF statements and receipts."""
+
+    def export(self, name, **params):
+        filename, content_type, chunks = export.open_export(self.ledger, name, params)
+        self.assertEqual(content_type, 'application/pdf')
+        return list(chunks)
+
+    def test_statement_pages_and_summary(self):
+        self.ledger.add_many([make_transaction(i, date=f'2025-11-{i % 28 + 1:02d}') for i in range(100)])
+        self.ledger.add(make_transaction(999, date='2025-10-01', amount=500, type='credit'))
+        chunks = self.export('tiliote-2025-11.pdf')
+        # prefix, one chunk per page, trailer
+        pages = -(-100 // pdf.ROWS_PER_PAGE)
+        self.assertEqual(len(chunks), pages + 2)
+        count, streams = parse_pdf(b''.join(chunks))
+        self.assertEqual(count, pages)
+        text = b'\n'.join(streams)
+        self.assertIn(b'(Ostos 42) Tj', text)
+        self.assertIn(b'(Jakso: 1.11.2025 \x96 30.11.2025) Tj', text)
+        self.assertIn(b'(Sivu %d) Tj' % pages, text)
+        self.assertIn(b'(TILIOTE) Tj', text)
+        # Opening balance is October's credit; closing adds November
+        november = self.ledger.totals('2025-11-01', '2025-11-30')['net']
+        self.assertIn(b'(500,00) Tj', text)
+        self.assertIn(b'(%b) Tj' % pdf.format_amount(500 + november).encode(), text)
+
+    def test_summary_comes_from_stored_totals(self):
+        exporter = Ledger(self.db_path)
+        self.addCleanup(exporter.close)
+        self.ledger.add(make_transaction(1, amount=200, date='2025-10-31', type='credit'))
+        self.ledger.add(make_transaction(2, amount=-50.25, date='2025-11-10'))
+        # Whatever the exporter's trees hold, the statement uses daily_totals
+        exporter.balances.apply('2025-11-01', (99999, 99999, 1))
+        summary = export.statement_summary(exporter, '2025-11-01', '2025-11-30')
+        self.assertEqual(summary, {'opening': 200.0, 'inflow': 0.0, 'outflow': 50.25,
+                                   'closing': 149.75, 'count': 1})
+
+    def test_filtered_and_empty_statements(self):
+        self.ledger.add_many([make_transaction(i) for i in range(30)])
+        _, streams = parse_pdf(b''.join(self.export('tiliote-kaikki.pdf', category='Tulot')))
+        self.assertNotIn(b'Alkusaldo', b''.join(streams))
+        count, streams = parse_pdf(b''.join(self.export('tiliote-2030.pdf')))
+        self.assertEqual(count, 1)
+        self.assertIn('(Ei tapahtumia tällä jaksolla.)'.encode('cp1252'), b''.join(streams))
+
+    def test_shared_objects_are_cached(self):
+        first = next(pdf.statement_chunks([], 'x'))
+        self.assertIs(next(pdf.statement_chunks([], 'y')), first)
+        self.assertIn(b'/BaseFont /Helvetica-Bold', first)
+        self.assertIn(b'/Subtype /Form', first)
+
+    def test_receipt(self):
+        self.ledger.add(make_transaction(7, recipient='Kahvila (Oy)', iban='FI21 1234 5600 0007 85'))
+        count, streams = parse_pdf(b''.join(self.export('kuitti-tx-7.pdf')))
+        self.assertEqual(count, 1)
+        text = b''.join(streams)
+        self.assertIn(b'(KUITTI) Tj', text)
+        self.assertIn(b'(Kahvila \\(Oy\\)) Tj', text)
+        self.assertIn(b'(-7,10 \x80) Tj', text)
+        self.assertIsNone(export.open_export(self.ledger, 'kuitti-nothing.pdf', {}))
+
+    def test_text_helpers(self):
+        self.assertEqual(pdf.format_amount(-1234.5), '-1 234,50')
+        self.assertEqual(pdf.format_date('2025-11-08T10:00:00Z'), '8.11.2025')
+        self.assertEqual(pdf.text_width('Ä', 'F1', 10), pdf.text_width('A', 'F1', 10))
+        fitted = pdf.fit_text('x' * 200, 100)
+        self.assertTrue(fitted.endswith('…'))
+        self.assertLessEqual(pdf.text_width(fitted), 100)
+        self.assertEqual(pdf.pdf_string('a\\b(c)\n'), b'(a\\\\b\\(c\\) )')
+
+    def test_generate_statements_in_pool(self):
+        accounts = []
+        for account in range(3):
+            path = Path(self.tmp.name) / f'account-{account}.sqlite3'
+            ledger = Ledger(path)
+            ledger.add_many([make_transaction(i, date='2025-11-05') for i in range(10 * (account + 1))])
+            ledger.close()
+            accounts.append(path)
+        out_dir = Path(self.tmp.name) / 'statements'
+        written = export.generate_statements(accounts, '2025-11', out_dir, workers=2)
+        self.assertEqual([path.name for path, _ in written],
+                         [f'account-{account}-tiliote-2025-11.pdf' for account in range(3)])
+        for path, size in written:
+            self.assertEqual(path.stat().st_size, size)
+            parse_pdf(path.read_bytes())
+        self.assertEqual(sorted(p.name for p in out_dir.iterdir()), sorted(path.name for path, _ in written))
+        with self.assertRaises(ValidationError):
+            export.generate_statements(accounts, '2025-13', out_dir)
+
+
+class TestLedgerApi(unittest.TestCase):
+    """Test the JSON API over HTTP."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.server = create_server(Path(self.tmp.name) / 'ledger.sqlite3', port=0,
+                                    host='127.0.0.1', quiet=True)
+        self.server.start_background()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.port = self.server.server_address[1]
+
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        self.addCleanup(connection.close)
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = dict(headers or {})
+        if payload:
+            headers['Content-Type'] = 'application/json'
+        connection.request(method, path, body=payload, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        return response, json.loads(data) if data else None
+
+    def test_health(self):
+        response, data = self.request('GET', '/api/health')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(data, {'status': 'ok'})
+        self.assertIsNone(response.getheader('Access-Control-Allow-Origin'))
+
+    def test_request_threads_release_connections(self):
+        for _ in range(30):
+            connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+            connection.request('GET', '/api/transactions')
+            self.assertEqual(connection.getresponse().status, 200)
+            connection.close()
+        # Threads close their connection after the response is sent
+        deadline = time.monotonic() + 5
+        while len(self.server.ledger._connections) > 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertLessEqual(len(self.server.ledger._connections), 1)
+
+    def test_crud(self):
+        response, created = self.request('POST', '/api/transactions', make_transaction(1))
+        self.assertEqual(response.status, 201)
+        self.assertEqual(created['id'], 'tx-1')
+        response, _ = self.request('POST', '/api/transactions', make_transaction(1))
+        self.assertEqual(response.status, 409)
+        response, data = self.request('PATCH', '/api/transactions/tx-1', {'status': 'pending'})
+        self.assertEqual((response.status, data['status']), (200, 'pending'))
+        response, data = self.request('GET', '/api/transactions/tx-1')
+        self.assertEqual(data['status'], 'pending')
+        response, _ = self.request('DELETE', '/api/transactions/tx-1')
+        self.assertEqual(response.status, 204)
+        response, data = self.request('GET', '/api/transactions/tx-1')
+        self.assertEqual(response.status, 404)
+        self.assertIn('error', data)
+
+    def test_batch_insert_and_pagination(self):
+        response, data = self.request('POST', '/api/transactions', [make_transaction(i) for i in range(30)])
+        self.assertEqual((response.status, data), (201, {'inserted': 30}))
+        ids = []
+        path = '/api/transactions?limit=7&type=debit'
+        while path:
+            response, page = self.request('GET', path)
+            self.assertEqual(response.status, 200)
+            ids.extend(item['id'] for item in page['items'])
+            path = f"/api/transactions?limit=7&type=debit&cursor={page['next_cursor']}" if page['next_cursor'] else None
+        self.assertEqual(sorted(ids), sorted(f'tx-{i}' for i in range(30)))
+
+    def test_balance_and_totals(self):
+        self.request('POST', '/api/transactions', [
+            make_transaction(1, amount=100, date='2025-01-10'),
+            make_transaction(2, amount=-30.5, date='2025-02-10'),
+            make_transaction(3, amount=-9.5, date='2025-03-10T08:00:00Z'),
+        ])
+        response, data = self.request('GET', '/api/balance?date=2025-02-28')
+        self.assertEqual((response.status, data), (200, {'date': '2025-02-28', 'balance': 69.5}))
+        response, data = self.request('GET', '/api/totals?from=2025-02-01')
+        self.assertEqual(data, {'from': '2025-02-01', 'to': None, 'net': -40.0, 'inflow': 0.0,
+                                'outflow': 40.0, 'count': 2})
+        self.assertEqual(self.request('GET', '/api/balance?date=bad')[0].status, 400)
+        response, data = self.request('GET', '/api/reports?period=quarter&date=2025-02-01&history=2')
+        self.assertEqual((response.status, data['key'], data['outflow'], data['count']), (200, '2025-Q1', 40.0, 3))
+        self.assertEqual(len(data['history']), 2)
+        self.assertEqual(self.request('GET', '/api/reports?period=week')[0].status, 400)
+        self.assertEqual(self.request('GET', '/api/reports?history=x')[0].status, 400)
+
+    def test_export_is_chunked(self):
+        self.request('POST', '/api/transactions', [make_transaction(i) for i in range(40)])
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        self.addCleanup(connection.close)
+        connection.request('GET', '/api/export/tiliote-kaikki.csv?type=debit')
+        response = connection.getresponse()
+        body = response.read()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Transfer-Encoding'), 'chunked')
+        self.assertEqual(response.getheader('Content-Type'), 'text/csv; charset=utf-8')
+        self.assertEqual(len(body.decode('utf-8-sig').splitlines()), 41)
+        connection.request('GET', '/api/export/kuitti-tx-1.pdf')
+        response = connection.getresponse()
+        self.assertEqual(response.getheader('Content-Type'), 'application/pdf')
+        self.assertEqual(parse_pdf(response.read())[0], 1)
+        self.assertEqual(self.request('GET', '/api/export/tiliote.pdf')[0].status, 404)
+        self.assertEqual(self.request('GET', '/api/export/kuitti-nothing.pdf')[0].status, 404)
+        self.assertEqual(self.request('GET', '/api/export/tiliote-2025-02-30.csv')[0].status, 400)
+
+    def test_errors(self):
+        self.assertEqual(self.request('GET', '/api/transactions?limit=abc')[0].status, 400)
+        self.assertEqual(self.request('POST', '/api/transactions', {'title': 'x'})[0].status, 400)
+        self.assertEqual(self.request('GET', '/api/nothing')[0].status, 404)
+        self.assertEqual(self.request('DELETE', '/api/transactions')[0].status, 405)
+
+    def test_bad_content_length(self):
+        for length in ('abc', '-5'):
+            with self.subTest(length=length):
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+                self.addCleanup(connection.close)
+                connection.putrequest('POST', '/api/transactions')
+                connection.putheader('Content-Length', length)
+                connection.endheaders()
+                response = connection.getresponse()
+                self.assertEqual(response.status, 400)
+                self.assertIn('Content-Length', json.loads(response.read())['error'])
+        response, _ = self.request('POST', '/api/transactions', make_transaction(1, amount=10 ** 18))
+        self.assertEqual(response.status, 400)
+
+    def test_cors_preflight(self):
+        response, _ = self.request('OPTIONS', '/api/transactions', headers={'Origin': 'http://localhost:8000'})
+        self.assertEqual(response.status, 204)
+        self.assertIn('PATCH', response.getheader('Access-Control-Allow-Methods'))
+        self.assertEqual(response.getheader('Access-Control-Allow-Origin'), 'http://localhost:8000')
+
+    def test_foreign_origins_are_refused(self):
+        for origin in ('https://example.com', 'http://localhost.example.com', 'null'):
+            with self.subTest(origin=origin):
+                response, data = self.request('POST', '/api/transactions', make_transaction(1),
+                                              headers={'Origin': origin})
+                self.assertEqual(response.status, 403)
+                self.assertIsNone(response.getheader('Access-Control-Allow-Origin'))
+                response, _ = self.request('OPTIONS', '/api/transactions', headers={'Origin': origin})
+                self.assertEqual(response.status, 403)
+        # Nothing reached the ledger
+        self.assertEqual(self.request('GET', '/api/transactions')[1]['items'], [])
+        response, _ = self.request('GET', '/api/health', headers={'Origin': 'http://127.0.0.1:8081'})
+        self.assertEqual(response.getheader('Access-Control-Allow-Origin'), 'http://127.0.0.1:8081')
+
+    def test_allowed_origins_and_loopback_default(self):
+        server = create_server(Path(self.tmp.name) / 'other.sqlite3', port=0, quiet=True,
+                               allowed_origins=['http://192.168.1.20:8000'])
+        self.addCleanup(server.server_close)
+        self.assertEqual(server.server_address[0], '127.0.0.1')
+        server.start_background()
+        self.addCleanup(server.shutdown)
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+        self.addCleanup(connection.close)
+        connection.request('GET', '/api/health', headers={'Origin': 'http://192.168.1.20:8000'})
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Access-Control-Allow-Origin'), 'http://192.168.1.20:8000')
+
+
+def run_tests():
+    """Run all tests and return results."""
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+
+    suite.addTests(loader.loadTestsFromTestCase(TestLedger))
+    suite.addTests(loader.loadTestsFromTestCase(TestBalances))
+    suite.addTests(loader.loadTestsFromTestCase(TestReports))
+    suite.addTests(loader.loadTestsFromTestCase(TestExport))
+    suite.addTests(loader.loadTestsFromTestCase(TestPdf))
+    suite.addTests(loader.loadTestsFromTestCase(TestLedgerApi))
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+    return 0 if result.wasSuccessful() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(run_tests())
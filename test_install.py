@@ -9,56 +9,81 @@ import sys
 import os
 import subprocess
 import io
+import json
+import shutil
+import socket
+import tempfile
+import textwrap
+import threading
+import http.server
+import time
+from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock, call
-import re
 
 # Add the current directory to the path so we can import install
 sys.path.insert(0, os.path.dirname(__file__))
 
 try:
     import install
+    import expo_log
+    import qr_terminal
 except ImportError as e:
     print(f"Error importing install module: {e}")
     sys.exit(1)
 
 
+# Stand-in for `npx expo start`; argv: mode [marker file]
+FAKE_EXPO = textwrap.dedent("""
+    import sys, time
+    mode = sys.argv[1]
+    print('Starting project at /app', flush=True)
+    print('Starting Metro Bundler', flush=True)
+    if mode == 'quiet':
+        time.sleep(60)
+    elif mode == 'ready':
+        time.sleep(0.1)
+        print('Metro waiting on exp://192.168.1.20:8081', flush=True)
+        # Keep logging after startup, like Metro does while bundling
+        for i in range(5000):
+            print(f'Android Bundled {i}ms index.js (1234 modules) ' + 'x' * 60, flush=True)
+        if len(sys.argv) > 2:
+            open(sys.argv[2], 'w').close()
+        time.sleep(60)
+""")
+
+
 class TestPortConflictPatterns(unittest.TestCase):
-    """Test regex patterns for detecting port conflicts."""
+    """Test the shared Expo log classifier (expo_log.py)."""
     
-    def setUp(self):
-        """Set up test patterns."""
-        self.port_conflict_pattern = re.compile(r"Port (\d+) is being used by another process")
-        self.port_suggestion_pattern = re.compile(r"Use port (\d+) instead\?")
-        self.input_required_pattern = re.compile(r"Input is required", re.IGNORECASE)
-        self.skipping_dev_server_pattern = re.compile(r"Skipping dev server", re.IGNORECASE)
+    def kinds(self, line):
+        return [event.kind for event in expo_log.classify(line)]
     
     def test_port_conflict_detection(self):
         """Test detection of port conflict messages."""
         test_cases = [
-            ("Port 8081 is being used by another process", "8081"),
-            ("Port 3000 is being used by another process", "3000"),
-            ("Port 8082 is being used by another process", "8082"),
+            ("Port 8081 is being used by another process", 8081),
+            ("Port 3000 is being used by another process", 3000),
+            ("Port 8082 is being used by another process", 8082),
+            ("Error: listen EADDRINUSE: address already in use :::8083", 8083),
         ]
         
         for line, expected_port in test_cases:
             with self.subTest(line=line):
-                match = self.port_conflict_pattern.search(line)
-                self.assertIsNotNone(match, f"Should match: {line}")
-                self.assertEqual(match.group(1), expected_port)
+                events = expo_log.classify(line)
+                self.assertEqual(events, (expo_log.ExpoEvent(expo_log.PORT_CONFLICT, port=expected_port),))
     
     def test_port_suggestion_detection(self):
         """Test detection of port suggestion messages."""
         test_cases = [
-            ("Use port 8082 instead?", "8082"),
-            ("Use port 3001 instead?", "3001"),
-            ("Use port 9000 instead?", "9000"),
+            ("Use port 8082 instead?", 8082),
+            ("› Use port 3001 instead? … yes", 3001),
+            ("Use port 9000 instead?", 9000),
         ]
         
         for line, expected_port in test_cases:
             with self.subTest(line=line):
-                match = self.port_suggestion_pattern.search(line)
-                self.assertIsNotNone(match, f"Should match: {line}")
-                self.assertEqual(match.group(1), expected_port)
+                events = expo_log.classify(line)
+                self.assertEqual(events, (expo_log.ExpoEvent(expo_log.SUGGESTED_PORT, port=expected_port),))
     
     def test_input_required_detection(self):
         """Test detection of input required messages."""
@@ -71,8 +96,7 @@ class TestPortConflictPatterns(unittest.TestCase):
         
         for line in test_cases:
             with self.subTest(line=line):
-                match = self.input_required_pattern.search(line)
-                self.assertIsNotNone(match, f"Should match: {line}")
+                self.assertEqual(self.kinds(line), [expo_log.INPUT_REQUIRED])
     
     def test_skipping_dev_server_detection(self):
         """Test detection of skipping dev server messages."""
@@ -85,8 +109,16 @@ class TestPortConflictPatterns(unittest.TestCase):
         
         for line in test_cases:
             with self.subTest(line=line):
-                match = self.skipping_dev_server_pattern.search(line)
-                self.assertIsNotNone(match, f"Should match: {line}")
+                self.assertEqual(self.kinds(line), [expo_log.SKIPPING_DEV_SERVER])
+    
+    def test_ready_line_with_url(self):
+        """Test that the Metro ready line yields both READY and the URL."""
+        events = expo_log.classify("› Metro waiting on exp://192.168.1.20:8081")
+        self.assertEqual(events, (
+            expo_log.ExpoEvent(expo_log.READY),
+            expo_log.ExpoEvent(expo_log.EXPO_URL, url="exp://192.168.1.20:8081"),
+        ))
+        self.assertEqual(install.find_expo_url_from_line("exp://10.0.0.5:19000 ready"), "exp://10.0.0.5:19000")
     
     def test_no_false_positives(self):
         """Test that normal Expo output doesn't match patterns."""
@@ -97,18 +129,57 @@ class TestPortConflictPatterns(unittest.TestCase):
             "QR code generated",
             "Using port 8081",  # Note: different from "Port X is being used"
             "Port configuration",
+            "Android Bundled 812ms index.js (1234 modules)",
         ]
         
         for line in normal_lines:
             with self.subTest(line=line):
-                self.assertIsNone(
-                    self.port_conflict_pattern.search(line),
-                    f"Should not match conflict pattern: {line}"
-                )
-                self.assertIsNone(
-                    self.port_suggestion_pattern.search(line),
-                    f"Should not match suggestion pattern: {line}"
-                )
+                self.assertEqual(expo_log.classify(line), ())
+
+
+class TestConflictHandling(unittest.TestCase):
+    """Test that start_expo_and_show_qr moves to the port Expo suggests."""
+    
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # Drawn QR codes go to a temp dir, not .install_cache/ in the repo
+        p = patch.object(install, "QR_CACHE_DIR", Path(tmp.name) / "qr")
+        p.start()
+        self.addCleanup(p.stop)
+    
+    def test_suggested_port_is_used_for_retry(self):
+        first = MagicMock()
+        first.stdout.readline.side_effect = [
+            "Port 8081 is being used by another process\n",
+            "› Use port 8085 instead?\n",
+            "Input is required, but Expo CLI is in non-interactive mode.\n",
+            "Skipping dev server\n",
+            "",
+        ]
+        second = MagicMock()
+        second.stdout.readline.side_effect = ["› Metro waiting on exp://192.168.1.20:8085\n", ""]
+        with patch.object(install, "popen", side_effect=[first, second]) as popen, \
+             patch.object(install, "echo"):
+            proc = install.start_expo_and_show_qr(interactive=False, preallocate=False)
+        self.assertIs(proc, second)
+        # The conflict line's own port (8081) must not be taken as the suggestion
+        self.assertEqual(popen.call_args_list[1].args[0][-1], "8085")
+    
+    def test_busy_port_is_skipped_before_spawning(self):
+        ready = MagicMock()
+        ready.stdout.readline.side_effect = ["› Metro waiting on exp://192.168.1.20:8082\n", ""]
+        with socket.socket() as busy:
+            busy.bind(("", 0))
+            busy.listen()
+            port = busy.getsockname()[1]
+            with patch.object(install, "popen", return_value=ready) as popen, \
+                 patch.object(install, "echo"):
+                proc = install.start_expo_and_show_qr(interactive=False, port=port)
+        self.assertIs(proc, ready)
+        # Expo is started once, on a port other than the busy one
+        self.assertEqual(popen.call_count, 1)
+        self.assertNotEqual(popen.call_args.args[0][-1], str(port))
 
 
 class TestInstallScript(unittest.TestCase):
@@ -218,6 +289,572 @@ class TestNodeJsChecks(unittest.TestCase):
         self.assertEqual(result.returncode, 0)
 
 
+class TestDependencyStamp(unittest.TestCase):
+    """Test the lockfile-hash stamp that lets repeat runs skip npm ci."""
+    
+    PACKAGE_JSON = {"dependencies": {"expo": "~54.0.22", "@react-navigation/native": "^7"},
+                    "devDependencies": {"typescript": "~5.9.2"}}
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "package.json").write_text(json.dumps(self.PACKAGE_JSON))
+        (self.root / "package-lock.json").write_text('{"lockfileVersion": 3}')
+        self.versions = {"node": "v20.10.0", "npm": "10.2.3"}
+        patches = [
+            patch.object(install, "ROOT", self.root),
+            patch.object(install, "tool_version", side_effect=lambda prog: self.versions.get(prog)),
+            patch.object(install, "check_program", return_value=True),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.npm_runs = []
+        run_patch = patch.object(install, "run", side_effect=self.fake_npm)
+        run_patch.start()
+        self.addCleanup(run_patch.stop)
+        self.addCleanup(self.tmp.cleanup)
+    
+    def fake_npm(self, cmd, **kwargs):
+        """Pretend to be npm ci: populate node_modules"""
+        self.npm_runs.append(cmd)
+        for section in self.PACKAGE_JSON.values():
+            for name in section:
+                pkg = self.root / "node_modules" / name
+                pkg.mkdir(parents=True, exist_ok=True)
+                (pkg / "package.json").write_text("{}")
+        return 0, ""
+    
+    def test_hash_covers_lockfile_and_tool_versions(self):
+        first = install.dependency_hash()
+        self.assertEqual(first, install.dependency_hash())
+        (self.root / "package-lock.json").write_text('{"lockfileVersion": 3, "x": 1}')
+        second = install.dependency_hash()
+        self.assertNotEqual(first, second)
+        self.versions["node"] = "v22.0.0"
+        self.assertNotEqual(second, install.dependency_hash())
+    
+    def test_second_install_is_skipped(self):
+        self.assertTrue(install.install_node_dependencies())
+        self.assertEqual(self.npm_runs, [["npm", "ci"]])
+        self.assertEqual(install.read_deps_stamp()["installer"], "npm ci")
+        
+        self.assertTrue(install.install_node_dependencies())
+        self.assertEqual(len(self.npm_runs), 1)
+        
+        self.assertTrue(install.install_node_dependencies(force=True))
+        self.assertEqual(len(self.npm_runs), 2)
+    
+    def test_changed_lockfile_or_missing_package_reinstalls(self):
+        install.install_node_dependencies()
+        (self.root / "package-lock.json").write_text('{"lockfileVersion": 3, "x": 1}')
+        install.install_node_dependencies()
+        self.assertEqual(len(self.npm_runs), 2)
+        
+        # A wiped dependency makes node_modules incomplete
+        for child in (self.root / "node_modules" / "typescript").iterdir():
+            child.unlink()
+        self.assertFalse(install.node_modules_intact())
+        install.install_node_dependencies()
+        self.assertEqual(len(self.npm_runs), 3)
+    
+    def test_tarball_cache_restores_node_modules(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            install.install_node_dependencies(cache_dir=Path(cache_dir))
+            self.assertEqual(len(list(Path(cache_dir).glob("node_modules-*.tar"))), 1)
+            
+            # Fresh checkout: no node_modules at all
+            shutil.rmtree(self.root / "node_modules")
+            self.assertTrue(install.install_node_dependencies(cache_dir=Path(cache_dir)))
+            self.assertEqual(len(self.npm_runs), 1)
+            self.assertTrue(install.node_modules_intact())
+            self.assertEqual(install.read_deps_stamp()["installer"], "cache")
+            self.assertEqual([p.name for p in self.root.iterdir() if p.name.startswith(".node_modules-")], [])
+
+
+class TestEnvironmentProbes(unittest.TestCase):
+    """Test that toolchain probes run in parallel with per-probe timeouts."""
+    
+    def slow(self, value, delay=0.3):
+        def probe(*args, **kwargs):
+            time.sleep(delay)
+            return value
+        return probe
+    
+    def test_probes_run_concurrently(self):
+        versions = {"node": "v20.10.0", "npm": "10.2.3"}
+        
+        def tool_version(prog, timeout=None):
+            time.sleep(0.3)
+            return versions[prog]
+        
+        with patch.object(install, "tool_version", side_effect=tool_version), \
+             patch.object(install, "expo_whoami", side_effect=self.slow("tester")), \
+             patch.object(install, "find_backend", side_effect=self.slow(None)):
+            started = time.monotonic()
+            report = install.probe_environment()
+            elapsed = time.monotonic() - started
+        
+        self.assertEqual(report["node"], "v20.10.0")
+        self.assertEqual(report["npm"], "10.2.3")
+        self.assertEqual(report["expo_user"], "tester")
+        self.assertIsNone(report["backend"])
+        self.assertEqual(report["timed_out"], [])
+        # Four 0.3 s probes: roughly the slowest one, not the 1.2 s sum
+        self.assertLess(elapsed, 0.9)
+        self.assertGreaterEqual(sum(report["timings"].values()), 1.1)
+    
+    def test_slow_probe_times_out_without_blocking_others(self):
+        with patch.object(install, "tool_version", return_value="v20.10.0"), \
+             patch.object(install, "expo_whoami", side_effect=self.slow("tester", delay=2.0)):
+            started = time.monotonic()
+            report = install.probe_environment(("node", "expo_user"), timeouts={"expo_user": 0.2})
+            elapsed = time.monotonic() - started
+        
+        self.assertEqual(report["node"], "v20.10.0")
+        self.assertIsNone(report["expo_user"])
+        self.assertEqual(report["timed_out"], ["expo_user"])
+        # The probe ignored its own limit; the 1 s backstop still applies
+        self.assertLess(elapsed, 1.8)
+    
+    def test_run_timeout_kills_command(self):
+        started = time.monotonic()
+        code, out = install.run([sys.executable, "-c", "import time; time.sleep(10)"],
+                                capture=True, quiet=True, timeout=0.3)
+        self.assertEqual(code, install.TIMEOUT_EXIT_CODE)
+        self.assertLess(time.monotonic() - started, 5)
+    
+    def test_find_backend(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            self.assertIsNone(install.find_backend(root))
+            (root / "server").mkdir()
+            (root / "server" / "app.js").write_text("")
+            backend = install.find_backend(root)
+            self.assertEqual(backend["dir"], "server")
+            self.assertEqual(backend["cmd"][0], "node")
+            self.assertEqual(backend["cwd"], root / "server")
+    
+    def test_find_python_backend(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "backend").mkdir()
+            (root / "backend" / "__main__.py").write_text("")
+            backend = install.find_backend(root)
+            self.assertEqual(backend["cmd"], [sys.executable, "-m", "backend"])
+            self.assertEqual(backend["cwd"], root)
+        # The repository ships the ledger API as such a package
+        self.assertEqual(install.find_backend(Path(__file__).parent)["cmd"][-1], "backend")
+
+
+class TestProbeCache(unittest.TestCase):
+    """Test the on-disk cache of which/version/whoami probe results."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        tmp = Path(self.tmp.name)
+        self.bin_dir = tmp / "bin"
+        self.bin_dir.mkdir()
+        for prog in ("node", "npx"):
+            exe = self.bin_dir / prog
+            exe.write_text("#!/bin/sh\n")
+            exe.chmod(0o755)
+        self.state_file = tmp / "expo" / "state.json"
+        self.cache_file = tmp / "cache" / "probes.json"
+        self.outputs = {"node": (0, "v20.10.0\n"), "npx": (0, "tester\n")}
+        self.calls = []
+        
+        def fake_run(cmd, **kwargs):
+            self.calls.append(cmd[0])
+            return self.outputs[cmd[0]]
+        
+        patches = [
+            patch.dict(os.environ, {"PATH": str(self.bin_dir), "EXPO_HOME": str(self.state_file.parent)}),
+            patch.object(install, "PROBE_CACHE", install.ProbeCache(self.cache_file)),
+            patch.object(install, "run", side_effect=fake_run),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+    
+    def fresh_process(self, refresh=False):
+        """Simulate the next installer run reading the same cache file"""
+        install.PROBE_CACHE = install.ProbeCache(self.cache_file, refresh=refresh)
+    
+    def test_version_is_reused_across_runs(self):
+        self.assertEqual(install.tool_version("node"), "v20.10.0")
+        self.fresh_process()
+        self.assertEqual(install.tool_version("node"), "v20.10.0")
+        self.assertEqual(self.calls, ["node"])
+        self.assertTrue(self.cache_file.exists())
+    
+    def test_changed_executable_or_path_invalidates(self):
+        install.tool_version("node")
+        exe = self.bin_dir / "node"
+        os.utime(exe, ns=(exe.stat().st_atime_ns, exe.stat().st_mtime_ns + 10**9))
+        self.fresh_process()
+        install.tool_version("node")
+        self.assertEqual(self.calls, ["node", "node"])
+        
+        with patch.dict(os.environ, {"PATH": ""}):
+            self.assertFalse(install.check_program("node"))
+            self.assertIsNone(install.tool_version("node"))
+    
+    def test_ttl_and_refresh(self):
+        install.tool_version("node")
+        with patch.object(install, "PROGRAM_TTL", -1):
+            install.tool_version("node")
+        self.assertEqual(len(self.calls), 2)
+        
+        self.fresh_process(refresh=True)
+        install.tool_version("node")
+        self.assertEqual(len(self.calls), 3)
+    
+    def test_missing_program_is_found_once_installed(self):
+        self.assertFalse(install.check_program("npm"))
+        self.fresh_process()
+        npm = self.bin_dir / "npm"
+        npm.write_text("#!/bin/sh\n")
+        npm.chmod(0o755)
+        self.assertTrue(install.check_program("npm"))
+    
+    def test_failures_are_not_cached(self):
+        self.outputs["node"] = (install.TIMEOUT_EXIT_CODE, None)
+        self.assertIsNone(install.tool_version("node"))
+        self.outputs["node"] = (0, "v20.10.0\n")
+        self.assertEqual(install.tool_version("node"), "v20.10.0")
+    
+    def test_whoami_follows_login_state(self):
+        self.outputs["npx"] = (1, "Not logged in\n")
+        self.assertIsNone(install.expo_whoami())
+        self.assertIsNone(install.expo_whoami())
+        self.assertEqual(self.calls, ["npx"])
+        
+        # `expo login` rewrites state.json
+        self.state_file.parent.mkdir()
+        self.state_file.write_text("{}")
+        self.outputs["npx"] = (0, "tester\n")
+        self.assertEqual(install.expo_whoami(), "tester")
+        self.assertEqual(self.calls, ["npx", "npx"])
+    
+    def test_corrupt_cache_file_is_ignored(self):
+        self.cache_file.parent.mkdir()
+        self.cache_file.write_text("{not json")
+        self.fresh_process()
+        self.assertEqual(install.tool_version("node"), "v20.10.0")
+
+
+class TestExpoOutputReader(unittest.TestCase):
+    """Test that Expo output is read off-thread with a working timeout."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.script = Path(self.tmp.name) / "fake_expo.py"
+        self.script.write_text(FAKE_EXPO)
+        self.marker = Path(self.tmp.name) / "drained"
+        self.processes = []
+        self.output = []
+        for p in [patch.object(install, "echo", side_effect=self.output.append),
+                  patch.object(install, "QR_CACHE_DIR", Path(self.tmp.name) / "qr")]:
+            p.start()
+            self.addCleanup(p.stop)
+    
+    def tearDown(self):
+        for process in self.processes:
+            process.kill()
+            process.wait()
+            process.stdout.close()
+    
+    def fake_popen(self, mode):
+        def popen(cmd, **kwargs):
+            process = subprocess.Popen(
+                [sys.executable, str(self.script), mode, str(self.marker)],
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+            )
+            self.processes.append(process)
+            return process
+        return popen
+    
+    def test_silent_metro_hits_timeout(self):
+        with patch.object(install, "popen", side_effect=self.fake_popen("quiet")), \
+             patch.object(install, "EXPO_START_TIMEOUT", 0.5):
+            started = time.monotonic()
+            proc = install.start_expo_and_show_qr(interactive=False)
+            elapsed = time.monotonic() - started
+        self.assertIs(proc, self.processes[0])
+        self.assertLess(elapsed, 5)
+        self.assertTrue(any("valmiutta" in line for line in self.output))
+    
+    def test_output_is_drained_after_startup(self):
+        with patch.object(install, "popen", side_effect=self.fake_popen("ready")):
+            proc = install.start_expo_and_show_qr(interactive=False)
+        self.assertIs(proc, self.processes[0])
+        self.assertTrue(any("exp://192.168.1.20:8081" in line for line in self.output))
+        # Nobody reads proc.stdout any more; without the reader thread the
+        # pipe would fill and the fake Metro would never finish logging
+        deadline = time.monotonic() + 10
+        while not self.marker.exists():
+            self.assertLess(time.monotonic(), deadline, "Expo output was not drained")
+            time.sleep(0.05)
+
+
+# Stand-in for a backend; argv: port delay [ignore-sigterm]
+FAKE_BACKEND = textwrap.dedent("""
+    import signal, socket, sys, time
+    port, delay = int(sys.argv[1]), float(sys.argv[2])
+    if len(sys.argv) > 3:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    print('booting', flush=True)
+    time.sleep(delay)
+    server = socket.socket()
+    server.bind(('127.0.0.1', port))
+    server.listen()
+    print(f'listening on {port}', flush=True)
+    time.sleep(60)
+""")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestProcessSupervisor(unittest.TestCase):
+    """Test concurrent startup, health gates and bounded teardown."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.script = Path(self.tmp.name) / "fake_backend.py"
+        self.script.write_text(FAKE_BACKEND)
+        self.output = []
+        p = patch.object(install, "echo", side_effect=self.output.append)
+        p.start()
+        self.addCleanup(p.stop)
+        self.supervisor = install.ProcessSupervisor()
+        self.addCleanup(self.supervisor.shutdown, timeout=0.5)
+    
+    def start(self, name, port, delay=0.0, *extra):
+        cmd = [sys.executable, str(self.script), str(port), str(delay), *extra]
+        return self.supervisor.start(name, cmd, port=port)
+    
+    def test_ready_when_port_answers(self):
+        port = free_port()
+        started = time.monotonic()
+        self.start("backend", port, 0.3)
+        # start() does not wait for the backend
+        self.assertLess(time.monotonic() - started, 0.3)
+        self.assertTrue(self.supervisor.wait_ready("backend", timeout=10))
+        self.assertTrue(any(line == f"[backend] listening on {port}" for line in self.output))
+    
+    def test_processes_start_concurrently(self):
+        ports = [free_port(), free_port()]
+        started = time.monotonic()
+        for index, port in enumerate(ports):
+            self.start(f"p{index}", port, 0.5)
+        for index in range(2):
+            self.assertTrue(self.supervisor.wait_ready(f"p{index}", timeout=10))
+        self.assertLess(time.monotonic() - started, 0.95)
+        self.assertTrue(any(line.startswith("[p0] ") for line in self.output))
+        self.assertTrue(any(line.startswith("[p1] ") for line in self.output))
+    
+    def test_not_ready_when_process_exits(self):
+        proc = self.supervisor.start("backend", [sys.executable, "-c", "pass"], port=free_port())
+        self.assertFalse(self.supervisor.wait_ready("backend", timeout=10))
+        self.assertEqual(self.supervisor.wait(), ("backend", 0))
+        self.assertEqual(proc.returncode, 0)
+    
+    def test_shutdown_is_parallel_and_bounded(self):
+        procs = [self.start(f"p{index}", free_port(), 0.0, "ignore") for index in range(2)]
+        for index in range(2):
+            self.assertTrue(self.supervisor.wait_ready(f"p{index}", timeout=10))
+        started = time.monotonic()
+        self.supervisor.shutdown(timeout=0.5)
+        # Both ignore SIGTERM; they share one deadline and are then killed
+        self.assertLess(time.monotonic() - started, 2.0)
+        for proc in procs:
+            self.assertIsNotNone(proc.returncode)
+    
+    def test_stop_process_kills_after_timeout(self):
+        proc = self.start("backend", free_port(), 0.0, "ignore")
+        self.assertTrue(self.supervisor.wait_ready("backend", timeout=10))
+        started = time.monotonic()
+        # SIGTERM is ignored; the wait is bounded and the process is killed
+        self.assertFalse(install.stop_process(proc, timeout=0.5))
+        self.assertLess(time.monotonic() - started, 2.0)
+        self.assertIsNotNone(proc.returncode)
+    
+    def test_backend_start_does_not_sleep(self):
+        port = free_port()
+        backend = {"dir": "backend", "port": port, "cwd": None,
+                   "cmd": [sys.executable, str(self.script), str(port), "0.2"]}
+        started = time.monotonic()
+        proc = install.start_backend_if_found({"backend": backend}, self.supervisor)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertIsNotNone(proc)
+        # The log names the working directory, not the backend directory
+        self.assertTrue(any(f"(hakemistossa {Path.cwd()}," in line for line in self.output))
+        self.assertTrue(self.supervisor.wait_ready("backend", timeout=10))
+
+
+class TestBundleWarmup(unittest.TestCase):
+    """Test the parallel Metro bundle warm-up behind --warm."""
+    
+    def setUp(self):
+        requests = self.requests = []
+        
+        class FakeMetro(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                requests.append(self.path)
+                time.sleep(0.3)  # a cold bundle takes a while
+                if "platform=web" in self.path:
+                    self.send_error(500)
+                    return
+                body = b"x" * 200000
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FakeMetro)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+    
+    def test_platforms_are_fetched_in_parallel(self):
+        port = self.server.server_address[1]
+        started = time.monotonic()
+        results = install.warm_metro_bundles(port, entry="/index.bundle")
+        elapsed = time.monotonic() - started
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(results["ios"]["bytes"], 200000)
+        self.assertEqual(results["android"]["status"], 200)
+        self.assertIn("error", results["web"])
+        self.assertEqual(len(self.requests), 3)
+        self.assertTrue(all(path.startswith("/index.bundle?platform=") for path in self.requests))
+    
+    def test_entry_path_from_package_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "package.json").write_text(json.dumps({"main": "expo-router/entry"}))
+            self.assertEqual(install.metro_entry_path(root), "/node_modules/expo-router/entry.bundle")
+            (root / "index.js").write_text("")
+            (root / "package.json").write_text(json.dumps({"main": "./index.js"}))
+            self.assertEqual(install.metro_entry_path(root), "/index.bundle")
+
+
+class TestDeferredImports(unittest.TestCase):
+    """Test that rarely used modules load lazily."""
+    
+    def test_import_defers_optional_modules(self):
+        code = ("import sys, install; "
+                "print(','.join(m for m in ('tarfile', 'urllib.request') "
+                "if m in sys.modules))")
+        result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "")
+    
+
+
+def read_qr(modules):
+    """Minimal QR reader for the tests: returns (mask, payload bytes)"""
+    size = len(modules)
+    version = (size - 17) // 4
+    # Second format copy: bits 0-7 along row 8 from the right, 8-14 down column 8
+    bits = 0
+    for i in range(8):
+        bits |= modules[8][size - 1 - i] << i
+    for i in range(8, 15):
+        bits |= modules[size - 15 + i][8] << i
+    mask = next(m for m in range(8) if qr_terminal._bch_format(m) == bits)
+    function = qr_terminal._Symbol(version).function
+    masked = [[modules[y][x] != (not function[y][x] and qr_terminal._mask_bit(mask, x, y))
+               for x in range(size)] for y in range(size)]
+    stream = []
+    for right in range(size - 1, 0, -2):
+        if right <= 6:
+            right -= 1
+        upward = (right + 1) & 2 == 0
+        for vert in range(size):
+            y = size - 1 - vert if upward else vert
+            for x in (right, right - 1):
+                if not function[y][x]:
+                    stream.append(masked[y][x])
+    codewords = [int("".join("1" if b else "0" for b in stream[i:i + 8]), 2)
+                 for i in range(0, len(stream) - 7, 8)]
+    ec_length, groups = qr_terminal.EC_BLOCKS_M[version]
+    lengths = [length for count, length in groups for _ in range(count)]
+    blocks = [[] for _ in lengths]
+    position = 0
+    for i in range(max(lengths)):
+        for block, length in zip(blocks, lengths):
+            if i < length:
+                block.append(codewords[position])
+                position += 1
+    ec_blocks = [[] for _ in lengths]
+    for i in range(ec_length):
+        for block in ec_blocks:
+            block.append(codewords[position])
+            position += 1
+    for block, ec in zip(blocks, ec_blocks):
+        assert qr_terminal.rs_remainder(block, ec_length) == ec, "EC codewords do not match"
+    data = [word for block in blocks for word in block]
+    assert data[0] >> 4 == 0b0100, "not byte mode"
+    count_bits = 8 if version <= 9 else 16
+    bitstring = "".join(format(word, "08b") for word in data)[4:]
+    length = int(bitstring[:count_bits], 2)
+    payload = bitstring[count_bits:count_bits + 8 * length]
+    return mask, bytes(int(payload[i:i + 8], 2) for i in range(0, len(payload), 8))
+
+
+class TestNativeQr(unittest.TestCase):
+    """Test the dependency-free QR encoder and its on-disk cache."""
+    
+    def test_reed_solomon_reference_vector(self):
+        # HELLO WORLD, version 1-M (ISO/IEC 18004 annex I)
+        data = [32, 91, 11, 120, 209, 114, 220, 77, 67, 64, 236, 17, 236, 17, 236, 17]
+        self.assertEqual(qr_terminal.rs_remainder(data, 10),
+                         [196, 35, 39, 119, 235, 215, 231, 226, 93, 23])
+    
+    def test_format_and_version_bits(self):
+        self.assertEqual(qr_terminal._bch_format(0), 0b101010000010010)
+        self.assertEqual(qr_terminal._bch_format(7), 0b100101010100000)
+        self.assertEqual(qr_terminal._bch_version(7), 0x07C94)
+    
+    def test_round_trip(self):
+        for text in ["exp://192.168.1.20:8081", "exp://10.0.0.5:19000",
+                     "exp://u.expo.dev/" + "a" * 60, "x" * 200]:
+            with self.subTest(length=len(text)):
+                modules = qr_terminal.encode(text)
+                _, payload = read_qr(modules)
+                self.assertEqual(payload, text.encode())
+    
+    def test_too_long(self):
+        with self.assertRaises(ValueError):
+            qr_terminal.encode("x" * 300)
+    
+    def test_render_uses_half_blocks(self):
+        modules = qr_terminal.encode("exp://192.168.1.20:8081")
+        text = qr_terminal.render(modules, quiet_zone=2)
+        lines = text.splitlines()
+        self.assertEqual(len(lines), (len(modules) + 4 + 1) // 2)
+        self.assertTrue(all(len(line) == len(modules) + 4 for line in lines))
+        self.assertEqual(set(lines[0]), {"█"})
+    
+    def test_rendered_code_is_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = qr_terminal.terminal_qr("exp://192.168.1.20:8081", Path(tmp))
+            with patch.object(qr_terminal, "encode", side_effect=AssertionError("not cached")):
+                self.assertEqual(qr_terminal.terminal_qr("exp://192.168.1.20:8081", Path(tmp)), first)
+            self.assertEqual(len(list(Path(tmp).iterdir())), 1)
+
+
 class TestExitCodes(unittest.TestCase):
     """Test script exit codes."""
     
@@ -264,8 +901,17 @@ def run_tests():
     
     # Add all test classes
     suite.addTests(loader.loadTestsFromTestCase(TestPortConflictPatterns))
+    suite.addTests(loader.loadTestsFromTestCase(TestConflictHandling))
     suite.addTests(loader.loadTestsFromTestCase(TestInstallScript))
     suite.addTests(loader.loadTestsFromTestCase(TestNodeJsChecks))
+    suite.addTests(loader.loadTestsFromTestCase(TestDependencyStamp))
+    suite.addTests(loader.loadTestsFromTestCase(TestEnvironmentProbes))
+    suite.addTests(loader.loadTestsFromTestCase(TestProbeCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestExpoOutputReader))
+    suite.addTests(loader.loadTestsFromTestCase(TestProcessSupervisor))
+    suite.addTests(loader.loadTestsFromTestCase(TestBundleWarmup))
+    suite.addTests(loader.loadTestsFromTestCase(TestDeferredImports))
+    suite.addTests(loader.loadTestsFromTestCase(TestNativeQr))
     suite.addTests(loader.loadTestsFromTestCase(TestExitCodes))
     suite.addTests(loader.loadTestsFromTestCase(TestScriptSyntax))
     
@@ -5,8 +5,44 @@ Test script for the web launcher
 
 import sys
 import os
+import subprocess
+import tempfile
+import textwrap
+import unittest
 from pathlib import Path
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from worker_pool import workers_supported
+
+# Stand-in for the ngrok binary: prints a few log lines like the real one,
+# then stays alive until terminated.
+FAKE_NGROK = textwrap.dedent("""
+    import sys, time
+    mode = sys.argv[1]
+    print('t=2024-01-01T00:00:00+0000 lvl=info msg="no configuration paths supplied"', flush=True)
+    if mode == 'logfmt':
+        time.sleep(0.1)
+        print('t=2024-01-01T00:00:01+0000 lvl=info msg="started tunnel" obj=tunnels '
+              'name=command_line addr=http://localhost:8000 url=https://fake-logfmt.ngrok.app', flush=True)
+    elif mode == 'json':
+        time.sleep(0.1)
+        print('{"addr":"http://localhost:8000","lvl":"info","msg":"started tunnel",'
+              '"name":"command_line","obj":"tunnels","url":"https://fake-json.ngrok.app"}', flush=True)
+    elif mode == 'auth':
+        print('{"err":"authentication failed: Usage of ngrok requires a verified account and authtoken.",'
+              '"lvl":"crit","msg":"command failed"}', flush=True)
+        sys.exit(1)
+    elif mode == 'exit':
+        sys.exit(0)
+    # Keep logging after the tunnel is up, like ngrok does for requests
+    for i in range(2000):
+        print(f'lvl=info msg="join connections" obj=join id={i}', flush=True)
+    if len(sys.argv) > 2:
+        open(sys.argv[2], 'w').close()
+    time.sleep(60)
+""")
+
 def test_imports():
     """Test that the launcher script can be imported"""
     try:
@@ -96,6 +132,221 @@ def test_json_urllib_imports():
         print(f"✗ Required modules not available: {e}")
         return False
 
+class TestNgrokLogWatcher(unittest.TestCase):
+    """Tunnel readiness from ngrok's log, using a fake ngrok script"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.script = Path(self.tmp.name) / 'fake_ngrok.py'
+        self.script.write_text(FAKE_NGROK)
+        self.processes = []
+    
+    def tearDown(self):
+        for process in self.processes:
+            process.kill()
+            process.wait()
+            process.stdout.close()
+        self.tmp.cleanup()
+    
+    def start(self, mode, *extra):
+        from launch_web_server import start_ngrok_tunnel
+        cmd = [sys.executable, str(self.script), mode, *extra]
+        process, watcher = start_ngrok_tunnel(8000, ngrok_cmd=cmd)
+        self.processes.append(process)
+        return process, watcher
+    
+    def test_parse_logfmt_and_json(self):
+        from launch_web_server import parse_ngrok_log_line
+        record = parse_ngrok_log_line('lvl=info msg="started tunnel" url=https://a.ngrok.app note="say \\"hi\\""')
+        self.assertEqual(record['msg'], 'started tunnel')
+        self.assertEqual(record['url'], 'https://a.ngrok.app')
+        self.assertEqual(record['note'], 'say "hi"')
+        self.assertEqual(parse_ngrok_log_line('{"msg": "started tunnel"}'), {'msg': 'started tunnel'})
+        self.assertEqual(parse_ngrok_log_line('{broken'), {})
+        self.assertEqual(parse_ngrok_log_line(''), {})
+    
+    def test_url_from_logfmt_log(self):
+        process, watcher = self.start('logfmt')
+        self.assertEqual(watcher.wait_for_url(timeout=10), 'https://fake-logfmt.ngrok.app')
+    
+    def test_url_from_json_log_and_pipe_keeps_draining(self):
+        import time
+        marker = Path(self.tmp.name) / 'drained'
+        process, watcher = self.start('json', str(marker))
+        self.assertEqual(watcher.wait_for_url(timeout=10), 'https://fake-json.ngrok.app')
+        # The fake writes more than a pipe buffer holds after the tunnel is
+        # up; it only gets past that if the watcher keeps reading.
+        deadline = time.monotonic() + 10
+        while not marker.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(marker.exists())
+    
+    def test_auth_error_is_reported(self):
+        process, watcher = self.start('auth')
+        self.assertIsNone(watcher.wait_for_url(timeout=10))
+        self.assertIn('authtoken', watcher.error)
+    
+    def test_exit_without_tunnel_stops_waiting(self):
+        process, watcher = self.start('exit')
+        self.assertIsNone(watcher.wait_for_url(timeout=10))
+        self.assertIsNone(watcher.error)
+
+class TestPortReadiness(unittest.TestCase):
+    """Port probing and the launcher's start-up readiness check"""
+    
+    def listener(self):
+        import socket
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        sock.listen()
+        self.addCleanup(sock.close)
+        return sock, sock.getsockname()[1]
+    
+    def test_busy_port_is_detected(self):
+        from port_probe import is_port_free, find_free_port
+        sock, port = self.listener()
+        self.assertFalse(is_port_free(port, '127.0.0.1'))
+        free = find_free_port(port, host='127.0.0.1')
+        self.assertIsNotNone(free)
+        self.assertGreater(free, port)
+    
+    def test_wait_for_listening_port_is_fast(self):
+        from port_probe import wait_for_port
+        sock, port = self.listener()
+        self.assertLess(wait_for_port(port, timeout=5), 1.0)
+    
+    def test_wait_for_port_that_opens_later(self):
+        import socket
+        import threading
+        from port_probe import find_free_port, wait_for_port
+        port = find_free_port(20000, attempts=1000, host='127.0.0.1')
+        sock = socket.socket()
+        self.addCleanup(sock.close)
+        
+        def listen_later():
+            sock.bind(('127.0.0.1', port))
+            sock.listen()
+        
+        timer = threading.Timer(0.2, listen_later)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        elapsed = wait_for_port(port, timeout=5)
+        self.assertGreaterEqual(elapsed, 0.15)
+        self.assertLess(elapsed, 2.0)
+    
+    def test_dead_server_fails_fast(self):
+        import time
+        from port_probe import find_free_port, wait_for_port
+        port = find_free_port(20000, attempts=1000, host='127.0.0.1')
+        started = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            wait_for_port(port, timeout=30, alive=lambda: False)
+        self.assertLess(time.monotonic() - started, 1.0)
+    
+    def test_launcher_moves_to_next_free_port(self):
+        import io
+        import contextlib
+        from launch_web_server import start_ready_server
+        sock, port = self.listener()
+        with tempfile.TemporaryDirectory() as web_dir:
+            Path(web_dir, 'index.html').write_text('<html></html>')
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                started = start_ready_server(web_dir, port, 'threaded', quiet=True)
+            self.assertIsNotNone(started)
+            server, thread, used_port = started
+            server.shutdown()
+            server.server_close()
+        self.assertNotEqual(used_port, port)
+        self.assertIn('Server ready in', out.getvalue())
+
+@unittest.skipUnless(workers_supported(), "needs SO_REUSEPORT")
+class TestWorkerMode(unittest.TestCase):
+    """--workers: several processes sharing one port"""
+    
+    def test_workers_serve_restart_and_stop(self):
+        import http.client
+        import os
+        import re
+        import signal
+        import time
+        import worker_pool
+        from port_probe import find_free_port
+        from static_server import create_server
+        
+        web_dir = Path(__file__).parent / 'web'
+        port = find_free_port(21000, attempts=1000, host='127.0.0.1')
+        supervisor = create_server(web_dir, port, host='127.0.0.1', quiet=True, workers=2)
+        self.assertIsInstance(supervisor, worker_pool.WorkerSupervisor)
+        thread = supervisor.start_background()
+        try:
+            self.assertEqual(len(set(supervisor.pids)), 2)
+            for _ in range(4):
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+                conn.request('GET', '/manifest.json')
+                self.assertEqual(conn.getresponse().status, 200)
+                conn.close()
+            
+            # Each worker labels its metrics with its PID
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/__metrics')
+            text = conn.getresponse().read().decode()
+            conn.close()
+            labels = set(re.findall(r'worker="(\d+)"', text))
+            self.assertEqual(len(labels), 1)
+            self.assertIn(int(labels.pop()), supervisor.pids)
+            
+            # A crashed worker is replaced
+            victim = supervisor.pids[0]
+            os.kill(victim, signal.SIGKILL)
+            deadline = time.monotonic() + 10
+            while supervisor.restarts == 0 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(supervisor.restarts, 1)
+            self.assertNotIn(victim, supervisor.pids)
+        finally:
+            processes = list(supervisor._processes)
+            supervisor.shutdown()
+            supervisor.server_close()
+            thread.join(timeout=5)
+        self.assertFalse(any(process.is_alive() for process in processes))
+    
+    def test_bind_error_is_reported(self):
+        import socket
+        from static_server import create_server
+        busy = socket.socket()
+        busy.bind(('127.0.0.1', 0))
+        busy.listen()
+        self.addCleanup(busy.close)
+        with self.assertRaises(OSError):
+            create_server(Path(__file__).parent / 'web', busy.getsockname()[1],
+                          host='127.0.0.1', quiet=True, workers=2)
+
+class TestLazyImports(unittest.TestCase):
+    """Optional modules stay unloaded until their code path runs"""
+    
+    def test_launcher_import_defers_optional_modules(self):
+        code = ("import sys, launch_web_server; "
+                "print(','.join(m for m in ('webbrowser', 'urllib.request', 'asyncio', 'multiprocessing') "
+                "if m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).parent,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+class TestExportOptions(unittest.TestCase):
+    """Statement exports stay local unless --public-exports is given"""
+    
+    def parse(self, *argv):
+        from unittest import mock
+        from launch_web_server import parse_arguments
+        with mock.patch.object(sys, 'argv', ['launch_web_server.py', *argv]):
+            return parse_arguments()
+    
+    def test_ledger_db_alone_is_not_public(self):
+        args = self.parse('--ledger-db', 'backend/data/ledger.sqlite3')
+        self.assertEqual(args.ledger_db, 'backend/data/ledger.sqlite3')
+        self.assertFalse(args.public_exports)
+        self.assertTrue(self.parse('--ledger-db', 'x.sqlite3', '--public-exports').public_exports)
+
 def main():
     """Run all tests"""
     print("="*60)
@@ -119,6 +370,18 @@ def main():
         results.append(result)
         print()
     
+    # Unit test classes
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    suite.addTests(loader.loadTestsFromTestCase(TestNgrokLogWatcher))
+    suite.addTests(loader.loadTestsFromTestCase(TestPortReadiness))
+    suite.addTests(loader.loadTestsFromTestCase(TestWorkerMode))
+    suite.addTests(loader.loadTestsFromTestCase(TestLazyImports))
+    suite.addTests(loader.loadTestsFromTestCase(TestExportOptions))
+    outcome = unittest.TextTestRunner(verbosity=2).run(suite)
+    results.append(outcome.wasSuccessful())
+    print()
+    
     print("="*60)
     passed = sum(results)
     total = len(results)
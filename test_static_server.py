@@ -0,0 +1,796 @@
+#!/usr/bin/env python3
+"""
+Unit tests for static_server.py
+Runs both serving engines against a temporary web directory.
+"""
+
+import unittest
+import unittest.mock
+import sys
+import os
+import socket
+import tempfile
+import time
+import gzip
+import http.client
+import json
+import threading
+import zipfile
+import io
+from pathlib import Path
+
+# Add the current directory to the path so we can import static_server
+sys.path.insert(0, os.path.dirname(__file__))
+
+import static_server
+import asset_cache
+import server_metrics
+
+
+INDEX_HTML = b"<!DOCTYPE html><html><body>" + b"<p>MobileBanks</p>" * 100 + b"</body></html>"
+SW_JS = b"self.addEventListener('fetch', () => {});"
+# Larger than MAX_CACHED_SIZE, so it is served from disk with sendfile()
+STATEMENT_PDF = b"%PDF-1.4\n" + bytes(range(256)) * (asset_cache.MAX_CACHED_SIZE // 256 + 64)
+
+
+class EngineTestMixin:
+    """Shared tests; subclasses set ENGINE."""
+
+    ENGINE = None
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.web_dir = Path(self.tmp.name)
+        (self.web_dir / 'index.html').write_bytes(INDEX_HTML)
+        (self.web_dir / 'sw.js').write_bytes(SW_JS)
+        (self.web_dir / 'icons').mkdir()
+        (self.web_dir / 'icons' / 'logo.svg').write_bytes(b'<svg/>')
+        (self.web_dir / 'statement.pdf').write_bytes(STATEMENT_PDF)
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.access_log = Path(self.log_dir.name) / 'logs' / 'access.jsonl'
+
+        self.server = static_server.create_server(
+            self.web_dir, port=0, engine=self.ENGINE, host='127.0.0.1', quiet=True,
+            access_log=self.access_log
+        )
+        self.port = self.server.server_address[1]
+        self.thread = self.server.start_background()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(timeout=5)
+        self.tmp.cleanup()
+        self.log_dir.cleanup()
+
+    def connect(self):
+        return http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+
+    def test_serves_index_for_root(self):
+        conn = self.connect()
+        conn.request('GET', '/?screen=payment')
+        response = conn.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.read(), INDEX_HTML)
+        self.assertTrue(response.getheader('Content-Type').startswith('text/html'))
+        conn.close()
+
+    def test_keep_alive_reuses_connection(self):
+        conn = self.connect()
+        for path, expected in [('/', INDEX_HTML), ('/sw.js', SW_JS), ('/index.html', INDEX_HTML)]:
+            with self.subTest(path=path):
+                conn.request('GET', path)
+                response = conn.getresponse()
+                self.assertEqual(response.read(), expected)
+                self.assertFalse(response.will_close)
+        conn.close()
+
+    def test_head_has_length_but_no_body(self):
+        conn = self.connect()
+        conn.request('HEAD', '/sw.js')
+        response = conn.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(int(response.getheader('Content-Length')), len(SW_JS))
+        self.assertEqual(response.read(), b'')
+        conn.close()
+
+    def test_missing_file_is_404(self):
+        conn = self.connect()
+        conn.request('GET', '/missing.png')
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 404)
+        conn.close()
+
+    def test_path_traversal_is_rejected(self):
+        with socket.create_connection(('127.0.0.1', self.port), timeout=5) as sock:
+            sock.sendall(b'GET /../../etc/passwd HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+            data = b''
+            while chunk := sock.recv(4096):
+                data += chunk
+        self.assertNotIn(b'root:', data)
+
+    def test_directory_without_slash_redirects(self):
+        conn = self.connect()
+        conn.request('GET', '/icons')
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 404)
+        (self.web_dir / 'icons' / 'index.html').write_bytes(INDEX_HTML)
+        self.server.site.cache.refresh()
+        conn.request('GET', '/icons')
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 301)
+        self.assertEqual(response.getheader('Location'), '/icons/')
+        conn.close()
+
+    def test_gzip_variant_is_negotiated(self):
+        conn = self.connect()
+        conn.request('GET', '/', headers={'Accept-Encoding': 'gzip, deflate'})
+        response = conn.getresponse()
+        body = response.read()
+        self.assertEqual(response.getheader('Content-Encoding'), 'gzip')
+        self.assertEqual(response.getheader('Vary'), 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(body), INDEX_HTML)
+
+        conn.request('GET', '/')
+        response = conn.getresponse()
+        self.assertEqual(response.read(), INDEX_HTML)
+        self.assertIsNone(response.getheader('Content-Encoding'))
+        self.assertEqual(response.getheader('Vary'), 'Accept-Encoding')
+        conn.close()
+
+    def test_conditional_get_returns_304_without_body(self):
+        conn = self.connect()
+        conn.request('GET', '/sw.js')
+        response = conn.getresponse()
+        response.read()
+        etag = response.getheader('ETag')
+        last_modified = response.getheader('Last-Modified')
+        self.assertRegex(etag, r'^"[0-9a-f]{32}"$')
+
+        for headers in ({'If-None-Match': etag},
+                        {'If-None-Match': f'"stale", W/{etag}'},
+                        {'If-Modified-Since': last_modified}):
+            with self.subTest(headers=headers):
+                conn.request('GET', '/sw.js', headers=headers)
+                response = conn.getresponse()
+                self.assertEqual(response.status, 304)
+                self.assertEqual(response.read(), b'')
+                self.assertEqual(response.getheader('ETag'), etag)
+                self.assertEqual(response.getheader('Cache-Control'),
+                                 asset_cache.CACHE_CONTROL_REVALIDATE)
+                self.assertIsNone(response.getheader('Content-Length'))
+
+        # A non-matching If-None-Match wins over a matching If-Modified-Since
+        conn.request('GET', '/sw.js', headers={'If-None-Match': '"stale"',
+                                              'If-Modified-Since': last_modified})
+        response = conn.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.read(), SW_JS)
+        conn.close()
+
+    def test_compressed_variant_has_its_own_etag(self):
+        conn = self.connect()
+        conn.request('GET', '/', headers={'Accept-Encoding': 'gzip'})
+        response = conn.getresponse()
+        response.read()
+        gzip_etag = response.getheader('ETag')
+        self.assertTrue(gzip_etag.endswith('-gzip"'))
+
+        conn.request('GET', '/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag})
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 304)
+        self.assertEqual(response.getheader('Vary'), 'Accept-Encoding')
+
+        conn.request('GET', '/', headers={'If-None-Match': gzip_etag})
+        response = conn.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.read(), INDEX_HTML)
+        conn.close()
+
+    def test_large_file_is_sent_from_disk(self):
+        self.assertTrue(self.server.site.cache.get('/statement.pdf').file_backed)
+        conn = self.connect()
+        conn.request('GET', '/statement.pdf')
+        response = conn.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Accept-Ranges'), 'bytes')
+        self.assertEqual(response.read(), STATEMENT_PDF)
+        etag = response.getheader('ETag')
+
+        conn.request('HEAD', '/statement.pdf')
+        response = conn.getresponse()
+        self.assertEqual(int(response.getheader('Content-Length')), len(STATEMENT_PDF))
+        self.assertEqual(response.read(), b'')
+
+        conn.request('GET', '/statement.pdf', headers={'If-None-Match': etag})
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 304)
+        conn.close()
+
+    def test_range_requests(self):
+        size = len(STATEMENT_PDF)
+        cases = [
+            ('/sw.js', 'bytes=5-9', SW_JS[5:10], f'bytes 5-9/{len(SW_JS)}'),
+            ('/sw.js', 'bytes=-4', SW_JS[-4:], f'bytes {len(SW_JS) - 4}-{len(SW_JS) - 1}/{len(SW_JS)}'),
+            ('/statement.pdf', 'bytes=1000000-', STATEMENT_PDF[1000000:], f'bytes 1000000-{size - 1}/{size}'),
+            ('/statement.pdf', 'bytes=0-99', STATEMENT_PDF[:100], f'bytes 0-99/{size}'),
+        ]
+        conn = self.connect()
+        for path, range_header, expected, content_range in cases:
+            with self.subTest(path=path, range=range_header):
+                # Accept-Encoding must not turn the range into one over gzip bytes
+                conn.request('GET', path, headers={'Range': range_header, 'Accept-Encoding': 'gzip'})
+                response = conn.getresponse()
+                self.assertEqual(response.status, 206)
+                self.assertEqual(response.getheader('Content-Range'), content_range)
+                self.assertIsNone(response.getheader('Content-Encoding'))
+                self.assertEqual(response.read(), expected)
+        conn.close()
+
+    def test_unsatisfiable_range_is_416(self):
+        conn = self.connect()
+        for path, size in [('/sw.js', len(SW_JS)), ('/statement.pdf', len(STATEMENT_PDF))]:
+            with self.subTest(path=path):
+                conn.request('GET', path, headers={'Range': f'bytes={size}-'})
+                response = conn.getresponse()
+                response.read()
+                self.assertEqual(response.status, 416)
+                self.assertEqual(response.getheader('Content-Range'), f'bytes */{size}')
+        conn.close()
+
+    def test_stale_if_range_sends_full_body(self):
+        conn = self.connect()
+        for path, body in [('/sw.js', SW_JS), ('/statement.pdf', STATEMENT_PDF)]:
+            with self.subTest(path=path):
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                etag = response.getheader('ETag')
+
+                conn.request('GET', path, headers={'Range': 'bytes=0-3', 'If-Range': etag})
+                response = conn.getresponse()
+                self.assertEqual(response.status, 206)
+                self.assertEqual(response.read(), body[:4])
+
+                conn.request('GET', path, headers={'Range': 'bytes=0-3', 'If-Range': '"stale"'})
+                response = conn.getresponse()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.read(), body)
+        conn.close()
+
+    def test_metrics_endpoint_is_local_only(self):
+        conn = self.connect()
+        for path in ['/', '/', '/sw.js', '/missing.png']:
+            conn.request('GET', path)
+            conn.getresponse().read()
+
+        conn.request('GET', '/__metrics')
+        response = conn.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertTrue(response.getheader('Content-Type').startswith('text/plain; version=0.0.4'))
+        text = response.read().decode()
+        self.assertIn('mobilebanks_http_requests_total{route="/index.html",status="200"} 2', text)
+        self.assertIn('mobilebanks_http_requests_total{route="(unmatched)",status="404"} 1', text)
+        self.assertIn('mobilebanks_http_request_duration_seconds_count{route="/sw.js"} 1', text)
+        self.assertIn(f'mobilebanks_http_response_bytes_total{{route="/sw.js"}} {len(SW_JS)}', text)
+        self.assertIn('mobilebanks_asset_cache_lookups_total{result="miss"} 1', text)
+        self.assertIn('mobilebanks_asset_cache_hit_ratio 0.75', text)
+
+        # Relayed through the tunnel: looks like any other missing path
+        conn.request('GET', '/__metrics', headers={'X-Forwarded-For': '203.0.113.9'})
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 404)
+        conn.close()
+
+    def test_access_log_records_requests(self):
+        conn = self.connect()
+        conn.request('GET', '/sw.js', headers={'User-Agent': 'test-agent', 'X-Forwarded-For': '203.0.113.9'})
+        conn.getresponse().read()
+        conn.request('GET', '/missing.png')
+        conn.getresponse().read()
+        conn.close()
+
+        # Requests are recorded just after their response is written
+        deadline = time.monotonic() + 5
+        while sum(self.server.site.metrics.snapshot().requests.values()) < 2:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.server.site.access_log.close()  # flushes the queue
+        records = [json.loads(line) for line in self.access_log.read_text().splitlines()]
+        self.assertEqual([(r['target'], r['status']) for r in records],
+                         [('/sw.js', 200), ('/missing.png', 404)])
+        self.assertEqual(records[0]['bytes'], len(SW_JS))
+        self.assertEqual(records[0]['cache'], 'hit')
+        self.assertEqual(records[0]['client'], '127.0.0.1')
+        self.assertEqual(records[0]['forwarded_for'], '203.0.113.9')
+        self.assertEqual(records[0]['user_agent'], 'test-agent')
+        self.assertRegex(records[0]['ts'], r'^\d{4}-\d\d-\d\dT.*\+00:00$')
+
+    def test_connection_close_is_honoured(self):
+        conn = self.connect()
+        conn.request('GET', '/', headers={'Connection': 'close'})
+        response = conn.getresponse()
+        response.read()
+        self.assertTrue(response.will_close)
+        conn.close()
+
+
+class TestThreadedEngine(EngineTestMixin, unittest.TestCase):
+    ENGINE = 'threaded'
+
+
+class TestAsyncioEngine(EngineTestMixin, unittest.TestCase):
+    ENGINE = 'asyncio'
+
+
+class ExportTestMixin:
+    """Statement exports streamed from a ledger; subclasses set ENGINE."""
+
+    ENGINE = None
+
+    def setUp(self):
+        from backend import Ledger
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.web_dir = Path(self.tmp.name) / 'web'
+        self.web_dir.mkdir()
+        (self.web_dir / 'index.html').write_bytes(INDEX_HTML)
+        db_path = Path(self.tmp.name) / 'ledger.sqlite3'
+        ledger = Ledger(db_path)
+        ledger.add_many([{
+            'id': f'tx-{index}', 'title': f'Ostos {index}', 'amount': -index / 4,
+            'date': f'2025-{index % 12 + 1:02d}-01', 'category': 'Ostokset',
+            'status': 'completed', 'type': 'debit',
+        } for index in range(3000)])
+        ledger.close()
+
+        self.server = static_server.create_server(self.web_dir, port=0, engine=self.ENGINE,
+                                                  host='127.0.0.1', quiet=True, ledger_db=db_path)
+        self.port = self.server.server_address[1]
+        self.thread = self.server.start_background()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(timeout=5)
+
+    def get(self, path, method='GET'):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        self.addCleanup(connection.close)
+        connection.request(method, path)
+        response = connection.getresponse()
+        return response, response.read()
+
+    def test_csv_is_streamed_chunked(self):
+        response, body = self.get('/api/export/tiliote-2025-03.csv')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Transfer-Encoding'), 'chunked')
+        self.assertIsNone(response.getheader('Content-Length'))
+        self.assertIn('tiliote-2025-03.csv', response.getheader('Content-Disposition'))
+        lines = body.decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 1 + 250)
+        self.assertTrue(all(line.startswith('2025-03-01;') for line in lines[1:]))
+
+    def test_xlsx_and_keep_alive(self):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        self.addCleanup(connection.close)
+        for _ in range(2):
+            connection.request('GET', '/api/export/tiliote-kaikki.xlsx')
+            response = connection.getresponse()
+            body = response.read()
+            self.assertEqual(response.status, 200)
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            sheet = archive.read('xl/worksheets/sheet1.xml')
+        self.assertEqual(sheet.count(b'<row>'), 1 + 3000)
+
+    def test_head_and_errors(self):
+        response, body = self.get('/api/export/tiliote-2025.csv', method='HEAD')
+        self.assertEqual((response.status, body), (200, b''))
+        self.assertEqual(self.get('/api/export/statement.csv')[0].status, 404)
+        self.assertEqual(self.get('/api/export/tiliote-2025-13.csv')[0].status, 400)
+
+    def test_exports_are_local_unless_public(self):
+        def get_relayed():
+            connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+            self.addCleanup(connection.close)
+            connection.request('GET', '/api/export/tiliote-2025-03.csv', headers={'X-Forwarded-For': '203.0.113.9'})
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        self.assertEqual(get_relayed(), 404)
+        self.server.site.public_exports = True
+        self.assertEqual(get_relayed(), 200)
+
+    def test_http10_gets_raw_body_and_close(self):
+        with socket.create_connection(('127.0.0.1', self.port), timeout=10) as sock:
+            sock.sendall(b'GET /api/export/tiliote-2025-01-01.csv HTTP/1.0\r\n\r\n')
+            data = b''
+            while chunk := sock.recv(65536):
+                data += chunk
+        head, _, body = data.partition(b'\r\n\r\n')
+        self.assertNotIn(b'chunked', head.lower())
+        self.assertEqual(len(body.decode('utf-8-sig').splitlines()), 1 + 250)
+
+
+class TestThreadedExport(ExportTestMixin, unittest.TestCase):
+    ENGINE = 'threaded'
+
+    def test_request_threads_release_ledger_connections(self):
+        for _ in range(20):
+            connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+            connection.request('GET', '/api/export/tiliote-2025-03.csv')
+            response = connection.getresponse()
+            response.read()
+            self.assertEqual(response.status, 200)
+            connection.close()
+        ledger = self.server.site.ledger()
+        deadline = time.monotonic() + 5
+        while len(ledger._connections) > 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # At most the one this test thread just opened via ledger()
+        self.assertLessEqual(len(ledger._connections), 1)
+
+
+class TestAsyncioExport(ExportTestMixin, unittest.TestCase):
+    ENGINE = 'asyncio'
+
+
+class TestByteRanges(unittest.TestCase):
+    """Test Range and If-Range parsing."""
+
+    def test_parse_byte_range(self):
+        cases = [
+            ('bytes=0-99', 1000, (0, 99)),
+            ('bytes=500-', 1000, (500, 999)),
+            ('bytes=900-5000', 1000, (900, 999)),
+            ('bytes=-100', 1000, (900, 999)),
+            ('bytes=-5000', 1000, (0, 999)),
+            ('bytes=1000-', 1000, 'unsatisfiable'),
+            ('bytes=-0', 1000, 'unsatisfiable'),
+            ('bytes=0-', 0, 'unsatisfiable'),
+            ('bytes=0-1,5-6', 1000, None),
+            ('items=0-1', 1000, None),
+            ('bytes=5-1', 1000, None),
+            ('bytes=abc', 1000, None),
+            (None, 1000, None),
+        ]
+        for value, size, expected in cases:
+            with self.subTest(value=value, size=size):
+                self.assertEqual(static_server.parse_byte_range(value, size), expected)
+
+    def test_if_range_matches(self):
+        mtime = 1_700_000_000
+        self.assertTrue(static_server.if_range_matches('"abc"', '"abc"', mtime))
+        self.assertFalse(static_server.if_range_matches('W/"abc"', '"abc"', mtime))
+        self.assertFalse(static_server.if_range_matches('"xyz"', '"abc"', mtime))
+        self.assertTrue(static_server.if_range_matches('Tue, 14 Nov 2023 22:13:20 GMT', '"abc"', mtime))
+        self.assertFalse(static_server.if_range_matches('Tue, 14 Nov 2023 22:13:21 GMT', '"abc"', mtime))
+        self.assertFalse(static_server.if_range_matches('garbage', '"abc"', mtime))
+
+
+class TestServerMetrics(unittest.TestCase):
+    """Test sharded metrics, Prometheus rendering and the access log."""
+
+    def test_shards_from_many_threads_are_merged(self):
+        metrics = server_metrics.ServerMetrics()
+
+        def serve():
+            for _ in range(100):
+                metrics.observe('/index.html', 200, 0.002, 10, 'hit')
+
+        threads = [threading.Thread(target=serve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        metrics.observe('/statement.pdf', 206, 0.2, 100, 'disk')
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot.requests[('/index.html', 200)], 800)
+        self.assertEqual(snapshot.bytes_out['/index.html'], 8000)
+        # Exited threads were folded into the retired shard
+        self.assertEqual(len(metrics._shards), 1)
+        self.assertAlmostEqual(metrics.cache_hit_ratio(), 800 / 801)
+
+    def test_render_histogram_is_cumulative(self):
+        metrics = server_metrics.ServerMetrics()
+        metrics.observe('/sw.js', 304, 0.0001, 0, 'hit')
+        metrics.observe('/sw.js', 200, 0.003, 41, 'hit')
+        metrics.observe('/sw.js', 200, 10.0, 41, 'hit')
+        text = metrics.render()
+        self.assertIn('mobilebanks_http_request_duration_seconds_bucket{route="/sw.js",le="0.0005"} 1', text)
+        self.assertIn('mobilebanks_http_request_duration_seconds_bucket{route="/sw.js",le="0.005"} 2', text)
+        self.assertIn('mobilebanks_http_request_duration_seconds_bucket{route="/sw.js",le="2.5"} 2', text)
+        self.assertIn('mobilebanks_http_request_duration_seconds_bucket{route="/sw.js",le="+Inf"} 3', text)
+        self.assertIn('mobilebanks_http_request_duration_seconds_count{route="/sw.js"} 3', text)
+        self.assertIn('# TYPE mobilebanks_http_request_duration_seconds histogram', text)
+        self.assertTrue(text.endswith('\n'))
+
+    def test_worker_label_is_on_every_series(self):
+        metrics = server_metrics.ServerMetrics(worker=4242)
+        metrics.observe('/sw.js', 200, 0.003, 41, 'hit')
+        samples = [line for line in metrics.render().splitlines() if not line.startswith('#')]
+        self.assertTrue(samples)
+        for line in samples:
+            self.assertTrue(line.startswith('mobilebanks_') and '{worker="4242"' in line, line)
+        self.assertNotIn('worker=', server_metrics.ServerMetrics().render())
+
+    def test_label_values_are_escaped(self):
+        metrics = server_metrics.ServerMetrics()
+        metrics.observe('/a"b\\c', 200, 0.001, 1)
+        self.assertIn('route="/a\\"b\\\\c"', metrics.render())
+
+    def test_is_local_request(self):
+        self.assertTrue(server_metrics.is_local_request('127.0.0.1', {}))
+        self.assertTrue(server_metrics.is_local_request('::1', {}))
+        self.assertTrue(server_metrics.is_local_request('::ffff:127.0.0.1', {}))
+        self.assertFalse(server_metrics.is_local_request('192.168.1.20', {}))
+        self.assertFalse(server_metrics.is_local_request('127.0.0.1', {'x-forwarded-for': '203.0.113.9'}))
+        self.assertFalse(server_metrics.is_local_request(None, {}))
+
+    def test_access_log_drops_instead_of_blocking(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = server_metrics.AccessLog(Path(tmp) / 'access.jsonl', max_pending=2)
+            release = threading.Event()
+            write = log._write
+            log._write = lambda records: (release.wait(5), write(records))
+            try:
+                log.log({'ts': 0.0, 'n': 0})  # picked up by the writer, which stalls
+                time.sleep(0.05)
+                started = time.monotonic()
+                for n in range(1, 6):
+                    log.log({'ts': 0.0, 'n': n})
+                self.assertLess(time.monotonic() - started, 0.5)
+                self.assertEqual(log.dropped, 3)
+            finally:
+                release.set()
+                log.close()
+            numbers = [json.loads(line)['n'] for line in (Path(tmp) / 'access.jsonl').read_text().splitlines()]
+            self.assertEqual(numbers, [0, 1, 2])
+
+    def test_access_log_counts_concurrent_drops(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = server_metrics.AccessLog(Path(tmp) / 'access.jsonl', max_pending=1)
+            release = threading.Event()
+            write = log._write
+            log._write = lambda records: (release.wait(5), write(records))
+            try:
+                log.log({'ts': 0.0})  # picked up by the writer, which stalls
+                time.sleep(0.05)
+                log.log({'ts': 0.0})  # fills the queue; every later record is dropped
+                threads = [threading.Thread(target=lambda: [log.log({'ts': 0.0}) for _ in range(2000)])
+                           for _ in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.assertEqual(log.dropped, 8 * 2000)
+            finally:
+                release.set()
+                log.close()
+
+
+class TestAssetCache(unittest.TestCase):
+    """Test preloading and change detection."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.web_dir = Path(self.tmp.name)
+        (self.web_dir / 'index.html').write_bytes(INDEX_HTML)
+        (self.web_dir / 'sw.js').write_bytes(SW_JS)
+        self.cache = asset_cache.AssetCache(self.web_dir)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def touch(self, name, content):
+        path = self.web_dir / name
+        path.write_bytes(content)
+        st = path.stat()
+        # Make sure the mtime moves even on coarse-grained filesystems
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    def test_preloads_all_files(self):
+        self.assertEqual(set(self.cache.table), {'/index.html', '/sw.js'})
+        asset = self.cache.get('/sw.js')
+        self.assertEqual(asset.body, SW_JS)
+        self.assertIn(('Content-Length', str(len(SW_JS))), asset.headers)
+
+    def test_table_is_read_only(self):
+        with self.assertRaises(TypeError):
+            self.cache.table['/new'] = None
+
+    def test_refresh_rebuilds_only_changed_entries(self):
+        sw_before = self.cache.get('/sw.js')
+        self.touch('index.html', b'<html>v2</html>')
+        self.assertEqual(self.cache.refresh(), ['/index.html'])
+        self.assertEqual(self.cache.get('/index.html').body, b'<html>v2</html>')
+        self.assertIs(self.cache.get('/sw.js'), sw_before)
+
+    def test_refresh_tracks_added_and_removed_files(self):
+        self.touch('logo.svg', b'<svg/>')
+        (self.web_dir / 'sw.js').unlink()
+        self.assertEqual(self.cache.refresh(), ['/logo.svg', '/sw.js'])
+        self.assertIsNone(self.cache.get('/sw.js'))
+
+    def test_refresh_without_changes_keeps_table(self):
+        table = self.cache.table
+        self.assertEqual(self.cache.refresh(), [])
+        self.assertIs(self.cache.table, table)
+
+    def test_watcher_picks_up_edits(self):
+        changed = []
+        watcher = asset_cache.CacheWatcher(self.cache, interval=0.05, on_change=changed.extend).start()
+        try:
+            self.touch('index.html', b'<html>edited</html>')
+            for _ in range(100):
+                if changed:
+                    break
+                time.sleep(0.05)
+        finally:
+            watcher.stop()
+        self.assertEqual(changed, ['/index.html'])
+        self.assertEqual(self.cache.get('/index.html').body, b'<html>edited</html>')
+
+
+class TestCompression(unittest.TestCase):
+    """Test Accept-Encoding negotiation and precompressed variants."""
+
+    def test_negotiate_encoding(self):
+        offered = ['br', 'gzip']
+        cases = [
+            (None, None),
+            ('', None),
+            ('gzip', 'gzip'),
+            ('gzip, br', 'br'),
+            ('br;q=0.5, gzip', 'gzip'),
+            ('br;q=0, gzip;q=0', None),
+            ('*', 'br'),
+            ('*;q=0.1, br;q=0', 'gzip'),
+            ('identity', None),
+            ('GZIP;Q=0.8', 'gzip'),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(static_server.negotiate_encoding(header, offered), expected)
+
+    def test_only_compressible_assets_get_variants(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            web_dir = Path(tmp)
+            (web_dir / 'index.html').write_bytes(INDEX_HTML)
+            (web_dir / 'tiny.js').write_bytes(b'1;')
+            (web_dir / 'photo.png').write_bytes(os.urandom(4096))
+            cache = asset_cache.AssetCache(web_dir)
+            self.assertEqual(cache.get('/index.html').variant('gzip').headers[1],
+                             ('Content-Encoding', 'gzip'))
+            self.assertEqual(cache.get('/tiny.js').variants, ())
+            self.assertEqual(cache.get('/photo.png').variants, ())
+            self.assertNotIn(('Vary', 'Accept-Encoding'), cache.get('/photo.png').headers)
+
+    def test_precompress_dir_is_reused(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            web_dir = Path(tmp) / 'web'
+            store_dir = Path(tmp) / 'variants'
+            web_dir.mkdir()
+            (web_dir / 'index.html').write_bytes(INDEX_HTML)
+
+            asset_cache.AssetCache(web_dir, precompress_dir=store_dir)
+            stored = list(store_dir.glob('*.gz'))
+            self.assertEqual(len(stored), 1)
+
+            # A second launch must read the stored variant instead of compressing
+            with unittest.mock.patch.object(asset_cache, 'compress', side_effect=AssertionError):
+                cache = asset_cache.AssetCache(web_dir, precompress_dir=store_dir)
+            self.assertEqual(gzip.decompress(cache.get('/index.html').variant('gzip').body), INDEX_HTML)
+
+    def test_precompress_dir_inside_web_dir_is_not_served(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            web_dir = Path(tmp)
+            (web_dir / 'index.html').write_bytes(INDEX_HTML)
+            cache = asset_cache.AssetCache(web_dir, precompress_dir=web_dir / '.variants')
+            self.assertEqual(set(cache.table), {'/index.html'})
+
+
+class TestCachingHeaders(unittest.TestCase):
+    """Test Cache-Control policy and conditional request evaluation."""
+
+    def test_cache_control_per_asset_class(self):
+        cases = [
+            ('/index.html', 'text/html; charset=utf-8', asset_cache.CACHE_CONTROL_REVALIDATE),
+            ('/sw.js', 'text/javascript; charset=utf-8', asset_cache.CACHE_CONTROL_REVALIDATE),
+            ('/logo.svg', 'image/svg+xml', asset_cache.CACHE_CONTROL_IMMUTABLE),
+            ('/icon-192.svg', 'image/svg+xml', asset_cache.CACHE_CONTROL_IMMUTABLE),
+            ('/manifest.json', 'application/json', asset_cache.CACHE_CONTROL_DEFAULT),
+        ]
+        for url_path, content_type, expected in cases:
+            with self.subTest(url_path=url_path):
+                self.assertEqual(asset_cache.cache_control_for(url_path, content_type), expected)
+
+    def test_not_modified(self):
+        etag = '"abc"'
+        mtime = 1_700_000_000
+        self.assertTrue(static_server.not_modified('"abc"', None, etag, mtime))
+        self.assertTrue(static_server.not_modified('*', None, etag, mtime))
+        self.assertFalse(static_server.not_modified('"xyz"', None, etag, mtime))
+        self.assertTrue(static_server.not_modified(None, 'Tue, 14 Nov 2023 22:13:20 GMT', etag, mtime))
+        self.assertFalse(static_server.not_modified(None, 'Tue, 14 Nov 2023 22:13:19 GMT', etag, mtime))
+        self.assertFalse(static_server.not_modified(None, 'not a date', etag, mtime))
+        self.assertFalse(static_server.not_modified(None, None, etag, mtime))
+
+
+class TestLoadBenchmark(unittest.TestCase):
+    """Smoke test for benchmarks/bench_http.py so the suite does not rot."""
+
+    def test_short_run_reports_latency_and_throughput(self):
+        import asyncio
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+        import bench_http
+
+        web_dir = Path(os.path.dirname(os.path.abspath(__file__))) / 'web'
+        server = static_server.create_server(web_dir, port=0, host='127.0.0.1',
+                                             quiet=True, watch_interval=None)
+        thread = server.start_background()
+        try:
+            report = asyncio.run(bench_http.run_load('127.0.0.1', server.server_address[1],
+                                                     connections=4, duration=0.3, warmup=0.05))
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join(timeout=5)
+
+        self.assertGreater(report['requests'], 0)
+        self.assertEqual(report['errors'], 0)
+        self.assertIn('304', report['status_counts'])
+        self.assertEqual(set(report['scenarios']), set(bench_http.SCENARIOS))
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            self.assertIn(key, report['latency'])
+
+
+class TestCreateServer(unittest.TestCase):
+    """Test engine selection and bind errors."""
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            static_server.create_server(tempfile.gettempdir(), port=0, engine='forking')
+
+    def test_bind_error_surfaces_immediately(self):
+        with tempfile.TemporaryDirectory() as web_dir, socket.socket() as busy:
+            busy.bind(('127.0.0.1', 0))
+            busy.listen()
+            port = busy.getsockname()[1]
+            for engine in static_server.ENGINES:
+                with self.subTest(engine=engine):
+                    with self.assertRaises(OSError):
+                        static_server.create_server(web_dir, port=port, engine=engine, host='127.0.0.1')
+
+
+def run_tests():
+    """Run all tests and return results."""
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+
+    suite.addTests(loader.loadTestsFromTestCase(TestThreadedEngine))
+    suite.addTests(loader.loadTestsFromTestCase(TestAsyncioEngine))
+    suite.addTests(loader.loadTestsFromTestCase(TestThreadedExport))
+    suite.addTests(loader.loadTestsFromTestCase(TestAsyncioExport))
+    suite.addTests(loader.loadTestsFromTestCase(TestByteRanges))
+    suite.addTests(loader.loadTestsFromTestCase(TestServerMetrics))
+    suite.addTests(loader.loadTestsFromTestCase(TestAssetCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestCompression))
+    suite.addTests(loader.loadTestsFromTestCase(TestCachingHeaders))
+    suite.addTests(loader.loadTestsFromTestCase(TestLoadBenchmark))
+    suite.addTests(loader.loadTestsFromTestCase(TestCreateServer))
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+    return 0 if result.wasSuccessful() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(run_tests())
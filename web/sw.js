@@ -36,6 +36,11 @@ self.addEventListener('fetch', (event) => {
   const { request } = event;
   const url = new URL(request.url);
 
+  // Statement downloads are streamed by the server; never cache (or tee) them
+  if (url.pathname.startsWith('/api/')) {
+    return;
+  }
+
   // Handle navigation requests
   if (request.mode === 'navigate') {
     event.respondWith(
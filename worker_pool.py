@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Multi-Process Worker Mode for the MobileBanks Web Server
+=======================================================
+
+A single Python process is bound by the GIL no matter how many threads
+serve it. WorkerSupervisor starts N serving processes that all bind the
+same port with SO_REUSEPORT, so the kernel spreads incoming connections
+across them. Each worker builds (and warms) its own AssetCache and keeps
+its own ServerMetrics, labelled with its PID.
+
+The supervisor restarts workers that die and stops them all, in
+parallel and with a bounded wait, on shutdown.
+
+SO_REUSEPORT is not available on Windows; there the launcher falls back
+to a single in-process server (see workers_supported()).
+"""
+
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+
+WORKER_READY_TIMEOUT = 30.0  # seconds to wait for a worker to bind
+MONITOR_INTERVAL = 0.5  # seconds between liveness checks
+SHUTDOWN_TIMEOUT = 5.0  # seconds to wait for workers before killing them
+
+
+def workers_supported():
+    """True when this platform can share a port between processes"""
+    return os.name != 'nt' and hasattr(socket, 'SO_REUSEPORT')
+
+
+def _worker_main(ready_queue, web_dir, port, engine, host, server_options):
+    """Entry point of one worker process"""
+    from static_server import create_server
+
+    # Ctrl+C reaches the whole process group; the supervisor handles it
+    # and stops the workers with SIGTERM.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        server = create_server(web_dir, port, engine=engine, host=host,
+                               reuse_port=True, worker_id=os.getpid(), **server_options)
+    except OSError as e:
+        ready_queue.put(('error', os.getpid(), str(e)))
+        return
+    ready_queue.put(('ready', os.getpid(), None))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+class WorkerSupervisor:
+    """
+    Runs and supervises N serving processes on one port.
+
+    The constructor starts the workers and waits until all of them are
+    listening, so bind errors surface immediately like with a single
+    server.
+
+    Args:
+        web_dir: Directory to serve
+        port: Port shared by all workers (must not be 0)
+        workers: Number of worker processes
+        engine: Serving engine used inside each worker
+        host: Interface to bind
+        quiet: Do not report worker restarts on stderr
+        **server_options: Passed to static_server.create_server in each worker
+
+    Raises:
+        OSError: A worker could not bind the port
+    """
+
+    def __init__(self, web_dir, port, workers, engine, host='', quiet=False, **server_options):
+        if port == 0:
+            raise ValueError("worker mode needs a fixed port")
+        self.worker_args = (str(web_dir), port, engine, host, dict(server_options, quiet=quiet))
+        self.worker_count = workers
+        self.quiet = quiet
+        self.server_address = (host, port)
+        self.restarts = 0
+        # Imported here: the launcher imports this module for
+        # workers_supported() even when it runs a single server
+        import multiprocessing
+        self._context = multiprocessing.get_context('spawn')
+        self._ready = self._context.Queue()
+        self._processes = []
+        self._stop = threading.Event()
+        self._stopped = threading.Event()
+        self._stopped.set()
+
+        try:
+            for _ in range(workers):
+                self._processes.append(self._spawn())
+            self._wait_ready(workers)
+        except BaseException:
+            self._terminate_all()
+            raise
+
+    @property
+    def pids(self):
+        """Process IDs of the current workers"""
+        return [process.pid for process in self._processes]
+
+    def _spawn(self):
+        process = self._context.Process(
+            target=_worker_main, args=(self._ready,) + self.worker_args,
+            name='static-server-worker', daemon=True
+        )
+        process.start()
+        return process
+
+    def _wait_ready(self, count):
+        deadline = time.monotonic() + WORKER_READY_TIMEOUT
+        while count:
+            try:
+                status, pid, error = self._ready.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise OSError(f"workers did not start within {WORKER_READY_TIMEOUT:.0f}s")
+            if status == 'error':
+                raise OSError(f"worker {pid} could not bind port {self.server_address[1]}: {error}")
+            count -= 1
+
+    def serve_forever(self):
+        """Watch the workers and restart any that die, until shutdown()"""
+        self._stopped.clear()
+        try:
+            while not self._stop.wait(MONITOR_INTERVAL):
+                for index, process in enumerate(self._processes):
+                    if process.is_alive() or self._stop.is_set():
+                        continue
+                    if not self.quiet:
+                        sys.stderr.write(f"worker {process.pid} exited with code {process.exitcode}, restarting\n")
+                    process.join()
+                    self._processes[index] = self._spawn()
+                    self.restarts += 1
+        finally:
+            self._stopped.set()
+
+    def start_background(self):
+        """Run serve_forever() in a daemon thread and return the thread"""
+        thread = threading.Thread(target=self.serve_forever, name='worker-supervisor', daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        """Stop supervising and stop every worker"""
+        self._stop.set()
+        self._stopped.wait()
+        self._terminate_all()
+
+    def server_close(self):
+        """Release the ready queue (the workers own the sockets)"""
+        self._terminate_all()
+        self._ready.close()
+
+    def _terminate_all(self):
+        # Signal everyone first, then wait against one shared deadline
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()